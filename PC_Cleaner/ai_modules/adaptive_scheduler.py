@@ -0,0 +1,197 @@
+# ai_modules/adaptive_scheduler.py - Intervalo de amostragem adaptativo para os loops de monitoramento
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import psutil
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('adaptive_scheduler')
+
+
+class CpuBudget:
+    """Orçamento de CPU compartilhado por todos os loops de monitoramento do app.
+
+    Cada loop informa quanto tempo de CPU gastou por amostra; o orçamento
+    (fração de um núcleo) é dividido igualmente entre os loops registrados e
+    define o intervalo mínimo que cada um pode usar.
+    """
+
+    def __init__(self, budget_percent: float = 3.0):
+        self.budget_percent = budget_percent
+        self._costs: Dict[str, float] = {}  # loop -> custo médio (segundos de CPU por amostra)
+        self._lock = threading.Lock()
+
+    def register(self, name: str):
+        with self._lock:
+            self._costs.setdefault(name, 0.0)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._costs.pop(name, None)
+
+    def record(self, name: str, cpu_seconds: float, alpha: float = 0.2):
+        with self._lock:
+            previous = self._costs.get(name)
+            self._costs[name] = cpu_seconds if not previous else previous + alpha * (cpu_seconds - previous)
+
+    def min_interval(self, name: str) -> float:
+        """Menor intervalo que mantém o loop dentro da sua parte do orçamento"""
+        with self._lock:
+            cost = self._costs.get(name, 0.0)
+            share = self.budget_percent / 100 / max(1, len(self._costs))
+        return cost / share if share > 0 else 0.0
+
+
+# Orçamento global do processo
+monitoring_budget = CpuBudget()
+
+
+class AdaptiveScheduler:
+    """Escolhe o próximo intervalo de amostragem de um loop de monitoramento.
+
+    - rápido (min_interval) enquanto há alerta aberto, algum detector pede
+      atenção ou alguma métrica se aproxima do seu limite (nível ou tendência);
+    - base_interval em operação normal;
+    - recua até max_interval com o sistema ocioso ou na bateria.
+    O intervalo nunca fica abaixo do permitido pelo orçamento de CPU, cai
+    imediatamente quando há urgência e volta a crescer aos poucos.
+    """
+
+    def __init__(self, name: str, min_interval: float = 3.0, base_interval: float = 60.0,
+                 max_interval: float = 300.0, thresholds: Optional[Dict[str, float]] = None,
+                 near_fraction: float = 0.85, trend_horizon: float = 600.0,
+                 idle_cpu_percent: float = 10.0, battery_factor: float = 3.0,
+                 growth_factor: float = 1.5, budget: Optional[CpuBudget] = None):
+        self.name = name
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.thresholds = dict(thresholds or {})
+        self.near_fraction = near_fraction
+        self.trend_horizon = trend_horizon  # segundos até o limite que já contam como urgência
+        self.idle_cpu_percent = idle_cpu_percent
+        self.battery_factor = battery_factor
+        self.growth_factor = growth_factor
+        self.budget = budget or monitoring_budget
+        self.budget.register(name)
+
+        self.interval = base_interval
+        self.reason = 'normal'
+        self._last: Dict[str, tuple] = {}  # métrica -> (instante, valor)
+        self._slopes: Dict[str, float] = {}  # métrica -> tendência suavizada (unidades/s)
+        self._urgent = False
+        self._idle = False
+        self._battery = (0.0, False)  # (instante da leitura, na bateria)
+        self._wake = threading.Event()
+        self.stats = {'samples': 0, 'fast': 0, 'backoff': 0, 'cpu_seconds': 0.0}
+
+    def observe(self, values: Dict[str, float], alerts_open: bool = False, urgent: bool = False,
+                now: Optional[float] = None):
+        """Registra a amostra atual e decide o modo (urgente / normal / ocioso)"""
+        now = time.time() if now is None else now
+        approaching = False
+
+        for metric, value in values.items():
+            if value is None:
+                continue
+            previous = self._last.get(metric)
+            self._last[metric] = (now, value)
+            if previous is not None and now > previous[0]:
+                slope = (value - previous[1]) / (now - previous[0])
+                old = self._slopes.get(metric)
+                self._slopes[metric] = slope if old is None else 0.5 * old + 0.5 * slope
+
+            threshold = self.thresholds.get(metric)
+            if threshold is None:
+                continue
+            if value >= threshold * self.near_fraction:
+                approaching = True
+            slope = self._slopes.get(metric, 0.0)
+            if slope > 0 and value < threshold and (threshold - value) / slope < self.trend_horizon:
+                approaching = True
+
+        self._urgent = alerts_open or urgent or approaching
+        cpu = values.get('cpu_percent')
+        self._idle = (not self._urgent and cpu is not None and cpu < self.idle_cpu_percent and
+                      all(abs(slope) < 0.05 for slope in self._slopes.values()))
+        self.reason = ('alerta aberto' if alerts_open else 'urgente' if urgent else
+                       'aproximando do limite' if approaching else 'ocioso' if self._idle else 'normal')
+
+    def on_battery(self) -> bool:
+        """Leitura da bateria em cache por 60s"""
+        checked_at, on_battery = self._battery
+        now = time.time()
+        if now - checked_at > 60:
+            try:
+                battery = psutil.sensors_battery()
+                on_battery = bool(battery) and not battery.power_plugged
+            except Exception:
+                on_battery = False
+            self._battery = (now, on_battery)
+        return on_battery
+
+    def next_interval(self) -> float:
+        if self._urgent:
+            target = self.min_interval
+            self.stats['fast'] += 1
+        elif self._idle:
+            target = self.max_interval
+            self.stats['backoff'] += 1
+        else:
+            target = self.base_interval
+
+        if self.on_battery():
+            target *= self.battery_factor
+
+        target = max(target, self.budget.min_interval(self.name))
+        target = min(max(target, self.min_interval), self.max_interval)
+
+        # Cai na hora, sobe gradualmente (evita oscilar entre modos)
+        if target > self.interval:
+            target = min(target, self.interval * self.growth_factor)
+        self.interval = target
+        return target
+
+    @contextmanager
+    def measure(self):
+        """Mede o tempo de CPU gasto pela thread em uma amostra"""
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record_cost(time.thread_time() - start)
+
+    def record_cost(self, cpu_seconds: float):
+        """Registra o tempo de CPU de uma amostra no orçamento"""
+        self.budget.record(self.name, cpu_seconds)
+        self.stats['samples'] += 1
+        self.stats['cpu_seconds'] += cpu_seconds
+
+    def sleep(self, stop_event: Optional[threading.Event] = None) -> float:
+        """Aguarda o próximo intervalo (interrompível por wake() ou stop_event)"""
+        interval = self.next_interval()
+        event = stop_event or self._wake
+        event.wait(interval)
+        self._wake.clear()
+        return interval
+
+    def wake(self):
+        """Interrompe a espera atual (ex.: ao parar o monitoramento)"""
+        self._wake.set()
+
+    def close(self):
+        self.wake()
+        self.budget.unregister(self.name)
+
+    def get_stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'interval': self.interval,
+            'reason': self.reason,
+            'on_battery': self._battery[1],
+            'avg_cpu_ms': self.stats['cpu_seconds'] / self.stats['samples'] * 1000 if self.stats['samples'] else 0.0,
+            **self.stats
+        }
@@ -0,0 +1,299 @@
+# ai_modules/alert_manager.py - Ciclo de vida de alertas: deduplicação, supressão e agrupamento
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Callable, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('alert_manager')
+
+SEVERITY_ORDER = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+# Campos que identificam o "assunto" de um alerta (processo, sensor, métrica...)
+SUBJECT_FIELDS = ['process_name', 'sensor', 'metric', 'path', 'file']
+
+
+def alert_key(anomaly: Dict) -> Tuple[str, str]:
+    """Chave (tipo, assunto) de uma anomalia"""
+    for field in SUBJECT_FIELDS:
+        if anomaly.get(field):
+            return anomaly.get('type', 'unknown'), str(anomaly[field])
+    return anomaly.get('type', 'unknown'), ''
+
+
+class AlertRecord:
+    """Estado de um alerta (tipo, assunto)"""
+
+    def __init__(self, key: Tuple[str, str], category: str, anomaly: Dict, now: float):
+        self.key = key
+        self.category = category
+        self.anomaly = anomaly
+        self.state = 'open'
+        self.first_seen = now
+        self.last_seen = now
+        self.last_notified = now
+        self.occurrences = 1
+        self.suppressed = 0  # ocorrências desde a última notificação
+        self.severity = anomaly.get('severity', 'medium')
+        self.transitions = deque()  # instantes de abertura/resolução (detecção de flapping)
+        self.flapping_until = 0.0
+
+    def to_dict(self) -> Dict:
+        data = {
+            'type': self.key[0],
+            'subject': self.key[1],
+            'category': self.category,
+            'state': self.state,
+            'severity': self.severity,
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'occurrences': self.occurrences,
+            'description': self.anomaly.get('description', '')
+        }
+        if self.anomaly.get('culprits'):
+            data['culprits'] = self.anomaly['culprits']
+        return data
+
+
+class AlertManager:
+    """Máquina de estados de alertas por (tipo, assunto).
+
+    open -> ongoing (resumo agrupado a cada janela de supressão) -> resolved.
+    Apenas transições são persistidas (JSON lines) e repassadas aos ouvintes;
+    ocorrências repetidas dentro da janela só incrementam contadores.
+    Um alerta que abre/resolve várias vezes em pouco tempo entra em
+    'flapping' e fica silenciado até estabilizar.
+    """
+
+    def __init__(self, persist_dir: Optional[str] = None,
+                 suppression_window: float = 900,
+                 suppression_windows: Optional[Dict[str, float]] = None,
+                 resolve_after: float = 180,
+                 flap_window: float = 3600,
+                 flap_threshold: int = 6):
+        self.suppression_window = suppression_window
+        self.suppression_windows = suppression_windows or {}
+        self.resolve_after = resolve_after
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.active: Dict[Tuple[str, str], AlertRecord] = {}
+        self.recent: Dict[Tuple[str, str], AlertRecord] = {}  # resolvidos (histórico de flapping)
+        self.listeners: List[Callable[[Dict], None]] = []
+        self.transitions_file = os.path.join(persist_dir, "alert_transitions.jsonl") if persist_dir else None
+        self._lock = threading.Lock()
+        self.stats = {'observations': 0, 'transitions': 0, 'suppressed': 0}
+
+        if self.transitions_file:
+            self._restore_state()
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            self.listeners = self.listeners + [callback]
+
+    def remove_listener(self, callback: Callable[[Dict], None]) -> bool:
+        """Remove um ouvinte (ex.: janela que fechou); False se não estava registrado"""
+        with self._lock:
+            if callback not in self.listeners:
+                return False
+            self.listeners = [listener for listener in self.listeners if listener != callback]
+        return True
+
+    def window_for(self, alert_type: str) -> float:
+        return self.suppression_windows.get(alert_type, self.suppression_window)
+
+    def _transition(self, record: AlertRecord, state: str, now: float, **extra) -> Dict:
+        transition = {
+            'timestamp': datetime.fromtimestamp(now).isoformat(),
+            'transition': state,
+            **record.to_dict(),
+            'suppressed_since_last': record.suppressed,
+            **extra
+        }
+        record.suppressed = 0
+        record.last_notified = now
+        return transition
+
+    def _record_flap(self, record: AlertRecord, now: float) -> bool:
+        record.transitions.append(now)
+        while record.transitions and now - record.transitions[0] > self.flap_window:
+            record.transitions.popleft()
+        return len(record.transitions) >= self.flap_threshold
+
+    def process(self, anomalies: Dict[str, List[Dict]], now: Optional[float] = None) -> List[Dict]:
+        """Processa as anomalias de um ciclo e retorna as transições geradas"""
+        now = time.time() if now is None else now
+        transitions = []
+
+        with self._lock:
+            seen = set()
+            for category, anomaly_list in anomalies.items():
+                if not isinstance(anomaly_list, list):
+                    continue
+                for anomaly in anomaly_list:
+                    self.stats['observations'] += 1
+                    key = alert_key(anomaly)
+                    seen.add(key)
+                    record = self.active.get(key)
+
+                    if record is None:
+                        record = self.recent.pop(key, None)
+                        if record is None:
+                            record = AlertRecord(key, category, anomaly, now)
+                        else:
+                            record.state = 'open'
+                            record.anomaly = anomaly
+                            record.first_seen = record.last_seen = now
+                            record.occurrences = 1
+                            record.severity = anomaly.get('severity', 'medium')
+                        self.active[key] = record
+
+                        flapping = self._record_flap(record, now)
+                        if now < record.flapping_until:
+                            record.suppressed += 1
+                            self.stats['suppressed'] += 1
+                        elif flapping:
+                            record.state = 'flapping'
+                            record.flapping_until = now + self.flap_window
+                            transitions.append(self._transition(record, 'flapping', now))
+                        else:
+                            transitions.append(self._transition(record, 'open', now))
+                        continue
+
+                    # Alerta já ativo: agrupar
+                    record.occurrences += 1
+                    record.last_seen = now
+                    record.anomaly = anomaly
+                    severity = anomaly.get('severity', 'medium')
+                    escalated = SEVERITY_ORDER.get(severity, 1) > SEVERITY_ORDER.get(record.severity, 1)
+                    if escalated:
+                        record.severity = severity
+
+                    if now < record.flapping_until:
+                        record.suppressed += 1
+                        self.stats['suppressed'] += 1
+                    elif escalated:
+                        record.state = 'ongoing'
+                        transitions.append(self._transition(record, 'escalated', now))
+                    elif now - record.last_notified >= self.window_for(key[0]):
+                        record.state = 'ongoing'
+                        transitions.append(self._transition(
+                            record, 'ongoing', now,
+                            duration_minutes=round((now - record.first_seen) / 60, 1)))
+                    else:
+                        record.suppressed += 1
+                        self.stats['suppressed'] += 1
+
+            # Alertas não observados há resolve_after segundos são resolvidos
+            for key, record in list(self.active.items()):
+                if key in seen or now - record.last_seen < self.resolve_after:
+                    continue
+                del self.active[key]
+                self.recent[key] = record
+                flapping = self._record_flap(record, now)
+                if now < record.flapping_until:
+                    continue
+                if flapping:
+                    record.state = 'flapping'
+                    record.flapping_until = now + self.flap_window
+                    transitions.append(self._transition(record, 'flapping', now))
+                else:
+                    record.state = 'resolved'
+                    transitions.append(self._transition(
+                        record, 'resolved', now,
+                        duration_minutes=round((record.last_seen - record.first_seen) / 60, 1)))
+
+            # Esquecer resolvidos antigos (memória limitada)
+            for key, record in list(self.recent.items()):
+                if now - record.last_seen > self.flap_window and now >= record.flapping_until:
+                    del self.recent[key]
+
+            self.stats['transitions'] += len(transitions)
+
+        if transitions:
+            self._persist(transitions)
+            for callback in self.listeners:  # add/remove trocam a lista, não a alteram
+                for transition in transitions:
+                    try:
+                        callback(transition)
+                    except Exception as e:
+                        logger.error(f"Erro em ouvinte de alertas: {e}")
+
+        return transitions
+
+    def _persist(self, transitions: List[Dict]):
+        if not self.transitions_file:
+            return
+        try:
+            with open(self.transitions_file, 'a', encoding='utf-8') as f:
+                for transition in transitions:
+                    f.write(json.dumps(transition, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            logger.error(f"Erro ao salvar transições de alertas: {e}")
+
+    def _restore_state(self, max_lines: int = 1000):
+        """Reabre alertas ainda ativos a partir das últimas transições salvas"""
+        try:
+            if not os.path.exists(self.transitions_file):
+                return
+            with open(self.transitions_file, 'r', encoding='utf-8') as f:
+                lines = deque(f, maxlen=max_lines)
+            for line in lines:
+                transition = json.loads(line)
+                key = (transition['type'], transition['subject'])
+                if transition['transition'] == 'resolved':
+                    self.active.pop(key, None)
+                    continue
+                first_seen = datetime.fromisoformat(transition['first_seen']).timestamp()
+                record = AlertRecord(key, transition['category'],
+                                     {'type': key[0], 'severity': transition['severity'],
+                                      'description': transition.get('description', '')},
+                                     first_seen)
+                record.state = transition['transition']
+                record.last_seen = datetime.fromisoformat(transition['last_seen']).timestamp()
+                record.last_notified = datetime.fromisoformat(transition['timestamp']).timestamp()
+                record.occurrences = transition.get('occurrences', 1)
+                self.active[key] = record
+        except Exception as e:
+            logger.error(f"Erro ao restaurar estado de alertas: {e}")
+
+    def get_active_alerts(self) -> List[Dict]:
+        with self._lock:
+            return [record.to_dict() for record in self.active.values()]
+
+    def get_summary(self) -> Dict:
+        """Resumo agrupado dos alertas ativos"""
+        active = self.get_active_alerts()
+        by_severity = {'low': 0, 'medium': 0, 'high': 0, 'critical': 0}
+        for alert in active:
+            by_severity[alert['severity']] = by_severity.get(alert['severity'], 0) + 1
+        return {
+            'active_alerts': len(active),
+            'by_severity': by_severity,
+            'observations': self.stats['observations'],
+            'transitions': self.stats['transitions'],
+            'suppressed': self.stats['suppressed'],
+            'alerts': sorted(active, key=lambda a: SEVERITY_ORDER.get(a['severity'], 1), reverse=True)
+        }
+
+
+def format_transition(transition: Dict) -> str:
+    """Linha curta para o painel de alertas da GUI"""
+    icons = {'open': '🚨', 'ongoing': '⏳', 'escalated': '🔺', 'resolved': '✅', 'flapping': '🔁'}
+    labels = {
+        'open': 'NOVO',
+        'ongoing': 'PERSISTE',
+        'escalated': 'AGRAVADO',
+        'resolved': 'RESOLVIDO',
+        'flapping': 'INSTÁVEL'
+    }
+    state = transition.get('transition', 'open')
+    text = f"{icons.get(state, '⚠️')} {labels.get(state, state.upper())}: {transition.get('description', transition.get('type'))}"
+    if state == 'ongoing':
+        text += f" (há {transition.get('duration_minutes', 0):.0f} min, {transition.get('occurrences', 0)} ocorrências)"
+    elif state == 'resolved':
+        text += f" (durou {transition.get('duration_minutes', 0):.0f} min)"
+    return f"{text} - {transition.get('timestamp', '')[11:19]}\n"
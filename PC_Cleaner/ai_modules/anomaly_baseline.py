@@ -0,0 +1,202 @@
+# ai_modules/anomaly_baseline.py - Baseline de anomalias: treinamento e pontuação em tempo real
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Callable
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('anomaly_baseline')
+
+# Colunas de AnomalyDetector.extract_features_for_anomaly_detection usadas por cada modelo
+BASELINE_MODELS = {
+    'system': {
+        'columns': list(range(19)),
+        'contamination': 0.1
+    },
+    'process': {
+        # cpu, memória, total de processos, processos com CPU alta, com memória alta
+        'columns': [0, 1, 12, 13, 14],
+        'contamination': 0.05
+    },
+    'network': {
+        # MB/s enviados/recebidos, erros de entrada/saída, conexões
+        'columns': [7, 8, 9, 10, 11],
+        'contamination': 0.08
+    }
+}
+
+MIN_BASELINE_SAMPLES = 50
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Comprimento médio de caminho em uma BST sem sucesso (igual ao scikit-learn)"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    mask_2 = n_samples == 2
+    mask_n = n_samples > 2
+    result[mask_2] = 1.0
+    n = n_samples[mask_n]
+    result[mask_n] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+class CompiledIsolationForest:
+    """IsolationForest achatado em arrays para pontuar UMA linha rapidamente.
+
+    Percorre todas as árvores em paralelo, nível por nível, com operações
+    vetorizadas do NumPy - evita a validação e o decision_path por árvore
+    do scikit-learn, que dominam o custo de predições de uma única linha.
+    """
+
+    def __init__(self, model: IsolationForest):
+        trees = model.estimators_
+        n_trees = len(trees)
+        max_nodes = max(tree.tree_.node_count for tree in trees)
+
+        self.left = np.full((n_trees, max_nodes), -1, dtype=np.int64)
+        self.right = np.full((n_trees, max_nodes), -1, dtype=np.int64)
+        self.feature = np.zeros((n_trees, max_nodes), dtype=np.int64)
+        self.threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        self.leaf_correction = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        self.max_depth = 0
+
+        for t, (tree, features) in enumerate(zip(trees, model.estimators_features_)):
+            structure = tree.tree_
+            count = structure.node_count
+            self.left[t, :count] = structure.children_left
+            self.right[t, :count] = structure.children_right
+            # Índices de feature da árvore referem-se ao subconjunto sorteado para ela
+            node_features = np.maximum(structure.feature, 0)
+            self.feature[t, :count] = np.asarray(features)[node_features]
+            self.threshold[t, :count] = structure.threshold
+            self.leaf_correction[t, :count] = _average_path_length(structure.n_node_samples)
+            self.max_depth = max(self.max_depth, structure.max_depth)
+
+        self.tree_index = np.arange(n_trees)
+        self.denominator = n_trees * _average_path_length(np.array([model.max_samples_]))[0]
+        self.offset = float(model.offset_)
+
+    def decision(self, row: np.ndarray) -> float:
+        """Equivalente a IsolationForest.decision_function para uma linha"""
+        x = row.astype(np.float32).astype(np.float64)
+        node = np.zeros(len(self.tree_index), dtype=np.int64)
+        depth = np.zeros(len(self.tree_index), dtype=np.float64)
+
+        for _ in range(self.max_depth):
+            left = self.left[self.tree_index, node]
+            active = left != -1
+            if not active.any():
+                break
+            go_left = x[self.feature[self.tree_index, node]] <= self.threshold[self.tree_index, node]
+            next_node = np.where(go_left, left, self.right[self.tree_index, node])
+            node = np.where(active, next_node, node)
+            depth += active
+
+        depth += self.leaf_correction[self.tree_index, node]
+        if self.denominator == 0:
+            score = -1.0
+        else:
+            score = -(2.0 ** (-depth.sum() / self.denominator))
+        return score - self.offset
+
+
+def compile_isolation_forest(model: IsolationForest, n_features: int,
+                             name: str = 'anomaly_model') -> Optional[CompiledIsolationForest]:
+    """Compila a floresta e confere contra o scikit-learn em pontos de teste.
+
+    Retorna None (usar o scikit-learn) se a compilação falhar ou divergir.
+    """
+    try:
+        compiled = CompiledIsolationForest(model)
+        rng = np.random.default_rng(0)
+        probe = rng.normal(size=(5, n_features)) * 2
+        expected = model.decision_function(probe)
+        actual = np.array([compiled.decision(row) for row in probe])
+        if np.allclose(expected, actual, atol=1e-6):
+            return compiled
+        logger.info(f"Floresta compilada divergente para '{name}' - usando scikit-learn")
+    except Exception as e:
+        logger.error(f"Erro ao compilar modelo '{name}': {e}")
+    return None
+
+
+class BaselineScorer:
+    """Pipeline de pontuação pré-calculado: normalização em NumPy + florestas compiladas"""
+
+    def __init__(self, scaler: StandardScaler, models: Dict[str, IsolationForest]):
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.models = {}
+        self.compiled = {}
+        self.columns = {}
+
+        for name, model in models.items():
+            if not is_fitted(model):
+                continue
+            columns = np.array(BASELINE_MODELS[name]['columns'])
+            self.models[name] = model
+            self.columns[name] = columns
+            compiled = compile_isolation_forest(model, len(columns), name)
+            if compiled is not None:
+                self.compiled[name] = compiled
+
+    @property
+    def ready(self) -> Dict[str, bool]:
+        return {name: name in self.models for name in BASELINE_MODELS}
+
+    def transform(self, features: List[float]) -> np.ndarray:
+        return (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+
+    def score(self, features: List[float]) -> Dict[str, float]:
+        """decision_function de cada modelo pronto (negativo = anomalia)"""
+        row = self.transform(features)
+        scores = {}
+        for name, model in self.models.items():
+            subset = row[self.columns[name]]
+            compiled = self.compiled.get(name)
+            if compiled is not None:
+                scores[name] = compiled.decision(subset)
+            else:
+                scores[name] = float(model.decision_function(subset[None, :])[0])
+        return scores
+
+
+def is_fitted(model) -> bool:
+    """Modelo do scikit-learn já passou por fit()"""
+    return hasattr(model, 'estimators_') or hasattr(model, 'mean_')
+
+
+def fit_baseline_models(X: np.ndarray, progress_callback: Optional[Callable] = None,
+                        cancel_check: Optional[Callable] = None) -> Optional[Dict]:
+    """Treina scaler e os três IsolationForests sobre a janela coletada.
+
+    Retorna None se cancelado ou sem amostras suficientes.
+    """
+    if len(X) < MIN_BASELINE_SAMPLES:
+        return None
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(np.asarray(X, dtype=np.float64))
+
+    models = {}
+    for i, (name, config) in enumerate(BASELINE_MODELS.items()):
+        if cancel_check and cancel_check():
+            return None
+        if progress_callback:
+            progress_callback(f'{name}_anomaly_model', 'fitting', 10 + 80 * i / len(BASELINE_MODELS))
+        model = IsolationForest(contamination=config['contamination'], random_state=42)
+        model.fit(X_scaled[:, config['columns']])
+        models[name] = model
+
+    return {
+        'scaler': scaler,
+        'models': models,
+        'samples': int(len(X)),
+        'fit_seconds': time.perf_counter() - start,
+        'trained_at': datetime.now().isoformat()
+    }
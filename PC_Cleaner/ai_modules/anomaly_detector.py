@@ -14,6 +14,19 @@ import logging
 import threading
 import pickle
 import hashlib
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.anomaly_baseline import (BaselineScorer, BASELINE_MODELS, MIN_BASELINE_SAMPLES,
+                                         fit_baseline_models, is_fitted)
+from ai_modules.streaming_detectors import StreamingDetectorBank
+from ai_modules.behavioral_model import BehavioralModel
+from ai_modules.alert_manager import AlertManager, alert_key
+from ai_modules.process_profiles import ProcessCache, ProcessProfileStore
+from ai_modules.adaptive_scheduler import AdaptiveScheduler
+from ai_modules.root_cause import RootCauseEngine, ROOT_CAUSE_METRICS, describe_culprits
+from utils.service_registry import ServiceLease, borrow_service
+from utils.integrity_checker import IntegrityChecker
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('anomaly_detector')
@@ -21,15 +34,19 @@ logger = logging.getLogger('anomaly_detector')
 class AnomalyDetector:
     """Sistema de Detecção de Anomalias 100% REAL"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", auto_start: bool = True, persist: bool = True):
         self.data_dir = data_dir
+        self.persist = persist  # False: nada é gravado em disco (replay/backtest)
         self.models_dir = os.path.join(data_dir, "anomaly_models")
         self.alerts_dir = os.path.join(data_dir, "anomaly_alerts")
         self.monitoring_data_file = os.path.join(data_dir, "monitoring_data.json")
+        self.behavioral_model_file = os.path.join(data_dir, "behavioral_model.npz")
+        self.process_profiles_file = os.path.join(data_dir, "process_profiles.npz")
         
         # Criar diretórios
-        os.makedirs(self.models_dir, exist_ok=True)
-        os.makedirs(self.alerts_dir, exist_ok=True)
+        if persist:
+            os.makedirs(self.models_dir, exist_ok=True)
+            os.makedirs(self.alerts_dir, exist_ok=True)
         
         # Modelos de detecção
         self.system_anomaly_model = IsolationForest(contamination=0.1, random_state=42)
@@ -37,22 +54,68 @@ class AnomalyDetector:
         self.network_anomaly_model = IsolationForest(contamination=0.08, random_state=42)
         self.scaler = StandardScaler()
         
+        # Pontuação pré-calculada dos modelos prontos (None até o baseline existir)
+        self.baseline_scorer: Optional[BaselineScorer] = None
+        self.model_ready = {name: False for name in BASELINE_MODELS}
+        self._baseline_thread = None
+        self._baseline_lock = threading.Lock()
+        
+        # Detectores online: rodam a cada amostra, o IsolationForest só perto do limite
+        self.streaming_detectors = StreamingDetectorBank()
+        self.sample_interval = 5  # segundos entre amostras leves (modo normal)
+        self.full_collection_interval = 60  # segundos entre coletas completas
+        self.escalation_cooldown = 15  # intervalo mínimo entre coletas completas extras
+        # Coleta + detecção mexem nos detectores online, perfis, causa-raiz e cache de processos:
+        # o loop de monitoramento e os scans pedidos pela interface passam um de cada vez
+        self._pipeline_lock = threading.RLock()
+        self._last_full_collection = 0.0
+        self.last_scan: Optional[Tuple[Dict, Dict]] = None  # (métricas, anomalias) da última coleta completa
+        
         # Dados de monitoramento REAIS
         self.monitoring_data = []
         self.baseline_established = False
         self.monitoring_active = False
+        self._monitoring_thread = None
         self.alert_thresholds = self.load_default_thresholds()
         
+        # Intervalo adaptativo: 2s perto de limites/alertas, minutos ocioso ou na bateria
+        self.scheduler = AdaptiveScheduler(
+            'anomaly_detector', min_interval=2, base_interval=self.sample_interval, max_interval=180,
+            thresholds={
+                'cpu_percent': self.alert_thresholds['cpu_threshold'],
+                'memory_percent': self.alert_thresholds['memory_threshold'],
+                'disk_percent': self.alert_thresholds['disk_threshold']
+            })
+        
         # Histórico de anomalias REAIS
         self.anomaly_history = []
-        self.behavioral_patterns = {}
+        # Estado dos alertas: só transições (novo/persiste/resolvido) geram arquivo e notificação
+        self.alert_manager = AlertManager(persist_dir=self.alerts_dir if persist else None)
+        self.behavioral_model = BehavioralModel()
+        self.behavioral_min_samples = 8  # amostras no horário antes de julgar desvios
+        self.behavioral_z_threshold = 3.5
+        self.behavioral_min_std = 3.0  # pontos percentuais (evita desvio ~0 em horários estáveis)
+        self.behavioral_tail = 0.01  # além do z, o valor precisa cair nessa cauda do histograma do horário
+        
+        # Perfis por executável: cada processo é comparado com o próprio histórico
+        self.process_cache = ProcessCache()
+        self.process_profiles = ProcessProfileStore()
+        self._last_process_sample = None  # (timestamp, {nome: [cpu, rss_mb, io_mb_s, threads]})
+        # Histórico curto por executável para apontar culpados de alertas de CPU/memória
+        self.root_cause = RootCauseEngine()
+        
+        # Integridade dos executáveis (hash em background, cache por caminho/tamanho/mtime)
+        self.integrity_checker = IntegrityChecker(data_dir) if persist else None
+        self.integrity_check_interval = 3600  # segundos entre verificações
+        self._last_integrity_check = 0.0
         
         # Carregar dados existentes
         self.load_monitoring_data()
         self.load_models()
         
         # Iniciar coleta de dados
-        self.start_monitoring()
+        if auto_start:
+            self.start_monitoring()
 
     def load_default_thresholds(self) -> Dict:
         """Carrega limites padrão para detecção"""
@@ -120,11 +183,24 @@ class AnomalyDetector:
             total_processes = 0
             high_cpu_processes = 0
             high_memory_processes = 0
+            profile_samples = {}
+            alive_pids = []
+            now = time.time()
             
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'memory_info', 'status']):
+            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'memory_info', 'status',
+                                             'num_threads', 'io_counters']):
                 try:
                     proc_info = proc.info
                     total_processes += 1
+                    alive_pids.append(proc_info['pid'])
+                    
+                    # Agregado por executável (todas as instâncias do mesmo nome)
+                    if proc_info['name']:
+                        sample = profile_samples.setdefault(proc_info['name'], [0.0, 0.0, 0.0, 0.0])
+                        sample[0] += proc_info['cpu_percent'] or 0
+                        sample[1] += proc_info['memory_info'].rss / (1024*1024) if proc_info['memory_info'] else 0
+                        sample[2] += self.process_cache.io_rate(proc_info['pid'], proc_info.get('io_counters'), now)
+                        sample[3] += proc_info['num_threads'] or 0
                     
                     if proc_info['cpu_percent'] and proc_info['cpu_percent'] > self.alert_thresholds['process_cpu_threshold']:
                         high_cpu_processes += 1
@@ -148,6 +224,8 @@ class AnomalyDetector:
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     continue
             
+            self.process_cache.prune(alive_pids)
+            
             # Métricas REAIS de temperatura (se disponível)
             temperature_data = {}
             try:
@@ -175,6 +253,11 @@ class AnomalyDetector:
             except:
                 pass
             
+            # Fora do dict de métricas: monitoring_data é salvo em JSON
+            self._last_process_sample = (timestamp.isoformat(), profile_samples)
+            self.root_cause.record(timestamp.timestamp(), profile_samples, cpu_percent,
+                                   memory.used / (1024*1024), cpu_count)
+            
             metrics = {
                 'timestamp': timestamp.isoformat(),
                 'system': {
@@ -209,6 +292,36 @@ class AnomalyDetector:
             logger.error(f"Erro ao coletar métricas: {e}")
             return {}
 
+    def collect_fast_metrics(self) -> Dict:
+        """Coleta leve (sem varrer processos/conexões) para os detectores online"""
+        try:
+            memory = psutil.virtual_memory()
+            metrics = {
+                'timestamp': datetime.now().isoformat(),
+                'system': {
+                    'cpu_percent': psutil.cpu_percent(interval=None),
+                    'memory_percent': memory.percent,
+                    'swap_percent': psutil.swap_memory().percent
+                }
+            }
+            disk_io = psutil.disk_io_counters()
+            if disk_io:
+                metrics['disk_io'] = {
+                    'read_bytes_per_sec': disk_io.read_bytes,
+                    'write_bytes_per_sec': disk_io.write_bytes
+                }
+            net_io = psutil.net_io_counters()
+            if net_io:
+                metrics['network'] = {
+                    'bytes_sent_per_sec': net_io.bytes_sent,
+                    'bytes_recv_per_sec': net_io.bytes_recv,
+                    'err_in': net_io.errin
+                }
+            return metrics
+        except Exception as e:
+            logger.error(f"Erro na coleta leve: {e}")
+            return {}
+
     def extract_features_for_anomaly_detection(self, metrics: Dict) -> List[float]:
         """Extrai features REAIS para detecção de anomalias"""
         try:
@@ -310,9 +423,16 @@ class AnomalyDetector:
                     'timestamp': timestamp
                 })
             
-            # Detecção de anomalias de processos REAIS
+            # Detecção de anomalias de processos REAIS: desvios do próprio perfil
+            for deviation in self.detect_process_profile_anomalies(metrics):
+                anomalies['process_anomalies'].append({**deviation, 'timestamp': timestamp})
+            
+            # Limites fixos só para executáveis ainda sem perfil maduro
             problematic_processes = processes.get('problematic', [])
             for proc in problematic_processes:
+                if self.process_profiles.is_mature(proc['name']):
+                    continue
+                
                 if proc['cpu_percent'] > self.alert_thresholds['process_cpu_threshold']:
                     anomalies['process_anomalies'].append({
                         'type': 'high_cpu_process',
@@ -369,15 +489,43 @@ class AnomalyDetector:
                         'timestamp': timestamp
                     })
             
-            # Detecção de anomalias usando ML (se modelos estão treinados)
+            # Detectores online (O(1) por amostra)
+            stream = self.streaming_detectors.update(metrics)
+            for alarm in stream['alarms']:
+                anomalies['performance_anomalies'].append({
+                    'type': 'streaming_anomaly',
+                    'severity': 'medium' if alarm['max_level'] < 2 else 'high',
+                    'metric': alarm['metric'],
+                    'value': alarm['value'],
+                    'level': alarm['max_level'],
+                    'description': self.streaming_detectors.describe_alarm(alarm),
+                    'timestamp': timestamp
+                })
+            
+            # Detecção de anomalias usando ML (se modelos estão treinados):
+            # a floresta só é consultada se algum detector online estiver perto do limite
             if self.baseline_established:
-                ml_anomalies = self.detect_ml_anomalies(metrics)
+                run_forest = stream['near_threshold'] or not stream['warmed_up']
+                ml_anomalies = self.detect_ml_anomalies(metrics, run_forest=run_forest)
                 for category, ml_anom in ml_anomalies.items():
                     anomalies[category].extend(ml_anom)
             
-            # Salvar anomalias detectadas
-            if any(anomalies.values()):
-                self.save_anomaly_alert(anomalies)
+            # Anomalias de segurança: executáveis conhecidos com conteúdo alterado
+            anomalies['security_anomalies'].extend(self.detect_integrity_anomalies(timestamp))
+            
+            # Alertas de CPU/memória que vão abrir agora recebem o ranking de processos culpados
+            for anomaly in anomalies['system_anomalies']:
+                if anomaly['type'] in ROOT_CAUSE_METRICS and alert_key(anomaly) not in self.alert_manager.active:
+                    culprits = self.root_cause.explain(anomaly['type'])
+                    if culprits:
+                        anomaly['culprits'] = culprits
+                        anomaly['description'] += f" - {describe_culprits(culprits)}"
+            
+            # Salvar apenas mudanças de estado (condições persistentes não geram alerta a cada ciclo);
+            # o relógio dos alertas é o da amostra, para que replays reproduzam janelas e durações
+            transitions = self.alert_manager.process(anomalies, now=self._metrics_datetime(metrics).timestamp())
+            if transitions and self.persist:
+                self.save_anomaly_alert(anomalies, transitions)
             
             return anomalies
             
@@ -385,7 +533,58 @@ class AnomalyDetector:
             logger.error(f"Erro na detecção de anomalias: {e}")
             return {'error': str(e)}
 
-    def detect_ml_anomalies(self, metrics: Dict) -> Dict:
+    def detect_integrity_anomalies(self, timestamp: str) -> List[Dict]:
+        """Agenda a verificação de integridade e converte mudanças encontradas em anomalias"""
+        if self.integrity_checker is None:
+            return []
+        
+        now = time.time()
+        if now - self._last_integrity_check >= self.integrity_check_interval:
+            if self.integrity_checker.check_async():
+                self._last_integrity_check = now
+        
+        return [{
+            'type': 'binary_modified',
+            'severity': 'high' if change['source'] == 'startup' or not change['metadata_changed'] else 'medium',
+            'path': change['path'],
+            'source': change['source'],
+            'previous_digest': change['previous_digest'],
+            'digest': change['digest'],
+            'description': (f"Executável alterado: {os.path.basename(change['path'])}"
+                            + (" (data de modificação inalterada)" if not change['metadata_changed'] else "")),
+            'timestamp': timestamp
+        } for change in self.integrity_checker.pop_changes()]
+    
+    def detect_process_profile_anomalies(self, metrics: Dict) -> List[Dict]:
+        """Atualiza os perfis por executável e retorna os que fugiram do próprio histórico"""
+        if not self._last_process_sample or self._last_process_sample[0] != metrics.get('timestamp'):
+            return []  # Amostra de processos não corresponde a estas métricas
+        
+        _, samples = self._last_process_sample
+        self._last_process_sample = None  # Cada amostra entra no perfil uma única vez
+        now = self._metrics_datetime(metrics).timestamp()
+        labels = {'cpu_percent': 'CPU %', 'rss_mb': 'memória MB', 'io_mb_per_sec': 'I/O MB/s', 'threads': 'threads'}
+        
+        anomalies = []
+        for deviation in self.process_profiles.update(samples, now):
+            details = ", ".join(
+                f"{labels[m]} {deviation['values'][m]:.1f} (normal {deviation['expected'][m]:.1f})"
+                for m in deviation['metrics']
+            )
+            max_z = max(deviation['z_scores'].values())
+            anomalies.append({
+                'type': 'process_profile_deviation',
+                'severity': 'high' if max_z > 2 * self.process_profiles.z_threshold else 'medium',
+                'process_name': deviation['process_name'],
+                'metrics': deviation['metrics'],
+                'values': deviation['values'],
+                'expected': deviation['expected'],
+                'z_scores': deviation['z_scores'],
+                'description': f"Processo {deviation['process_name']} fora do seu padrão: {details}"
+            })
+        return anomalies
+    
+    def detect_ml_anomalies(self, metrics: Dict, run_forest: bool = True) -> Dict:
         """Detecta anomalias usando ML treinado com dados REAIS"""
         try:
             ml_anomalies = {
@@ -397,21 +596,28 @@ class AnomalyDetector:
             if not self.baseline_established:
                 return ml_anomalies
             
-            # Extrair features
-            features = self.extract_features_for_anomaly_detection(metrics)
-            features_scaled = self.scaler.transform([features])
+            scorer = self.baseline_scorer
             
-            # Detectar anomalia do sistema
-            system_prediction = self.system_anomaly_model.predict(features_scaled)[0]
-            if system_prediction == -1:  # Anomalia detectada
-                anomaly_score = self.system_anomaly_model.decision_function(features_scaled)[0]
-                ml_anomalies['system_anomalies'].append({
-                    'type': 'ml_system_anomaly',
-                    'severity': 'medium',
-                    'anomaly_score': float(anomaly_score),
-                    'description': 'Comportamento anômalo do sistema detectado por ML',
-                    'timestamp': metrics.get('timestamp')
-                })
+            # Extrair features e pontuar todos os modelos prontos de uma vez
+            scores = {}
+            if scorer is not None and run_forest:
+                features = self.extract_features_for_anomaly_detection(metrics)
+                scores = scorer.score(features)
+            
+            descriptions = {
+                'system': 'Comportamento anômalo do sistema detectado por ML',
+                'process': 'Padrão anômalo de processos detectado por ML',
+                'network': 'Padrão anômalo de rede detectado por ML'
+            }
+            for name, anomaly_score in scores.items():
+                if anomaly_score < 0:  # Anomalia detectada (mesmo critério de predict() == -1)
+                    ml_anomalies[f'{name}_anomalies'].append({
+                        'type': f'ml_{name}_anomaly',
+                        'severity': 'medium',
+                        'anomaly_score': float(anomaly_score),
+                        'description': descriptions[name],
+                        'timestamp': metrics.get('timestamp')
+                    })
             
             # Análise de padrões comportamentais
             behavioral_anomaly = self.detect_behavioral_anomaly(metrics)
@@ -424,164 +630,236 @@ class AnomalyDetector:
             logger.error(f"Erro na detecção ML: {e}")
             return {}
 
+    def _metrics_datetime(self, metrics: Dict) -> datetime:
+        try:
+            return datetime.fromisoformat(metrics['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return datetime.now()
+
     def detect_behavioral_anomaly(self, metrics: Dict) -> Optional[Dict]:
-        """Detecta anomalias comportamentais REAIS"""
+        """Detecta anomalias comportamentais REAIS (desvio em relação à mesma hora da semana)"""
         try:
-            current_hour = datetime.now().hour
-            
-            # Analisar padrão de uso por hora
-            if str(current_hour) not in self.behavioral_patterns:
-                return None
+            moment = self._metrics_datetime(metrics)
+            system = metrics.get('system', {})
             
-            expected_pattern = self.behavioral_patterns[str(current_hour)]
-            current_cpu = metrics.get('system', {}).get('cpu_percent', 0)
-            current_memory = metrics.get('system', {}).get('memory_percent', 0)
+            deviations = {}
+            for metric in self.behavioral_model.metrics:
+                value = system.get(metric)
+                if value is None:
+                    continue
+                count, mean, std = self.behavioral_model.expected(moment, metric)
+                if count < self.behavioral_min_samples:
+                    continue
+                z = (value - mean) / max(std, self.behavioral_min_std)
+                rank = self.behavioral_model.percentile_rank(moment, metric, value)
+                deviations[metric] = {'value': value, 'expected': mean, 'std': std, 'z': z, 'percentile': rank}
             
-            # Comparar com padrão esperado
-            cpu_deviation = abs(current_cpu - expected_pattern.get('avg_cpu', current_cpu))
-            memory_deviation = abs(current_memory - expected_pattern.get('avg_memory', current_memory))
+            if not deviations:
+                return None
             
-            # Se desvio for muito grande, é anomalia comportamental
-            if cpu_deviation > 30 or memory_deviation > 25:
-                return {
-                    'type': 'behavioral_anomaly',
-                    'severity': 'medium',
-                    'cpu_deviation': cpu_deviation,
-                    'memory_deviation': memory_deviation,
-                    'description': f'Comportamento fora do padrão para {current_hour}:00h',
-                    'timestamp': metrics.get('timestamp')
-                }
+            # Desvio acima do esperado para o horário, considerando a variabilidade do próprio horário.
+            # Uso de CPU/memória é assimétrico (picos raros puxam o desvio padrão): o z só conta se o
+            # valor também estiver na cauda do que já foi visto nesse horário
+            outliers = {m: d for m, d in deviations.items()
+                        if abs(d['z']) > self.behavioral_z_threshold
+                        and (d['percentile'] is None
+                             or not self.behavioral_tail <= d['percentile'] <= 1 - self.behavioral_tail)}
+            if not outliers:
+                return None
             
-            return None
+            cpu = deviations.get('cpu_percent', {})
+            memory = deviations.get('memory_percent', {})
+            weekday = ['segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo'][moment.weekday()]
+            return {
+                'type': 'behavioral_anomaly',
+                'severity': 'high' if max(abs(d['z']) for d in outliers.values()) > 2 * self.behavioral_z_threshold else 'medium',
+                'cpu_deviation': abs(cpu['value'] - cpu['expected']) if cpu else 0,
+                'memory_deviation': abs(memory['value'] - memory['expected']) if memory else 0,
+                'z_scores': {m: round(d['z'], 2) for m, d in deviations.items()},
+                'percentiles': {m: round(d['percentile'], 3) for m, d in deviations.items() if d['percentile'] is not None},
+                'description': f'Comportamento fora do padrão para {weekday} {moment.hour}:00h',
+                'timestamp': metrics.get('timestamp')
+            }
             
         except Exception as e:
             logger.error(f"Erro na detecção comportamental: {e}")
             return None
 
     def update_behavioral_patterns(self, metrics: Dict):
-        """Atualiza padrões comportamentais REAIS"""
+        """Atualiza padrões comportamentais REAIS (O(1) por amostra)"""
         try:
-            hour = str(datetime.now().hour)
-            cpu_percent = metrics.get('system', {}).get('cpu_percent', 0)
-            memory_percent = metrics.get('system', {}).get('memory_percent', 0)
-            
-            if hour not in self.behavioral_patterns:
-                self.behavioral_patterns[hour] = {
-                    'samples': [],
-                    'avg_cpu': 0,
-                    'avg_memory': 0
-                }
-            
-            # Adicionar amostra
-            self.behavioral_patterns[hour]['samples'].append({
-                'cpu': cpu_percent,
-                'memory': memory_percent,
-                'timestamp': metrics.get('timestamp')
-            })
-            
-            # Manter apenas últimas 30 amostras por hora
-            if len(self.behavioral_patterns[hour]['samples']) > 30:
-                self.behavioral_patterns[hour]['samples'] = self.behavioral_patterns[hour]['samples'][-30:]
-            
-            # Recalcular médias
-            samples = self.behavioral_patterns[hour]['samples']
-            self.behavioral_patterns[hour]['avg_cpu'] = np.mean([s['cpu'] for s in samples])
-            self.behavioral_patterns[hour]['avg_memory'] = np.mean([s['memory'] for s in samples])
-            
+            self.behavioral_model.update(self._metrics_datetime(metrics), metrics.get('system', {}))
         except Exception as e:
             logger.error(f"Erro ao atualizar padrões: {e}")
 
     def start_monitoring(self):
-        """Inicia monitoramento REAL em tempo real"""
+        """Inicia monitoramento REAL em tempo real (no máximo uma thread por instância)"""
         try:
-            def monitoring_loop():
+            if self._monitoring_thread is not None and self._monitoring_thread.is_alive():
                 self.monitoring_active = True
+                return
+            
+            def monitoring_loop():
                 logger.info("Iniciando monitoramento de anomalias em tempo real")
                 
                 while self.monitoring_active:
                     try:
-                        # Coletar métricas REAIS
-                        metrics = self.collect_real_system_metrics()
+                        with self.scheduler.measure(), self._pipeline_lock:
+                            self._monitoring_cycle()
                         
-                        if metrics:
-                            # Adicionar aos dados de monitoramento
-                            self.monitoring_data.append(metrics)
-                            
-                            # Manter apenas últimas 1440 amostras (24h se coletando a cada minuto)
-                            if len(self.monitoring_data) > 1440:
-                                self.monitoring_data = self.monitoring_data[-1440:]
-                            
-                            # Detectar anomalias
-                            anomalies = self.detect_real_system_anomalies(metrics)
-                            
-                            # Atualizar padrões comportamentais
-                            self.update_behavioral_patterns(metrics)
-                            
-                            # Treinar modelos se tiver dados suficientes
-                            if len(self.monitoring_data) >= 100 and not self.baseline_established:
-                                self.establish_baseline()
-                            
-                            # Salvar dados periodicamente
-                            if len(self.monitoring_data) % 10 == 0:
-                                self.save_monitoring_data()
-                        
-                        # Aguardar próxima coleta (1 minuto)
-                        time.sleep(60)
+                        # Aguardar próxima amostra (intervalo adaptativo)
+                        self.scheduler.sleep()
                         
                     except Exception as e:
                         logger.error(f"Erro no loop de monitoramento: {e}")
                         time.sleep(60)
             
             # Executar em thread separada
-            threading.Thread(target=monitoring_loop, daemon=True).start()
+            self.monitoring_active = True
+            self._monitoring_thread = threading.Thread(target=monitoring_loop, daemon=True)
+            self._monitoring_thread.start()
             
         except Exception as e:
             logger.error(f"Erro ao iniciar monitoramento: {e}")
 
+    def _monitoring_cycle(self):
+        """Uma iteração do monitoramento (com o lock do pipeline)"""
+        now = time.time()
+        last_full_collection = self._last_full_collection
+        if now - last_full_collection < self.full_collection_interval:
+            # Amostra leve: só os detectores online
+            fast_metrics = self.collect_fast_metrics()
+            stream = self.streaming_detectors.update(fast_metrics)
+            self.scheduler.observe(fast_metrics.get('system', {}),
+                                   alerts_open=bool(self.alert_manager.active),
+                                   urgent=stream['near_threshold'])
+            escalate = (stream['near_threshold'] and
+                        now - last_full_collection >= self.escalation_cooldown)
+            if not escalate:
+                return
+        self._full_cycle(now)
+
+    def _full_cycle(self, now: float):
+        """Coleta completa + detecção + aprendizado (com o lock do pipeline)"""
+        self._last_full_collection = now
+        
+        # Coletar métricas REAIS completas
+        metrics = self.collect_real_system_metrics()
+        
+        if metrics:
+            # Adicionar aos dados de monitoramento
+            self.monitoring_data.append(metrics)
+            
+            # Manter apenas últimas 1440 amostras (24h se coletando a cada minuto)
+            if len(self.monitoring_data) > 1440:
+                self.monitoring_data = self.monitoring_data[-1440:]
+            
+            # Detectar anomalias
+            anomalies = self.detect_real_system_anomalies(metrics)
+            self.last_scan = (metrics, anomalies)
+            self.scheduler.observe(metrics.get('system', {}), alerts_open=bool(self.alert_manager.active))
+            
+            # Atualizar padrões comportamentais
+            self.update_behavioral_patterns(metrics)
+            
+            # Treinar modelos se tiver dados suficientes (fora deste loop)
+            if len(self.monitoring_data) >= 100 and not self.baseline_established:
+                self.establish_baseline_async()
+            
+            # Salvar dados periodicamente
+            if len(self.monitoring_data) % 10 == 0:
+                self.save_monitoring_data()
+
+    def scan(self, max_age: Optional[float] = None) -> Tuple[Dict, Dict]:
+        """(métricas, anomalias) para scans pedidos pela interface.
+
+        Com o monitoramento ativo, devolve a última coleta completa do loop se
+        ela tiver até `max_age` segundos (padrão: um intervalo de coleta
+        completa), sem dar aos detectores uma amostra fora do agendamento.
+        Mais velha que isso, a coleta completa do ciclo é antecipada para
+        agora e o loop só faz a próxima no intervalo seguinte. Sem
+        monitoramento, coleta e detecta na hora. Sempre pelo lock do pipeline.
+        """
+        if max_age is None:
+            max_age = self.full_collection_interval
+        with self._pipeline_lock:
+            if not self.monitoring_active:
+                metrics = self.collect_real_system_metrics()
+                return metrics, self.detect_real_system_anomalies(metrics)
+            now = time.time()
+            if self.last_scan is None or now - self._last_full_collection > max_age:
+                self._full_cycle(now)
+            return self.last_scan or ({}, {})
+
     def establish_baseline(self):
-        """Estabelece baseline REAL baseado em dados coletados"""
+        """Estabelece baseline REAL baseado em dados coletados (treina os três modelos)"""
         try:
-            if len(self.monitoring_data) < 50:
+            if len(self.monitoring_data) < MIN_BASELINE_SAMPLES:
                 return False
             
             logger.info("Estabelecendo baseline de comportamento normal...")
             
-            # Preparar dados para treinamento
-            features_list = []
-            for metrics in self.monitoring_data:
-                features = self.extract_features_for_anomaly_detection(metrics)
-                features_list.append(features)
-            
-            X = np.array(features_list)
+            # Preparar dados para treinamento (cópia da janela: o loop continua adicionando)
+            window = list(self.monitoring_data)
+            X = np.array([self.extract_features_for_anomaly_detection(metrics) for metrics in window])
             
-            # Normalizar features
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Treinar modelos de detecção de anomalias
-            self.system_anomaly_model.fit(X_scaled)
+            fitted = fit_baseline_models(X)
+            if fitted is None:
+                return False
             
-            # Marcar como estabelecido
-            self.baseline_established = True
+            self.apply_baseline_models(fitted)
             
             # Salvar modelos
             self.save_models()
             
-            logger.info(f"Baseline estabelecido com {len(self.monitoring_data)} amostras")
+            logger.info(f"Baseline estabelecido com {fitted['samples']} amostras "
+                        f"em {fitted['fit_seconds']:.2f}s")
             return True
             
         except Exception as e:
             logger.error(f"Erro ao estabelecer baseline: {e}")
             return False
 
-    def save_anomaly_alert(self, anomalies: Dict):
-        """Salva alerta de anomalia REAL"""
+    def establish_baseline_async(self) -> bool:
+        """Treina o baseline em uma thread separada (no máximo um treinamento por vez)"""
+        with self._baseline_lock:
+            if self._baseline_thread is not None and self._baseline_thread.is_alive():
+                return False
+            self._baseline_thread = threading.Thread(target=self.establish_baseline, daemon=True)
+            self._baseline_thread.start()
+        return True
+
+    def apply_baseline_models(self, fitted: Dict):
+        """Troca modelos e pontuação de uma vez (leituras concorrentes veem o conjunto antigo ou o novo)"""
+        models = fitted['models']
+        scorer = BaselineScorer(fitted['scaler'], models)
+        
+        self.scaler = fitted['scaler']
+        self.system_anomaly_model = models['system']
+        self.process_anomaly_model = models['process']
+        self.network_anomaly_model = models['network']
+        self.model_ready = scorer.ready
+        self.baseline_scorer = scorer
+        self.baseline_established = any(self.model_ready.values())
+
+    def save_anomaly_alert(self, anomalies: Dict, transitions: Optional[List[Dict]] = None):
+        """Salva alerta de anomalia REAL (com transições, só as anomalias que mudaram de estado)"""
         try:
+            if transitions is not None:
+                changed = {(t['type'], t['subject']) for t in transitions if t['transition'] != 'resolved'}
+                anomalies = {
+                    category: [a for a in anomaly_list if alert_key(a) in changed]
+                    for category, anomaly_list in anomalies.items()
+                    if isinstance(anomaly_list, list)
+                }
+            
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             alert_file = os.path.join(self.alerts_dir, f"anomaly_alert_{timestamp}.json")
             
             alert_data = {
                 'timestamp': datetime.now().isoformat(),
                 'anomalies': anomalies,
+                'transitions': transitions or [],
                 'total_anomalies': sum(len(v) for v in anomalies.values() if isinstance(v, list)),
                 'severity_levels': self.calculate_severity_summary(anomalies)
             }
@@ -632,7 +910,8 @@ class AnomalyDetector:
                     'last_24h_alerts': 0,
                     'severity_distribution': {'low': 0, 'medium': 0, 'high': 0, 'critical': 0},
                     'monitoring_active': self.monitoring_active,
-                    'baseline_established': self.baseline_established
+                    'baseline_established': self.baseline_established,
+                    'models_ready': self.model_ready
                 }
             
             # Alertas nas últimas 24 horas
@@ -658,8 +937,11 @@ class AnomalyDetector:
                 'last_alert': last_alert['timestamp'] if last_alert else None,
                 'monitoring_active': self.monitoring_active,
                 'baseline_established': self.baseline_established,
+                'models_ready': self.model_ready,
+                'active_alerts': self.alert_manager.get_summary()['active_alerts'],
+                'sampling': self.scheduler.get_stats(),
                 'data_points_collected': len(self.monitoring_data),
-                'behavioral_patterns_learned': len(self.behavioral_patterns)
+                'behavioral_patterns_learned': self.behavioral_model.buckets_learned(self.behavioral_min_samples)
             }
             
         except Exception as e:
@@ -825,14 +1107,17 @@ class AnomalyDetector:
 
     def save_monitoring_data(self):
         """Salva dados de monitoramento REAIS"""
+        if not self.persist:
+            return
         try:
             with open(self.monitoring_data_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     'monitoring_data': self.monitoring_data,
-                    'behavioral_patterns': self.behavioral_patterns,
                     'alert_thresholds': self.alert_thresholds,
                     'baseline_established': self.baseline_established
                 }, f, indent=2, ensure_ascii=False, default=str)
+            self.behavioral_model.save(self.behavioral_model_file)
+            self.process_profiles.save(self.process_profiles_file)
         except Exception as e:
             logger.error(f"Erro ao salvar dados de monitoramento: {e}")
 
@@ -843,16 +1128,35 @@ class AnomalyDetector:
                 with open(self.monitoring_data_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     self.monitoring_data = data.get('monitoring_data', [])
-                    self.behavioral_patterns = data.get('behavioral_patterns', {})
                     self.alert_thresholds.update(data.get('alert_thresholds', {}))
-                    self.baseline_established = data.get('baseline_established', False)
+                    self.scheduler.thresholds.update({
+                        'cpu_percent': self.alert_thresholds['cpu_threshold'],
+                        'memory_percent': self.alert_thresholds['memory_threshold'],
+                        'disk_percent': self.alert_thresholds['disk_threshold']
+                    })
+                    # baseline_established vem dos modelos carregados (load_models), não do JSON
+                    legacy_patterns = data.get('behavioral_patterns')
                 
                 logger.info(f"Carregados {len(self.monitoring_data)} pontos de monitoramento")
+            else:
+                legacy_patterns = None
+            
+            # Modelo comportamental: .npz próprio ou conversão do formato antigo por hora do dia
+            if os.path.exists(self.behavioral_model_file):
+                self.behavioral_model = BehavioralModel.load(self.behavioral_model_file)
+            elif legacy_patterns:
+                self.behavioral_model = BehavioralModel.from_legacy_patterns(legacy_patterns)
+            
+            if os.path.exists(self.process_profiles_file):
+                self.process_profiles = ProcessProfileStore.load(self.process_profiles_file)
+                logger.info(f"Carregados {len(self.process_profiles)} perfis de processos")
         except Exception as e:
             logger.error(f"Erro ao carregar dados de monitoramento: {e}")
 
     def save_models(self):
         """Salva modelos treinados"""
+        if not self.persist:
+            return
         try:
             model_files = {
                 'system_anomaly_model.pkl': self.system_anomaly_model,
@@ -887,14 +1191,27 @@ class AnomalyDetector:
             )
             
             if all_exist:
+                loaded = {}
                 for filename, attr_name in model_files.items():
                     filepath = os.path.join(self.models_dir, filename)
                     with open(filepath, 'rb') as f:
-                        setattr(self, attr_name, pickle.load(f))
+                        loaded[attr_name] = pickle.load(f)
                 
-                self.baseline_established = True
-                logger.info("Modelos de detecção carregados")
-                return True
+                # Pickles de versões antigas podem conter florestas nunca treinadas
+                if not is_fitted(loaded['scaler']):
+                    logger.info("Scaler salvo não foi treinado - baseline será refeito")
+                    return False
+                
+                self.apply_baseline_models({
+                    'scaler': loaded['scaler'],
+                    'models': {
+                        'system': loaded['system_anomaly_model'],
+                        'process': loaded['process_anomaly_model'],
+                        'network': loaded['network_anomaly_model']
+                    }
+                })
+                logger.info(f"Modelos de detecção carregados (prontos: {self.model_ready})")
+                return self.baseline_established
             
             return False
             
@@ -905,15 +1222,16 @@ class AnomalyDetector:
     def stop_monitoring(self):
         """Para o monitoramento"""
         self.monitoring_active = False
+        self.scheduler.wake()
         logger.info("Monitoramento de anomalias parado")
 
 # Funções utilitárias REAIS
 def quick_anomaly_scan() -> Dict:
     """Scan rápido REAL de anomalias"""
     try:
-        detector = AnomalyDetector()
-        metrics = detector.collect_real_system_metrics()
-        anomalies = detector.detect_real_system_anomalies(metrics)
+        # Instância compartilhada: reaproveita a última coleta do monitoramento quando houver
+        with borrow_service('anomaly_detector') as detector:
+            metrics, anomalies = detector.scan()
         
         # Contar anomalias
         total_anomalies = sum(len(v) for v in anomalies.values() if isinstance(v, list))
@@ -956,23 +1274,31 @@ def quick_anomaly_scan() -> Dict:
             'risk_score': min(100, total_anomalies * 10 + critical_count * 20),
             'anomalies': anomalies,
             'recommendations': recommendations,
-            'scan_timestamp': datetime.now().isoformat()
+            'scan_timestamp': datetime.now().isoformat(),
+            'metrics_timestamp': metrics.get('timestamp')
         }
         
     except Exception as e:
         logger.error(f"Erro no scan rápido: {e}")
         return {'error': str(e)}
 
+# Referência do monitoramento pedido por start_anomaly_monitoring (uma por processo)
+_monitoring_lease = ServiceLease()
+
 def start_anomaly_monitoring() -> bool:
     """Inicia monitoramento REAL de anomalias"""
     try:
-        detector = AnomalyDetector()
-        detector.start_monitoring()
+        # Monitoramento do detector compartilhado (idempotente)
+        _monitoring_lease.acquire('anomaly_detector', start=True)
         return True
     except Exception as e:
         logger.error(f"Erro ao iniciar monitoramento: {e}")
         return False
 
+def stop_anomaly_monitoring():
+    """Libera o monitoramento pedido por start_anomaly_monitoring (shutdown_services na saída)"""
+    _monitoring_lease.release_all()
+
 # Exemplo de uso
 if __name__ == "__main__":
     print("🔍 Testando Anomaly Detector 100% REAL...")
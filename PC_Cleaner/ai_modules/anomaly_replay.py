@@ -0,0 +1,258 @@
+# ai_modules/anomaly_replay.py - Replay/backtest do pipeline de anomalias sobre métricas gravadas
+"""
+Reprocessa métricas gravadas (monitoring_data.json ou trace JSON lines)
+pelo pipeline completo do AnomalyDetector o mais rápido possível, sem
+efeitos colaterais (persist=False: nenhum alerta, modelo ou dado é gravado).
+
+Relata os alertas produzidos, precisão/recall contra incidentes rotulados
+e o throughput do pipeline (amostras/s).
+
+Uso:
+    python ai_modules/anomaly_replay.py data/monitoring_data.json
+    python ai_modules/anomaly_replay.py trace.jsonl --incidents incidentes.json
+    python ai_modules/anomaly_replay.py trace.jsonl --cold --output relatorio.json
+
+Formato dos incidentes (lista JSON):
+    [{"start": "2024-05-01T10:00:00", "end": "2024-05-01T10:20:00",
+      "label": "vazamento de memória", "types": ["high_memory_usage"]}]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Iterable, Iterator
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.anomaly_detector import AnomalyDetector
+
+# Transições que contam como "alerta emitido" (as demais só atualizam um alerta existente)
+ALERT_TRANSITIONS = ('open', 'flapping')
+
+
+def iter_trace(path: str) -> Iterator[Dict]:
+    """Lê métricas de monitoring_data.json, de uma lista JSON ou de JSON lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+
+        if first == '[' or (first == '{' and not path.endswith('.jsonl')):
+            data = json.load(f)
+            samples = data.get('monitoring_data', []) if isinstance(data, dict) else data
+            for metrics in samples:
+                if isinstance(metrics, dict) and metrics.get('timestamp'):
+                    yield metrics
+            return
+
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            metrics = json.loads(line)
+            if metrics.get('timestamp'):
+                yield metrics
+
+
+def load_incidents(path: str) -> List[Dict]:
+    """Incidentes rotulados: janelas [start, end] com tipos de alerta esperados (opcional)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    incidents = []
+    for item in data:
+        incidents.append({
+            'label': item.get('label', ''),
+            'start': datetime.fromisoformat(item['start']),
+            'end': datetime.fromisoformat(item['end']),
+            'types': set(item.get('types', []))
+        })
+    return incidents
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def score_alerts(alerts: List[Dict], incidents: List[Dict], grace_minutes: float = 5.0) -> Dict:
+    """Precisão, recall e atraso de detecção dos alertas contra incidentes rotulados.
+
+    Um alerta é verdadeiro positivo se cair dentro de algum incidente
+    (com `grace_minutes` de tolerância após o fim) e, quando o incidente
+    lista tipos, se o tipo do alerta estiver entre eles.
+    """
+    grace = timedelta(minutes=grace_minutes)
+    true_positives = 0
+    first_detection: Dict[int, datetime] = {}
+
+    for alert in alerts:
+        moment = datetime.fromisoformat(alert['timestamp'])
+        matched = False
+        for i, incident in enumerate(incidents):
+            if not incident['start'] <= moment <= incident['end'] + grace:
+                continue
+            if incident['types'] and alert['type'] not in incident['types']:
+                continue
+            matched = True
+            if i not in first_detection or moment < first_detection[i]:
+                first_detection[i] = moment
+        if matched:
+            true_positives += 1
+
+    delays = [(first_detection[i] - incidents[i]['start']).total_seconds() for i in first_detection]
+    return {
+        'alerts': len(alerts),
+        'true_positives': true_positives,
+        'false_positives': len(alerts) - true_positives,
+        'precision': true_positives / len(alerts) if alerts else None,
+        'incidents': len(incidents),
+        'incidents_detected': len(first_detection),
+        'recall': len(first_detection) / len(incidents) if incidents else None,
+        'mean_detection_delay_seconds': sum(delays) / len(delays) if delays else None,
+        'missed_incidents': [incidents[i]['label'] for i in range(len(incidents)) if i not in first_detection]
+    }
+
+
+def replay(samples: Iterable[Dict], data_dir: str = "data", cold: bool = False,
+           incidents: Optional[List[Dict]] = None, train_baseline: bool = True,
+           grace_minutes: float = 5.0, progress_callback=None) -> Dict:
+    """Passa as amostras pelo pipeline completo de detecção e mede o resultado.
+
+    cold=False usa os modelos e perfis salvos em `data_dir`; cold=True parte
+    do zero (como uma instalação nova) e, com train_baseline, treina o
+    baseline no meio do replay como o loop de monitoramento faria.
+    """
+    temp_dir = tempfile.TemporaryDirectory() if cold else None
+    try:
+        detector = AnomalyDetector(data_dir=temp_dir.name if cold else data_dir,
+                                   auto_start=False, persist=False)
+        detector.monitoring_data = []
+
+        transitions: List[Dict] = []
+        detector.alert_manager.add_listener(transitions.append)
+
+        latencies = []
+        anomaly_counts: Dict[str, int] = {}
+        baseline_at = None
+        processed = 0
+        first_timestamp = last_timestamp = None
+
+        started = time.perf_counter()
+        for metrics in samples:
+            sample_start = time.perf_counter()
+
+            detector.monitoring_data.append(metrics)
+            if len(detector.monitoring_data) > 1440:
+                detector.monitoring_data = detector.monitoring_data[-1440:]
+
+            anomalies = detector.detect_real_system_anomalies(metrics)
+            detector.update_behavioral_patterns(metrics)
+
+            if train_baseline and not detector.baseline_established and len(detector.monitoring_data) >= 100:
+                if detector.establish_baseline():
+                    baseline_at = metrics['timestamp']
+
+            latencies.append(time.perf_counter() - sample_start)
+
+            for category, anomaly_list in anomalies.items():
+                if isinstance(anomaly_list, list):
+                    for anomaly in anomaly_list:
+                        anomaly_counts[anomaly.get('type', 'unknown')] = \
+                            anomaly_counts.get(anomaly.get('type', 'unknown'), 0) + 1
+
+            processed += 1
+            first_timestamp = first_timestamp or metrics['timestamp']
+            last_timestamp = metrics['timestamp']
+            if progress_callback and processed % 500 == 0:
+                progress_callback(processed)
+
+        elapsed = time.perf_counter() - started
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+    alerts = [t for t in transitions if t['transition'] in ALERT_TRANSITIONS]
+    alerts_by_type: Dict[str, int] = {}
+    for alert in alerts:
+        alerts_by_type[alert['type']] = alerts_by_type.get(alert['type'], 0) + 1
+
+    latencies.sort()
+    report = {
+        'samples': processed,
+        'period': {'start': first_timestamp, 'end': last_timestamp},
+        'mode': 'cold' if cold else 'warm',
+        'baseline_established_at': baseline_at,
+        'throughput': {
+            'elapsed_seconds': elapsed,
+            'samples_per_second': processed / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_ms': _percentile(latencies, 50) * 1000,
+            'latency_p99_ms': _percentile(latencies, 99) * 1000
+        },
+        'anomalies_by_type': anomaly_counts,
+        'alerts': len(alerts),
+        'alerts_by_type': alerts_by_type,
+        'transitions': len(transitions),
+        'alert_list': alerts
+    }
+    if incidents is not None:
+        report['evaluation'] = score_alerts(alerts, incidents, grace_minutes)
+    return report
+
+
+def print_report(report: Dict):
+    throughput = report['throughput']
+    print(f"\n🔁 Replay ({report['mode']}): {report['samples']} amostras "
+          f"de {report['period']['start']} a {report['period']['end']}")
+    print(f"   ⚡ {throughput['samples_per_second']:.0f} amostras/s "
+          f"(p50 {throughput['latency_p50_ms']:.2f} ms, p99 {throughput['latency_p99_ms']:.2f} ms)")
+    if report['baseline_established_at']:
+        print(f"   🧠 Baseline treinado em {report['baseline_established_at']}")
+    print(f"   🚨 {report['alerts']} alertas emitidos ({report['transitions']} transições)")
+    for alert_type, count in sorted(report['alerts_by_type'].items(), key=lambda item: -item[1]):
+        print(f"      • {alert_type}: {count}")
+
+    evaluation = report.get('evaluation')
+    if evaluation:
+        precision = evaluation['precision']
+        recall = evaluation['recall']
+        print(f"   🎯 Precisão: {precision:.1%}" if precision is not None else "   🎯 Precisão: -")
+        print(f"   🔎 Recall: {recall:.1%} ({evaluation['incidents_detected']}/{evaluation['incidents']} incidentes)"
+              if recall is not None else "   🔎 Recall: -")
+        if evaluation['mean_detection_delay_seconds'] is not None:
+            print(f"   ⏱️ Atraso médio de detecção: {evaluation['mean_detection_delay_seconds']:.0f}s")
+        for label in evaluation['missed_incidents']:
+            print(f"   ❌ Não detectado: {label}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay do pipeline de anomalias do PC Cleaner")
+    parser.add_argument('trace', help="monitoring_data.json, lista JSON ou JSON lines de métricas")
+    parser.add_argument('--data-dir', default="data", help="Modelos/perfis usados no modo padrão")
+    parser.add_argument('--cold', action='store_true', help="Parte do zero, sem modelos salvos")
+    parser.add_argument('--no-train', action='store_true', help="Não treina baseline durante o replay")
+    parser.add_argument('--incidents', help="Arquivo JSON de incidentes rotulados")
+    parser.add_argument('--grace-minutes', type=float, default=5.0)
+    parser.add_argument('--output', help="Arquivo JSON do relatório")
+    args = parser.parse_args(argv)
+
+    incidents = load_incidents(args.incidents) if args.incidents else None
+    report = replay(iter_trace(args.trace), data_dir=args.data_dir, cold=args.cold,
+                    incidents=incidents, train_baseline=not args.no_train,
+                    grace_minutes=args.grace_minutes)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n💾 Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
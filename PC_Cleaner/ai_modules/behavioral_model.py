@@ -0,0 +1,105 @@
+# ai_modules/behavioral_model.py - Modelo comportamental por hora da semana (agregados incrementais)
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('behavioral_model')
+
+HOURS_PER_WEEK = 168
+BEHAVIORAL_METRICS = ['cpu_percent', 'memory_percent']
+HISTOGRAM_BINS = 20  # Faixas de 5 pontos percentuais (quantis aproximados)
+
+
+def hour_of_week(moment: datetime) -> int:
+    """0 = segunda 00h ... 167 = domingo 23h"""
+    return moment.weekday() * 24 + moment.hour
+
+
+class BehavioralModel:
+    """Padrão de uso esperado para cada uma das 168 horas da semana.
+
+    Cada balde guarda contagem, média e M2 (Welford) por métrica, mais um
+    histograma de faixas fixas para quantis aproximados. Atualização O(1),
+    memória constante e persistência em um único .npz de poucos KB.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = list(metrics or BEHAVIORAL_METRICS)
+        shape = (HOURS_PER_WEEK, len(self.metrics))
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.histogram = np.zeros(shape + (HISTOGRAM_BINS,), dtype=np.uint32)
+
+    def _bin(self, value: float) -> int:
+        return int(min(HISTOGRAM_BINS - 1, max(0, value) * HISTOGRAM_BINS // 100))
+
+    def update(self, moment: datetime, values: Dict[str, float]):
+        """Adiciona uma amostra ao balde da hora da semana"""
+        bucket = hour_of_week(moment)
+        for m, metric in enumerate(self.metrics):
+            value = values.get(metric)
+            if value is None:
+                continue
+            self.count[bucket, m] += 1
+            delta = value - self.mean[bucket, m]
+            self.mean[bucket, m] += delta / self.count[bucket, m]
+            self.m2[bucket, m] += delta * (value - self.mean[bucket, m])
+            self.histogram[bucket, m, self._bin(value)] += 1
+
+    def expected(self, moment: datetime, metric: str) -> Tuple[int, float, float]:
+        """(amostras, média, desvio padrão) esperados para a métrica nesse horário"""
+        bucket = hour_of_week(moment)
+        m = self.metrics.index(metric)
+        count = int(self.count[bucket, m])
+        std = float(np.sqrt(self.m2[bucket, m] / (count - 1))) if count > 1 else 0.0
+        return count, float(self.mean[bucket, m]), std
+
+    def percentile_rank(self, moment: datetime, metric: str, value: float) -> Optional[float]:
+        """Fração aproximada das amostras do horário abaixo de `value`"""
+        bucket = hour_of_week(moment)
+        m = self.metrics.index(metric)
+        histogram = self.histogram[bucket, m]
+        total = histogram.sum()
+        if total == 0:
+            return None
+        return float(histogram[:self._bin(value)].sum() + histogram[self._bin(value)] / 2) / total
+
+    def buckets_learned(self, min_samples: int = 1) -> int:
+        return int((self.count.min(axis=1) >= min_samples).sum())
+
+    def save(self, path: str):
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, metrics=np.array(self.metrics), count=self.count, mean=self.mean,
+                 m2=self.m2, histogram=self.histogram)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BehavioralModel':
+        with np.load(path, allow_pickle=False) as data:
+            model = cls(data['metrics'].tolist())
+            model.count = data['count'].copy()
+            model.mean = data['mean'].copy()
+            model.m2 = data['m2'].copy()
+            model.histogram = data['histogram'].copy()
+        return model
+
+    @classmethod
+    def from_legacy_patterns(cls, patterns: Dict) -> 'BehavioralModel':
+        """Converte o formato antigo (até 30 amostras por hora do dia) usando os timestamps"""
+        model = cls()
+        for hour, pattern in patterns.items():
+            for sample in pattern.get('samples', []):
+                try:
+                    moment = datetime.fromisoformat(sample['timestamp'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                model.update(moment, {
+                    'cpu_percent': sample.get('cpu'),
+                    'memory_percent': sample.get('memory')
+                })
+        return model
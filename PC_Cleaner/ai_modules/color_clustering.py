@@ -0,0 +1,151 @@
+# ai_modules/color_clustering.py - K-means de cores amostrado, com semente fixa e atribuição por tabela
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.spatial_index import UnionFind
+
+LUT_BITS = 5  # 32 níveis por canal -> tabela de 32³ células
+
+
+def stratified_sample(pixels: np.ndarray, max_samples: int = 4096, grid: int = 16, seed: int = 0) -> np.ndarray:
+    """Amostra de pixels (N x C) espalhada pela tela: mesma quantidade de cada bloco de uma grade"""
+    height, width = pixels.shape[:2]
+    channels = pixels.shape[2] if pixels.ndim == 3 else 1
+    if height * width <= max_samples:
+        return pixels.reshape(-1, channels).astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    rows, cols = min(grid, height), min(grid, width)
+    per_cell = max(1, max_samples // (rows * cols))
+    y_edges = np.linspace(0, height, rows + 1).astype(int)
+    x_edges = np.linspace(0, width, cols + 1).astype(int)
+
+    ys, xs = [], []
+    for r in range(rows):
+        for c in range(cols):
+            ys.append(rng.integers(y_edges[r], y_edges[r + 1], per_cell))
+            xs.append(rng.integers(x_edges[c], x_edges[c + 1], per_cell))
+    return pixels[np.concatenate(ys), np.concatenate(xs)].reshape(-1, channels).astype(np.float32)
+
+
+def _squared_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return (points * points).sum(axis=1)[:, None] - 2 * points @ centers.T + (centers * centers).sum(axis=1)[None, :]
+
+
+def _kmeans_plus_plus(samples: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centers = [samples[rng.integers(len(samples))]]
+    closest = ((samples - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        index = rng.choice(len(samples), p=closest / total) if total > 0 else rng.integers(len(samples))
+        centers.append(samples[index])
+        closest = np.minimum(closest, ((samples - samples[index]) ** 2).sum(axis=1))
+    return np.array(centers, dtype=np.float32)
+
+
+def minibatch_kmeans(samples: np.ndarray, k: int = 8, batch_size: int = 256, iterations: int = 40,
+                     attempts: int = 3, refine_steps: int = 3, seed: int = 0) -> np.ndarray:
+    """Centros de K-means sobre uma amostra: k-means++ + mini-batch (Sculley) + poucas iterações de Lloyd.
+
+    Cada tentativa usa uma semente derivada de `seed` (resultado reprodutível);
+    fica a de menor inércia na amostra.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    k = min(k, len(samples))
+    best_centers, best_inertia = None, np.inf
+
+    for attempt in range(attempts):
+        rng = np.random.default_rng(seed + attempt)
+        centers = _kmeans_plus_plus(samples, k, rng)
+        counts = np.zeros(k, dtype=np.float64)
+
+        for _ in range(iterations):
+            batch = samples[rng.integers(0, len(samples), min(batch_size, len(samples)))]
+            nearest = _squared_distances(batch, centers).argmin(axis=1)
+            for cluster in np.unique(nearest):
+                members = batch[nearest == cluster]
+                counts[cluster] += len(members)
+                rate = len(members) / counts[cluster]  # taxa de aprendizado decrescente por centro
+                centers[cluster] += rate * (members.mean(axis=0) - centers[cluster])
+
+        for _ in range(refine_steps):
+            nearest = _squared_distances(samples, centers).argmin(axis=1)
+            for cluster in range(k):
+                members = samples[nearest == cluster]
+                if len(members):
+                    centers[cluster] = members.mean(axis=0)
+
+        inertia = float(np.maximum(_squared_distances(samples, centers).min(axis=1), 0).sum())
+        if inertia < best_inertia:
+            best_centers, best_inertia = centers.copy(), inertia
+
+    return best_centers
+
+
+class ColorClusters:
+    """Centros de cor (canais de 8 bits) e a tabela célula quantizada -> centro mais próximo.
+
+    A tabela tem 32³ células e é montada uma vez; atribuir um pixel vira
+    um deslocamento de bits e uma indexação. Para contar pixels por grupo nem
+    isso é preciso: basta o histograma das células ponderando a tabela.
+    """
+
+    def __init__(self, centers: np.ndarray, bits: int = LUT_BITS):
+        self.centers = np.asarray(centers, dtype=np.float32)
+        self.bits = bits
+        self._lut: Optional[np.ndarray] = None
+
+    @classmethod
+    def fit(cls, pixels: np.ndarray, k: int = 8, max_samples: int = 4096, seed: int = 0) -> 'ColorClusters':
+        return cls(minibatch_kmeans(stratified_sample(pixels, max_samples, seed=seed), k, seed=seed))
+
+    @property
+    def lut(self) -> np.ndarray:
+        if self._lut is None:
+            levels = 1 << self.bits
+            step = 256 >> self.bits
+            axis = np.arange(levels, dtype=np.float32) * step + step / 2  # centro de cada célula
+            grid = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+            self._lut = _squared_distances(grid, self.centers).argmin(axis=1).astype(np.uint8)
+        return self._lut
+
+    def _cell_index(self, pixels: np.ndarray) -> np.ndarray:
+        shift = 8 - self.bits
+        q = pixels.reshape(-1, 3) >> shift
+        return (q[:, 0].astype(np.int32) << (2 * self.bits)) | (q[:, 1].astype(np.int32) << self.bits) | q[:, 2]
+
+    def assign(self, pixels: np.ndarray) -> np.ndarray:
+        """Rótulo de cada pixel (mesmo formato espacial da entrada)"""
+        return self.lut[self._cell_index(pixels)].reshape(pixels.shape[:-1])
+
+    def cluster_sizes(self, pixels: np.ndarray) -> np.ndarray:
+        """Pixels por grupo, via histograma das células (sem rotular pixel a pixel)"""
+        hist = np.bincount(self._cell_index(pixels), minlength=1 << (3 * self.bits))
+        return np.bincount(self.lut, weights=hist, minlength=len(self.centers)).astype(np.int64)
+
+
+def count_distinct_regions(pixels: np.ndarray, k: int = 8, max_samples: int = 4096, seed: int = 0,
+                           min_share: float = 0.01, min_distance: float = 16.0) -> int:
+    """Grupos de cor visualmente distintos (1..k).
+
+    Dos k grupos do K-means contam só os que cobrem ao menos `min_share` dos
+    pixels; centros a menos de `min_distance` (distância euclidiana nos
+    canais de 8 bits) são o mesmo grupo. Assim uma tela lisa vale 1 e tons
+    quase iguais não viram regiões diferentes.
+    """
+    clusters = ColorClusters.fit(pixels, k, max_samples, seed)
+    sizes = clusters.cluster_sizes(pixels)
+    significant = clusters.centers[sizes >= max(1, min_share * sizes.sum())]
+    if len(significant) == 0:
+        return 0
+
+    # Ligação simples entre centros próximos (k pequeno: todos os pares)
+    groups = UnionFind(len(significant))
+    distances = np.sqrt(np.maximum(_squared_distances(significant, significant), 0))
+    for i, j in zip(*np.nonzero(np.triu(distances < min_distance, k=1))):
+        groups.union(int(i), int(j))
+    return max(groups.labels()) + 1
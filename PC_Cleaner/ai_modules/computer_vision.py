@@ -1,7 +1,6 @@
 # ai_modules/computer_vision.py - VERSÃO 100% REAL
 import cv2
 import numpy as np
-import pytesseract
 import os
 import json
 import logging
@@ -10,11 +9,20 @@ from typing import Dict, List, Tuple, Optional, Any
 import time
 from pathlib import Path
 import hashlib
-from PIL import Image, ImageGrab
+from PIL import Image
 import threading
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-# Configuração do pytesseract (ajustar path se necessário)
-# pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.image_context import ImageContext, ImageInput, histogram_moments
+from ai_modules.cv_graph import AnalyzerGraph
+from ai_modules.ocr_pipeline import OcrPipeline
+from ai_modules.incremental_cv import IncrementalDesktopAnalyzer
+from ai_modules.screen_capture import ScreenCapture
+from ai_modules.spatial_index import count_clusters, count_overlaps, box_of
+from ai_modules.screenshot_timeline import ScreenshotTimeline, list_screenshots
+from ai_modules.color_clustering import count_distinct_regions
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('computer_vision')
@@ -22,7 +30,19 @@ logger = logging.getLogger('computer_vision')
 class ComputerVision:
     """Sistema de Computer Vision 100% REAL - Análise visual completa"""
     
-    def __init__(self, data_dir: str = "data"):
+    # Escala (fração da resolução nativa) de que cada analisador precisa;
+    # métricas grosseiras rodam em 1/4, detecção geométrica em 1/2
+    ANALYZER_SCALES = {
+        'color_scheme': 0.25,
+        'spatial_organization': 0.25,
+        'layout_complexity': 0.25,
+        'region_clusters': 0.25,
+        'windows': 0.5,
+        'loading_indicators': 0.5
+    }
+    
+    def __init__(self, data_dir: str = "data", use_pyramid: bool = True, max_workers: Optional[int] = None,
+                 capture_backend: str = 'auto'):
         self.data_dir = data_dir
         self.screenshots_dir = os.path.join(data_dir, "screenshots")
         self.analysis_dir = os.path.join(data_dir, "cv_analysis")
@@ -34,39 +54,72 @@ class ComputerVision:
         # Histórico de análises REAIS
         self.analysis_history = []
         self.last_screenshot = None
+        
+        # Captura com buffers reaproveitados (mss se instalado, senão PIL); PNG gravado em background
+        self.screen_capture = ScreenCapture(capture_backend)
+        self._screenshot_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot_writer')
         self.last_analysis = None
         
         # Configurações de OCR
         self.ocr_config = r'--oem 3 --psm 6 -l por+eng'
+        self.ocr_pipeline = OcrPipeline(self.ocr_config)
+        
+        # Análise multi-resolução (False = tudo na resolução nativa)
+        self.use_pyramid = use_pyramid
+        
+        # Analisadores independentes rodam em paralelo (max_workers=1 = sequencial)
+        self.analyzer_graph = AnalyzerGraph(max_workers)
+        
+        # Modo incremental (criado na primeira análise incremental)
+        self.incremental_analyzer: Optional[IncrementalDesktopAnalyzer] = None
         
         # Carregar histórico existente
         self.load_analysis_history()
 
-    def capture_screenshot(self) -> Optional[np.ndarray]:
-        """Captura screenshot REAL da tela"""
+    def capture_screenshot(self, save: bool = True, region: Optional[Tuple[int, int, int, int]] = None,
+                           monitor: Optional[int] = None, scale: Optional[float] = None,
+                           reuse_buffer: bool = False) -> Optional[np.ndarray]:
+        """Captura screenshot REAL da tela (BGR).
+        
+        Por padrão o frame é do chamador (análises rodam em threads da GUI e
+        podem se sobrepor). reuse_buffer=True devolve um buffer do anel do
+        ScreenCapture, sobrescrito algumas capturas depois - só para quem o
+        consome antes da próxima captura. region = (left, top, largura,
+        altura), monitor = 0 (todas as telas) / 1 (principal) / ..., scale < 1
+        reduz na captura.
+        """
         try:
-            # Capturar usando PIL
-            screenshot_pil = ImageGrab.grab()
+            screenshot_bgr = self.screen_capture.capture(region=region, monitor=monitor, scale=scale,
+                                                         reuse_buffer=reuse_buffer)
             
-            # Converter para numpy array (OpenCV format)
-            screenshot_np = np.array(screenshot_pil)
-            screenshot_bgr = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
-            
-            # Salvar screenshot com timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            screenshot_path = os.path.join(self.screenshots_dir, f"screenshot_{timestamp}.png")
-            cv2.imwrite(screenshot_path, screenshot_bgr)
+            if save:
+                # Salvar screenshot com timestamp (cópia se o buffer for reutilizado)
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                screenshot_path = os.path.join(self.screenshots_dir, f"screenshot_{timestamp}.png")
+                pending = screenshot_bgr.copy() if reuse_buffer else screenshot_bgr
+                self._screenshot_writer.submit(self._write_screenshot, screenshot_path, pending)
             
             self.last_screenshot = screenshot_bgr
-            logger.info(f"Screenshot capturado: {screenshot_path}")
-            
             return screenshot_bgr
             
         except Exception as e:
             logger.error(f"Erro ao capturar screenshot: {e}")
             return None
 
-    def analyze_desktop_organization_real(self, image: np.ndarray = None) -> Dict:
+    def _write_screenshot(self, path: str, image: np.ndarray):
+        try:
+            cv2.imwrite(path, image)
+            logger.info(f"Screenshot capturado: {path}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar screenshot: {e}")
+
+    def _at_analyzer_scale(self, ctx: ImageContext, analyzer: str) -> ImageContext:
+        """Nível da pirâmide declarado para o analisador"""
+        if not self.use_pyramid:
+            return ctx.root
+        return ctx.at_scale(self.ANALYZER_SCALES.get(analyzer, 1.0))
+
+    def analyze_desktop_organization_real(self, image: ImageInput = None) -> Dict:
         """Análise REAL de organização do desktop"""
         try:
             if image is None:
@@ -74,27 +127,26 @@ class ComputerVision:
                 if image is None:
                     return {'error': 'Falha ao capturar screenshot'}
             
-            height, width = image.shape[:2]
-            
-            # Análise REAL de cores dominantes
-            colors_analysis = self.analyze_real_color_distribution(image)
-            
-            # Detecção REAL de ícones usando contornos
-            icons_analysis = self.detect_real_icons(image)
-            
-            # Detecção REAL de janelas usando bordas
-            windows_analysis = self.detect_real_windows(image)
-            
-            # Análise REAL de organização espacial
-            spatial_analysis = self.analyze_real_spatial_organization(image)
-            
-            # Calcular score REAL de organização
-            clutter_score = self.calculate_real_clutter_score(icons_analysis, windows_analysis, spatial_analysis)
-            
-            # Gerar recomendações REAIS
-            recommendations = self.generate_real_organization_recommendations(
-                clutter_score, icons_analysis, windows_analysis
-            )
+            # Pré-processamento compartilhado por todos os analisadores
+            ctx = ImageContext.ensure(image)
+            height, width = ctx.height, ctx.width
+            
+            # Cores, ícones (contornos), janelas (bordas) e organização espacial são
+            # independentes; score e recomendações esperam por eles
+            results = self.analyzer_graph.run({
+                'colors': (lambda: self.analyze_real_color_distribution(ctx), ()),
+                'icons': (lambda: self.detect_real_icons(ctx), ()),
+                'windows': (lambda: self.detect_real_windows(ctx), ()),
+                'spatial': (lambda: self.analyze_real_spatial_organization(ctx), ()),
+                'clutter': (self.calculate_real_clutter_score, ('icons', 'windows', 'spatial')),
+                'recommendations': (self.generate_real_organization_recommendations, ('clutter', 'icons', 'windows'))
+            }, name='desktop_organization')
+            colors_analysis = results['colors']
+            icons_analysis = results['icons']
+            windows_analysis = results['windows']
+            spatial_analysis = results['spatial']
+            clutter_score = results['clutter']
+            recommendations = results['recommendations']
             
             analysis_result = {
                 'timestamp': datetime.now().isoformat(),
@@ -116,28 +168,57 @@ class ComputerVision:
             logger.error(f"Erro na análise de organização: {e}")
             return {'error': str(e)}
 
-    def analyze_real_color_distribution(self, image: np.ndarray) -> Dict:
+    def analyze_desktop_changes_real(self, image: ImageInput = None) -> Dict:
+        """Análise REAL incremental: só os blocos alterados desde a captura anterior são reprocessados.
+        
+        Pensada para monitoramento periódico (a cada poucos segundos); não grava no histórico.
+        """
+        try:
+            if image is None:
+                # Monitoramento frequente: sem PNG e com buffer do anel (consumido antes da próxima captura)
+                image = self.capture_screenshot(save=False, reuse_buffer=True)
+                if image is None:
+                    return {'error': 'Falha ao capturar screenshot'}
+            
+            if self.incremental_analyzer is None:
+                self.incremental_analyzer = IncrementalDesktopAnalyzer(self)
+            
+            return self.incremental_analyzer.analyze(image)
+            
+        except Exception as e:
+            logger.error(f"Erro na análise incremental: {e}")
+            return {'error': str(e)}
+
+    def analyze_real_color_distribution(self, image: ImageInput) -> Dict:
         """Análise REAL da distribuição de cores"""
         try:
-            # Converter para HSV para melhor análise
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            ctx = ImageContext.ensure(image)
             
-            # Calcular histograma REAL
-            hist_h = cv2.calcHist([hsv], [0], None, [180], [0, 180])
-            hist_s = cv2.calcHist([hsv], [1], None, [256], [0, 256])
-            hist_v = cv2.calcHist([hsv], [2], None, [256], [0, 256])
+            # Histogramas REAIS do HSV (compartilhados, no nível grosseiro da pirâmide)
+            hists = self._at_analyzer_scale(ctx, 'color_scheme').hsv_hists
+            summary = self.summarize_color_histograms(hists['h'], hists['s'], hists['v'])
+            summary['total_unique_colors'] = ctx.root.unique_colors  # Redução criaria cores novas
+            return summary
             
+        except Exception as e:
+            logger.error(f"Erro na análise de cores: {e}")
+            return {}
+
+    def summarize_color_histograms(self, hist_h: np.ndarray, hist_s: np.ndarray, hist_v: np.ndarray) -> Dict:
+        """Resumo de cores a partir dos histogramas HSV (também usado com agregados por bloco)"""
+        try:
             # Encontrar cor dominante REAL
             dominant_hue = np.argmax(hist_h)
             dominant_saturation = np.argmax(hist_s)
             dominant_value = np.argmax(hist_v)
             
-            # Calcular variância REAL das cores
-            color_variance = np.var(hsv.reshape(-1, 3), axis=0)
+            # Média e variância REAIS das cores pelos momentos dos histogramas (sem varrer os pixels)
+            moments = [histogram_moments(hist) for hist in (hist_h, hist_s, hist_v)]
+            color_variance = [variance for _, variance in moments]
             
             # Detectar esquema de cores REAL
-            avg_saturation = np.mean(hsv[:, :, 1])
-            avg_value = np.mean(hsv[:, :, 2])
+            avg_saturation = moments[1][0]
+            avg_value = moments[2][0]
             
             # Classificar esquema de cores
             if avg_saturation < 50:
@@ -154,24 +235,28 @@ class ComputerVision:
                 'color_variance': [float(cv) for cv in color_variance],
                 'average_saturation': float(avg_saturation),
                 'average_brightness': float(avg_value),
-                'color_scheme': color_scheme,
-                'total_unique_colors': len(np.unique(image.reshape(-1, 3), axis=0))
+                'color_scheme': color_scheme
             }
             
         except Exception as e:
             logger.error(f"Erro na análise de cores: {e}")
             return {}
 
-    def detect_real_icons(self, image: np.ndarray) -> Dict:
+    def detect_real_icons(self, image: ImageInput) -> Dict:
         """Detecção REAL de ícones usando OpenCV"""
         try:
-            # Converter para escala de cinza
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            ctx = ImageContext.ensure(image)
             
-            # Aplicar threshold adaptativo
-            thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                         cv2.THRESH_BINARY, 11, 2)
+            # Threshold adaptativo sobre a escala de cinza
+            return self.analyze_icons_from_threshold(ctx.adaptive_threshold, ctx.height)
             
+        except Exception as e:
+            logger.error(f"Erro na detecção de ícones: {e}")
+            return {'total_icons': 0}
+
+    def analyze_icons_from_threshold(self, thresh: np.ndarray, screen_height: int) -> Dict:
+        """Ícones a partir de um threshold adaptativo já calculado (frame inteiro ou buffer incremental)"""
+        try:
             # Encontrar contornos
             contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
@@ -201,7 +286,7 @@ class ComputerVision:
                 # Calcular clusters REAIS
                 clusters = self.calculate_real_spatial_clusters(positions)
                 
-                distribution = "Concentrado" if len(clusters) <= 2 else "Espalhado"
+                distribution = "Concentrado" if clusters <= 2 else "Espalhado"
             else:
                 distribution = "Nenhum ícone detectado"
                 clusters = 0
@@ -209,7 +294,7 @@ class ComputerVision:
             return {
                 'total_icons': len(icon_contours),
                 'desktop_icons': len([icon for icon in icon_contours 
-                                    if icon['position'][1] < image.shape[0] * 0.9]),  # Não na barra de tarefas
+                                    if icon['position'][1] < screen_height * 0.9]),  # Não na barra de tarefas
                 'clusters': clusters,
                 'distribution': distribution,
                 'icon_details': icon_contours[:20],  # Primeiros 20 para não sobrecarregar
@@ -220,18 +305,20 @@ class ComputerVision:
             logger.error(f"Erro na detecção de ícones: {e}")
             return {'total_icons': 0}
 
-    def detect_real_windows(self, image: np.ndarray) -> Dict:
+    def detect_real_windows(self, image: ImageInput) -> Dict:
         """Detecção REAL de janelas usando análise de bordas"""
         try:
-            # Converter para escala de cinza
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            ctx = ImageContext.ensure(image)
+            full = ctx.root
+            level = self._at_analyzer_scale(ctx, 'windows')
+            scale = level.scale
             
-            # Detectar bordas usando Canny
-            edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+            # Bordas Canny
+            edges = level.edges
             
-            # Detectar linhas (bordas de janelas)
-            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100, 
-                                   minLineLength=100, maxLineGap=10)
+            # Detectar linhas (bordas de janelas); parâmetros em pixels acompanham a escala
+            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=max(20, int(100 * scale)),
+                                   minLineLength=max(10, int(100 * scale)), maxLineGap=max(2, int(round(10 * scale))))
             
             # Agrupar linhas em retângulos (janelas)
             windows = []
@@ -249,8 +336,13 @@ class ComputerVision:
                     elif abs(abs(angle) - 90) < 10:  # Linha vertical
                         vertical_lines.append(line[0])
                 
-                # Encontrar intersecções para formar retângulos
-                windows = self.find_real_window_rectangles(horizontal_lines, vertical_lines, image.shape)
+                # Encontrar intersecções para formar retângulos (e voltar à resolução original)
+                windows = self.find_real_window_rectangles(horizontal_lines, vertical_lines, level.image.shape,
+                                                           min_window_size=5000 * scale * scale)
+                for window in windows:
+                    window['position'] = tuple(level.to_full(v) for v in window['position'])
+                    window['size'] = tuple(level.to_full(v) for v in window['size'])
+                    window['area'] = int(level.to_full_area(window['area']))
             
             # Análise de sobreposição REAL
             overlapped = self.calculate_real_window_overlap(windows)
@@ -261,7 +353,7 @@ class ComputerVision:
                 'minimized_windows': max(0, len(windows) - len([w for w in windows if w['area'] > 10000])),
                 'overlapped_windows': overlapped,
                 'window_details': windows[:10],  # Primeiras 10 janelas
-                'screen_coverage': sum([w['area'] for w in windows]) / (image.shape[0] * image.shape[1])
+                'screen_coverage': sum([w['area'] for w in windows]) / full.total_pixels
             }
             
         except Exception as e:
@@ -269,39 +361,20 @@ class ComputerVision:
             return {'total_windows': 0}
 
     def calculate_real_spatial_clusters(self, positions: List[Tuple[int, int]]) -> int:
-        """Calcula clusters espaciais REAIS usando distância euclidiana"""
+        """Calcula clusters espaciais REAIS usando distância euclidiana (grade + union-find)"""
         try:
-            if len(positions) < 2:
-                return len(positions)
-            
-            clusters = []
             cluster_threshold = 100  # pixels
-            
-            for pos in positions:
-                assigned = False
-                for cluster in clusters:
-                    # Calcular distância mínima ao cluster
-                    min_dist = min([np.sqrt((pos[0] - cp[0])**2 + (pos[1] - cp[1])**2) 
-                                   for cp in cluster])
-                    if min_dist <= cluster_threshold:
-                        cluster.append(pos)
-                        assigned = True
-                        break
-                
-                if not assigned:
-                    clusters.append([pos])
-            
-            return len(clusters)
+            return count_clusters(positions, cluster_threshold)
             
         except Exception as e:
             logger.error(f"Erro no cálculo de clusters: {e}")
             return 1
 
-    def find_real_window_rectangles(self, h_lines: List, v_lines: List, shape: Tuple) -> List[Dict]:
-        """Encontra retângulos REAIS a partir de linhas horizontais e verticais"""
+    def find_real_window_rectangles(self, h_lines: List, v_lines: List, shape: Tuple,
+                                    min_window_size: float = 5000) -> List[Dict]:
+        """Encontra retângulos REAIS a partir de linhas horizontais e verticais (min_window_size em pixels²)"""
         try:
             windows = []
-            min_window_size = 5000  # pixels²
             
             # Simplificado: usar contornos para detectar retângulos
             # Em vez de tentar formar retângulos a partir de linhas individuais
@@ -333,52 +406,39 @@ class ComputerVision:
             return []
 
     def calculate_real_window_overlap(self, windows: List[Dict]) -> int:
-        """Calcula sobreposição REAL entre janelas"""
+        """Calcula sobreposição REAL entre janelas (pares com área em comum, por varredura)"""
         try:
-            overlapped_count = 0
-            
-            for i, window1 in enumerate(windows):
-                for j, window2 in enumerate(windows[i+1:], i+1):
-                    # Verificar se há sobreposição
-                    x1, y1 = window1['position']
-                    w1, h1 = window1['size']
-                    x2, y2 = window2['position']
-                    w2, h2 = window2['size']
-                    
-                    # Calcular área de sobreposição
-                    overlap_x = max(0, min(x1 + w1, x2 + w2) - max(x1, x2))
-                    overlap_y = max(0, min(y1 + h1, y2 + h2) - max(y1, y2))
-                    overlap_area = overlap_x * overlap_y
-                    
-                    if overlap_area > 0:
-                        overlapped_count += 1
-            
-            return overlapped_count
+            return count_overlaps([box_of(window) for window in windows])
             
         except Exception as e:
             logger.error(f"Erro no cálculo de sobreposição: {e}")
             return 0
 
-    def analyze_real_spatial_organization(self, image: np.ndarray) -> Dict:
-        """Análise REAL de organização espacial"""
+    def analyze_real_spatial_organization(self, image: ImageInput) -> Dict:
+        """Análise REAL de organização espacial (calculada uma vez por frame)"""
+        ctx = ImageContext.ensure(image).root
+        level = self._at_analyzer_scale(ctx, 'spatial_organization')
+        return ctx.get('spatial_organization', lambda: self._compute_spatial_organization(level))
+
+    def _compute_spatial_organization(self, ctx: ImageContext) -> Dict:
         try:
-            height, width = image.shape[:2]
+            image, gray = ctx.image, ctx.gray
+            height, width = ctx.height, ctx.width
             
             # Dividir imagem em quadrantes
             quad_h, quad_w = height // 2, width // 2
             
             quadrants = {
-                'top_left': image[0:quad_h, 0:quad_w],
-                'top_right': image[0:quad_h, quad_w:width],
-                'bottom_left': image[quad_h:height, 0:quad_w],
-                'bottom_right': image[quad_h:height, quad_w:width]
+                'top_left': gray[0:quad_h, 0:quad_w],
+                'top_right': gray[0:quad_h, quad_w:width],
+                'bottom_left': gray[quad_h:height, 0:quad_w],
+                'bottom_right': gray[quad_h:height, quad_w:width]
             }
             
             # Analisar densidade em cada quadrante
             quadrant_analysis = {}
-            for name, quad in quadrants.items():
+            for name, gray_quad in quadrants.items():
                 # Calcular densidade baseada em variância de cores
-                gray_quad = cv2.cvtColor(quad, cv2.COLOR_BGR2GRAY)
                 density = np.var(gray_quad)
                 quadrant_analysis[name] = {
                     'density': float(density),
@@ -401,7 +461,7 @@ class ComputerVision:
             return {
                 'quadrant_density': quadrant_analysis,
                 'symmetry_score': float(symmetry_score),
-                'layout_complexity': self.calculate_real_layout_complexity(image),
+                'layout_complexity': self.calculate_real_layout_complexity(ctx),
                 'balance_score': self.calculate_real_balance_score(quadrant_analysis)
             }
             
@@ -409,16 +469,22 @@ class ComputerVision:
             logger.error(f"Erro na análise espacial: {e}")
             return {}
 
-    def calculate_real_layout_complexity(self, image: np.ndarray) -> float:
+    def calculate_real_layout_complexity(self, image: ImageInput) -> float:
         """Calcula complexidade REAL do layout"""
         try:
-            # Converter para escala de cinza
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            level = self._at_analyzer_scale(ImageContext.ensure(image), 'layout_complexity')
             
-            # Calcular entropia como medida de complexidade
-            hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-            hist = hist.flatten()
-            hist = hist / hist.sum()  # Normalizar
+            return self.layout_complexity_from_histogram(level.gray_hist)
+            
+        except Exception as e:
+            logger.error(f"Erro no cálculo de complexidade: {e}")
+            return 50.0
+
+    def layout_complexity_from_histogram(self, gray_hist: np.ndarray) -> float:
+        """Complexidade (entropia normalizada) a partir do histograma de cinza"""
+        try:
+            # Calcular entropia do histograma de cinza como medida de complexidade
+            hist = gray_hist / gray_hist.sum()  # Normalizar
             
             # Calcular entropia
             entropy = -np.sum([p * np.log2(p) for p in hist if p > 0])
@@ -519,7 +585,7 @@ class ComputerVision:
             logger.error(f"Erro ao gerar recomendações: {e}")
             return ["Erro ao analisar organização"]
 
-    def extract_text_from_screen_real(self, image: np.ndarray = None) -> Dict:
+    def extract_text_from_screen_real(self, image: ImageInput = None) -> Dict:
         """Extração REAL de texto usando OCR"""
         try:
             if image is None:
@@ -527,36 +593,12 @@ class ComputerVision:
                 if image is None:
                     return {'error': 'Falha ao capturar screenshot'}
             
-            # Pré-processamento para melhorar OCR
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Aplicar threshold para melhorar contraste
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Usar pytesseract para extrair texto REAL
+            # OCR REAL: threshold de Otsu, só nas regiões com texto, um image_to_data por região
             try:
-                # Extrair texto com configurações otimizadas
-                text = pytesseract.image_to_string(thresh, config=self.ocr_config)
-                
-                # Extrair dados detalhados
-                data = pytesseract.image_to_data(thresh, config=self.ocr_config, output_type=pytesseract.Output.DICT)
-                
-                # Processar resultados
-                words = []
-                confidences = []
-                
-                for i in range(len(data['text'])):
-                    word = data['text'][i].strip()
-                    conf = data['conf'][i]
-                    
-                    if word and conf > 30:  # Filtrar palavras com baixa confiança
-                        words.append({
-                            'text': word,
-                            'confidence': conf,
-                            'position': (data['left'][i], data['top'][i]),
-                            'size': (data['width'][i], data['height'][i])
-                        })
-                        confidences.append(conf)
+                ocr = self.ocr_pipeline.recognize(image)
+                text = ocr['text']
+                words = ocr['words']
+                confidences = [w['confidence'] for w in words]
                 
                 # Estatísticas REAIS
                 lines = [line.strip() for line in text.split('\n') if line.strip()]
@@ -590,7 +632,7 @@ class ComputerVision:
             logger.error(f"Erro na extração de texto: {e}")
             return {'error': str(e)}
 
-    def detect_visual_problems_real(self, image: np.ndarray = None) -> Dict:
+    def detect_visual_problems_real(self, image: ImageInput = None) -> Dict:
         """Detecção REAL de problemas visuais"""
         try:
             if image is None:
@@ -598,29 +640,28 @@ class ComputerVision:
                 if image is None:
                     return {'error': 'Falha ao capturar screenshot'}
             
+            ctx = ImageContext.ensure(image)
+            
+            # Diálogos de erro (cores + OCR), janelas suspeitas, anomalias visuais e
+            # indicadores de performance são independentes entre si
+            results = self.analyzer_graph.run({
+                'error_dialogs': (lambda: self.detect_real_error_dialogs(ctx), ()),
+                'suspicious_windows': (lambda: self.detect_real_suspicious_windows(ctx), ()),
+                'visual_anomalies': (lambda: self.detect_real_visual_anomalies(ctx), ()),
+                'performance_indicators': (lambda: self.detect_real_performance_indicators(ctx), ())
+            }, name='visual_problems')
+            error_dialogs = results['error_dialogs']
+            suspicious_windows = results['suspicious_windows']
+            visual_anomalies = results['visual_anomalies']
+            performance_indicators = results['performance_indicators']
+            
             problems = {
-                'error_dialogs': [],
-                'suspicious_windows': [],
-                'visual_anomalies': [],
-                'performance_indicators': []
+                'error_dialogs': error_dialogs,
+                'suspicious_windows': suspicious_windows,
+                'visual_anomalies': visual_anomalies,
+                'performance_indicators': performance_indicators
             }
             
-            # Detectar diálogos de erro usando template matching e análise de cores
-            error_dialogs = self.detect_real_error_dialogs(image)
-            problems['error_dialogs'] = error_dialogs
-            
-            # Detectar janelas suspeitas
-            suspicious_windows = self.detect_real_suspicious_windows(image)
-            problems['suspicious_windows'] = suspicious_windows
-            
-            # Detectar anomalias visuais
-            visual_anomalies = self.detect_real_visual_anomalies(image)
-            problems['visual_anomalies'] = visual_anomalies
-            
-            # Detectar indicadores de performance
-            performance_indicators = self.detect_real_performance_indicators(image)
-            problems['performance_indicators'] = performance_indicators
-            
             # Salvar análise
             analysis_result = {
                 'timestamp': datetime.now().isoformat(),
@@ -637,18 +678,27 @@ class ComputerVision:
             logger.error(f"Erro na detecção de problemas: {e}")
             return {'error': str(e)}
 
-    def detect_real_error_dialogs(self, image: np.ndarray) -> List[Dict]:
+    def detect_real_error_dialogs(self, image: ImageInput) -> List[Dict]:
         """Detecta diálogos de erro REAIS"""
         try:
-            error_dialogs = []
+            ctx = ImageContext.ensure(image)
             
-            # Converter para HSV para detecção de cores
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            # Detectar cores típicas de erro (vermelho) no HSV
+            return self.find_error_dialogs_in_mask(ctx.image, self.error_color_mask(ctx.hsv))
             
-            # Detectar cores típicas de erro (vermelho)
-            red_lower = np.array([0, 50, 50])
-            red_upper = np.array([10, 255, 255])
-            red_mask = cv2.inRange(hsv, red_lower, red_upper)
+        except Exception as e:
+            logger.error(f"Erro na detecção de diálogos: {e}")
+            return []
+
+    @staticmethod
+    def error_color_mask(hsv: np.ndarray) -> np.ndarray:
+        """Máscara das cores típicas de erro (vermelho)"""
+        return cv2.inRange(hsv, np.array([0, 50, 50]), np.array([10, 255, 255]))
+
+    def find_error_dialogs_in_mask(self, image: np.ndarray, red_mask: np.ndarray) -> List[Dict]:
+        """Diálogos de erro a partir da máscara vermelha (OCR das regiões via cache por conteúdo)"""
+        try:
+            error_dialogs = []
             
             # Encontrar contornos vermelhos
             contours, _ = cv2.findContours(red_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -661,9 +711,9 @@ class ComputerVision:
                     # Extrair região para análise
                     region = image[y:y+h, x:x+w]
                     
-                    # Tentar extrair texto da região
+                    # Tentar extrair texto da região (em cache pelo conteúdo)
                     try:
-                        text = pytesseract.image_to_string(region, config=self.ocr_config)
+                        text = self.ocr_pipeline.read_text(region)
                         
                         # Verificar se contém palavras relacionadas a erro
                         error_keywords = ['error', 'erro', 'falha', 'problem', 'warning', 'aviso']
@@ -691,18 +741,16 @@ class ComputerVision:
             logger.error(f"Erro na detecção de diálogos: {e}")
             return []
 
-    def detect_real_suspicious_windows(self, image: np.ndarray) -> List[Dict]:
+    def detect_real_suspicious_windows(self, image: ImageInput) -> List[Dict]:
         """Detecta janelas suspeitas REAIS"""
         try:
+            ctx = ImageContext.ensure(image)
             suspicious = []
             
-            # Detectar janelas muito pequenas ou muito grandes
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Detectar janelas muito pequenas ou muito grandes (contornos das bordas Canny)
+            contours = ctx.edge_contours
             
-            height, width = image.shape[:2]
+            height, width = ctx.height, ctx.width
             
             for contour in contours:
                 area = cv2.contourArea(contour)
@@ -732,15 +780,15 @@ class ComputerVision:
             logger.error(f"Erro na detecção de janelas suspeitas: {e}")
             return []
 
-    def detect_real_visual_anomalies(self, image: np.ndarray) -> List[Dict]:
+    def detect_real_visual_anomalies(self, image: ImageInput) -> List[Dict]:
         """Detecta anomalias visuais REAIS"""
         try:
+            ctx = ImageContext.ensure(image)
             anomalies = []
             
-            # Detectar pixels mortos (pretos em grandes áreas)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            black_pixels = np.sum(gray == 0)
-            total_pixels = gray.shape[0] * gray.shape[1]
+            # Detectar pixels mortos (pretos em grandes áreas): contagem do histograma de cinza
+            black_pixels = int(ctx.gray_hist[0])
+            total_pixels = ctx.total_pixels
             
             if black_pixels / total_pixels > 0.1:  # Mais de 10% preto
                 anomalies.append({
@@ -750,8 +798,7 @@ class ComputerVision:
                 })
             
             # Detectar linhas estranhas ou artifacts
-            edges = cv2.Canny(gray, 50, 150)
-            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, minLineLength=200, maxLineGap=5)
+            lines = cv2.HoughLinesP(ctx.edges, 1, np.pi/180, threshold=50, minLineLength=200, maxLineGap=5)
             
             if lines is not None and len(lines) > 100:
                 anomalies.append({
@@ -760,11 +807,8 @@ class ComputerVision:
                     'severity': 'low'
                 })
             
-            # Detectar cores anômalas
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Detectar saturação muito alta (cores artificiais)
-            high_saturation = np.sum(hsv[:, :, 1] > 200)
+            # Detectar saturação muito alta (cores artificiais): cauda do histograma de saturação
+            high_saturation = ctx.hsv_hists['s'][201:].sum()
             if high_saturation / total_pixels > 0.3:
                 anomalies.append({
                     'type': 'unnatural_colors',
@@ -778,20 +822,23 @@ class ComputerVision:
             logger.error(f"Erro na detecção de anomalias: {e}")
             return []
 
-    def detect_real_performance_indicators(self, image: np.ndarray) -> List[Dict]:
+    def detect_real_performance_indicators(self, image: ImageInput) -> List[Dict]:
         """Detecta indicadores REAIS de problemas de performance"""
         try:
+            ctx = ImageContext.ensure(image)
+            image = ctx.image
             indicators = []
             
             # Detectar indicadores visuais de lag ou travamento
             
             # 1. Detectar cursor de loading/wait
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
             # Template matching para cursor de loading (simplificado)
-            # Detectar áreas circulares que podem ser spinners
-            circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, 1, 20, 
-                                     param1=50, param2=30, minRadius=5, maxRadius=50)
+            # Detectar áreas circulares que podem ser spinners (raios em pixels acompanham a escala)
+            level = self._at_analyzer_scale(ctx, 'loading_indicators')
+            scale = level.scale
+            circles = cv2.HoughCircles(level.gray, cv2.HOUGH_GRADIENT, 1, max(5, int(20 * scale)),
+                                     param1=50, param2=30, minRadius=max(2, int(round(5 * scale))),
+                                     maxRadius=max(4, int(50 * scale)))
             
             if circles is not None and len(circles[0]) > 2:
                 indicators.append({
@@ -801,9 +848,9 @@ class ComputerVision:
                 })
             
             # 2. Detectar janelas "Não Respondendo"
-            # Usar OCR para detectar texto relacionado
+            # Usar OCR para detectar texto relacionado (mesmo resultado do OCR da tela, por frame)
             try:
-                text = pytesseract.image_to_string(image, config=self.ocr_config)
+                text = self.ocr_pipeline.recognize(ctx)['text']
                 freeze_keywords = ['não responde', 'not responding', 'travado', 'frozen']
                 
                 if any(keyword in text.lower() for keyword in freeze_keywords):
@@ -817,8 +864,7 @@ class ComputerVision:
             
             # 3. Detectar alto uso de CPU visual (ventilador, temperatura)
             # Buscar por indicadores visuais de temperatura/CPU
-            red_areas = cv2.inRange(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), 
-                                   np.array([0, 100, 100]), np.array([10, 255, 255]))
+            red_areas = cv2.inRange(ctx.hsv, np.array([0, 100, 100]), np.array([10, 255, 255]))
             red_ratio = np.sum(red_areas > 0) / (image.shape[0] * image.shape[1])
             
             if red_ratio > 0.05:  # Mais de 5% vermelho pode indicar alertas
@@ -857,8 +903,8 @@ class ComputerVision:
             # Calcular diferença REAL
             diff = cv2.absdiff(img1, img2)
             
-            # Calcular métricas de similaridade
-            mse = np.mean((img1.astype(float) - img2.astype(float)) ** 2)
+            # Calcular métricas de similaridade (soma dos quadrados em OpenCV, sem cópias float64)
+            mse = cv2.norm(img1, img2, cv2.NORM_L2SQR) / img1.size
             similarity_score = 1 - (mse / (255 ** 2))  # Normalizar para 0-1
             
             # Detectar regiões de mudança
@@ -911,7 +957,24 @@ class ComputerVision:
             logger.error(f"Erro na comparação de screenshots: {e}")
             return {'error': str(e)}
 
-    def analyze_interface_efficiency_real(self, image: np.ndarray = None) -> Dict:
+    def compare_screenshot_timeline_real(self, directory: Optional[str] = None,
+                                         start: Optional[datetime] = None,
+                                         end: Optional[datetime] = None) -> Dict:
+        """Comparação REAL em lote: todos os screenshots do período, cada um contra o anterior"""
+        try:
+            items = list_screenshots(directory or self.screenshots_dir, start, end)
+            if len(items) < 2:
+                return {'error': 'São necessários ao menos dois screenshots no período'}
+            
+            report = ScreenshotTimeline().analyze(items)
+            self.save_analysis_result({k: v for k, v in report.items() if k != 'series'}, 'screenshot_timeline')
+            return report
+            
+        except Exception as e:
+            logger.error(f"Erro na comparação da linha do tempo: {e}")
+            return {'error': str(e)}
+
+    def analyze_interface_efficiency_real(self, image: ImageInput = None) -> Dict:
         """Análise REAL de eficiência da interface"""
         try:
             if image is None:
@@ -919,19 +982,19 @@ class ComputerVision:
                 if image is None:
                     return {'error': 'Falha ao capturar screenshot'}
             
-            # Análise de layout
-            layout_analysis = self.analyze_real_spatial_organization(image)
+            ctx = ImageContext.ensure(image)
             
-            # Análise de usabilidade
-            usability_metrics = self.calculate_real_usability_metrics(image)
-            
-            # Score de acessibilidade
-            accessibility_score = self.calculate_real_accessibility_score(image)
-            
-            # Sugestões de otimização
-            optimization_suggestions = self.generate_real_interface_suggestions(
-                layout_analysis, usability_metrics, accessibility_score
-            )
+            # Layout, usabilidade e acessibilidade em paralelo; sugestões no final
+            results = self.analyzer_graph.run({
+                'layout': (lambda: self.analyze_real_spatial_organization(ctx), ()),
+                'usability': (lambda: self.calculate_real_usability_metrics(ctx), ()),
+                'accessibility': (lambda: self.calculate_real_accessibility_score(ctx), ()),
+                'suggestions': (self.generate_real_interface_suggestions, ('layout', 'usability', 'accessibility'))
+            }, name='interface_efficiency')
+            layout_analysis = results['layout']
+            usability_metrics = results['usability']
+            accessibility_score = results['accessibility']
+            optimization_suggestions = results['suggestions']
             
             result = {
                 'accessibility_score': accessibility_score,
@@ -951,27 +1014,25 @@ class ComputerVision:
             logger.error(f"Erro na análise de eficiência: {e}")
             return {'error': str(e)}
 
-    def calculate_real_usability_metrics(self, image: np.ndarray) -> Dict:
+    def calculate_real_usability_metrics(self, image: ImageInput) -> Dict:
         """Calcula métricas REAIS de usabilidade"""
         try:
-            # Análise de contraste
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            contrast = gray.std()
+            ctx = ImageContext.ensure(image)
+            
+            # Análise de contraste (desvio padrão do cinza pelo histograma)
+            contrast = np.sqrt(histogram_moments(ctx.gray_hist)[1])
             
             # Análise de densidade de informação
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
+            edges = ctx.edges
+            edge_density = np.count_nonzero(edges) / ctx.total_pixels
             
-            # Análise de variância de cores
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            color_variance = np.var(hsv.reshape(-1, 3), axis=0)
+            # Análise de variância de cores (momentos dos histogramas HSV)
+            color_variance = [histogram_moments(hist)[1] for hist in ctx.hsv_hists.values()]
             
             # Detectar regiões distintas
-            # Usar clustering k-means para identificar regiões
-            data = hsv.reshape(-1, 3)
-            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
-            _, labels, centers = cv2.kmeans(data.astype(np.float32), 8, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-            distinct_regions = len(np.unique(labels))
+            # K-means (8 grupos) sobre uma amostra estratificada do HSV, com semente fixa;
+            # contam os grupos com área relevante e cores de fato distintas (1 = tela lisa)
+            distinct_regions = count_distinct_regions(self._at_analyzer_scale(ctx, 'region_clusters').hsv, k=8)
             
             return {
                 'contrast_level': float(contrast),
@@ -985,11 +1046,13 @@ class ComputerVision:
             logger.error(f"Erro nas métricas de usabilidade: {e}")
             return {}
 
-    def calculate_real_accessibility_score(self, image: np.ndarray) -> float:
+    def calculate_real_accessibility_score(self, image: ImageInput) -> float:
         """Calcula score REAL de acessibilidade"""
         try:
+            ctx = ImageContext.ensure(image)
+            
             # Análise de contraste para acessibilidade
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = ctx.gray
             
             # Calcular contraste local
             kernel = np.ones((5, 5), np.float32) / 25
@@ -1006,12 +1069,11 @@ class ComputerVision:
             else:
                 contrast_score = max(0, 100 - ((avg_contrast - 150) / 100 * 50))
             
-            # Análise de tamanho de elementos (via detecção de contornos)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Análise de tamanho de elementos (via contornos das bordas)
+            areas = [cv2.contourArea(contour) for contour in ctx.edge_contours]
             
             # Calcular tamanhos médios dos elementos
-            element_sizes = [cv2.contourArea(contour) for contour in contours if cv2.contourArea(contour) > 100]
+            element_sizes = [area for area in areas if area > 100]
             
             if element_sizes:
                 avg_element_size = np.mean(element_sizes)
@@ -1057,11 +1119,11 @@ class ComputerVision:
             if symmetry < 30:
                 suggestions.append("Melhorar simetria e balanceamento visual")
             
-            # Sugestões baseadas em regiões distintas
+            # Sugestões baseadas em regiões distintas (grupos de cor distintos, 1 a 8)
             regions = usability.get('distinct_regions', 5)
             if regions > 10:
                 suggestions.append("Muitas regiões distintas - unificar design")
-            elif regions < 3:
+            elif regions < 2:
                 suggestions.append("Poucas regiões distintas - criar mais separação visual")
             
             if not suggestions:
@@ -1080,17 +1142,20 @@ class ComputerVision:
             report_path = os.path.join(self.analysis_dir, f"visual_report_{timestamp}.html")
             
             # Capturar screenshot atual se não fornecido
-            current_screenshot = self.capture_screenshot()
+            current_screenshot = self.capture_screenshot(save=False)  # Gravado abaixo com o nome do relatório
             screenshot_filename = f"report_screenshot_{timestamp}.png"
             screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
             
             if current_screenshot is not None:
                 cv2.imwrite(screenshot_path, current_screenshot)
             
-            # Gerar análises REAIS
-            desktop_analysis = self.analyze_desktop_organization_real(current_screenshot)
-            interface_analysis = self.analyze_interface_efficiency_real(current_screenshot)
-            problems = self.detect_visual_problems_real(current_screenshot)
+            # Gerar análises REAIS sobre um único contexto (cada transformação é feita uma vez)
+            ctx = ImageContext(current_screenshot) if current_screenshot is not None else None
+            desktop_analysis = self.analyze_desktop_organization_real(ctx)
+            interface_analysis = self.analyze_interface_efficiency_real(ctx)
+            problems = self.detect_visual_problems_real(ctx)
+            if ctx is not None:
+                logger.info(f"Transformações calculadas no relatório: {dict(ctx.compute_counts)}")
             
             # Criar HTML do relatório
             html_content = f"""
@@ -1281,6 +1346,11 @@ class ComputerVision:
                 confidence = result.get('confidence', 0)
                 return f"Palavras: {words}, Confiança: {confidence:.1f}%"
             
+            elif analysis_type == 'screenshot_timeline':
+                pairs = result.get('pairs', 0)
+                intensity = result.get('mean_change_intensity', 0)
+                return f"Pares comparados: {pairs}, Mudança média: {intensity:.3f}"
+            
             else:
                 return "Análise realizada"
                 
@@ -1328,7 +1398,10 @@ class ComputerVision:
                 'last_analysis': last_analysis.get('timestamp'),
                 'last_analysis_type': last_analysis.get('type'),
                 'screenshots_captured': len([f for f in os.listdir(self.screenshots_dir) 
-                                           if f.endswith('.png')])
+                                           if f.endswith('.png')]),
+                'last_parallel_run': self.analyzer_graph.get_stats(),
+                'capture': self.screen_capture.get_stats(),
+                'ocr': self.ocr_pipeline.get_stats()
             }
             
         except Exception as e:
@@ -1367,10 +1440,11 @@ def capture_and_analyze() -> Dict:
         if screenshot is None:
             return {'error': 'Falha ao capturar screenshot'}
         
-        # Executar todas as análises REAIS
-        desktop_org = cv_system.analyze_desktop_organization_real(screenshot)
-        interface_eff = cv_system.analyze_interface_efficiency_real(screenshot)
-        visual_problems = cv_system.detect_visual_problems_real(screenshot)
+        # Executar todas as análises REAIS (pré-processamento compartilhado)
+        ctx = ImageContext(screenshot)
+        desktop_org = cv_system.analyze_desktop_organization_real(ctx)
+        interface_eff = cv_system.analyze_interface_efficiency_real(ctx)
+        visual_problems = cv_system.detect_visual_problems_real(ctx)
         
         return {
             'desktop_organization': desktop_org,
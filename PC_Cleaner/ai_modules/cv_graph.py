@@ -0,0 +1,104 @@
+# ai_modules/cv_graph.py - Execução concorrente dos analisadores de Computer Vision
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('cv_graph')
+
+# nome -> (função, dependências); a função recebe os resultados das dependências, na ordem
+GraphTasks = Dict[str, Tuple[Callable[..., Any], Sequence[str]]]
+
+
+class AnalyzerGraph:
+    """Grafo de analisadores executado em um pool de threads limitado.
+
+    Os analisadores são kernels OpenCV/NumPy que liberam o GIL, então os
+    independentes rodam em paralelo; os artefatos compartilhados (cinza, HSV,
+    bordas, pirâmide) vêm do ImageContext, que já serializa o primeiro cálculo
+    de cada um. Uma tarefa só é enviada ao pool quando todas as suas
+    dependências terminaram, então nenhuma thread fica bloqueada esperando
+    outra tarefa e o pool não entra em deadlock. Exceções são propagadas ao
+    chamador.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.last_run: Dict[str, Any] = {}
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cv_analyzer')
+            return self._pool
+
+    def run(self, tasks: GraphTasks, name: str = 'graph') -> Dict[str, Any]:
+        """Executa o grafo e retorna {tarefa: resultado}"""
+        for task, (_, deps) in tasks.items():
+            missing = [dep for dep in deps if dep not in tasks]
+            if missing:
+                raise ValueError(f"Tarefa '{task}' depende de tarefas inexistentes: {missing}")
+
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        durations: Dict[str, float] = {}
+        pending = dict(tasks)
+        running = {}
+
+        def timed(task, func, args):
+            task_start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                durations[task] = time.perf_counter() - task_start
+
+        if self.max_workers <= 1:
+            # Sem paralelismo: ordem topológica na própria thread
+            while pending:
+                ready = [t for t, (_, deps) in pending.items() if all(d in results for d in deps)]
+                if not ready:
+                    raise ValueError(f"Dependência circular entre {sorted(pending)}")
+                for task in ready:
+                    func, deps = pending.pop(task)
+                    results[task] = timed(task, func, [results[d] for d in deps])
+        else:
+            pool = self._get_pool()
+            try:
+                while pending or running:
+                    for task in [t for t, (_, deps) in pending.items() if all(d in results for d in deps)]:
+                        func, deps = pending.pop(task)
+                        running[pool.submit(timed, task, func, [results[d] for d in deps])] = task
+                    if not running:
+                        raise ValueError(f"Dependência circular entre {sorted(pending)}")
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[running.pop(future)] = future.result()
+            except Exception:
+                for future in running:
+                    future.cancel()
+                raise
+
+        wall = time.perf_counter() - started
+        self.last_run = {
+            'name': name,
+            'wall_seconds': wall,
+            'task_seconds': dict(durations),
+            'slowest_task': max(durations, key=durations.get) if durations else None,
+            'serial_seconds': sum(durations.values()),
+            'workers': self.max_workers
+        }
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.last_run)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
@@ -0,0 +1,238 @@
+# ai_modules/estimator_backends.py - Backends de estimadores e seleção por orçamento de latência
+import os
+import json
+import glob
+import time
+import pickle
+import logging
+from itertools import combinations_with_replacement
+from typing import Dict, Optional, Callable
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import PolynomialFeatures
+from sklearn.metrics import mean_squared_error
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('estimator_backends')
+
+# Resultados do benchmark (benchmarks/ml_benchmark.py) rodado NESTA máquina, usados como
+# referência de latência. O ml_baseline.json versionado não entra aqui: foi medido em outra
+# máquina e serve só para a checagem de regressão (--check)
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+BENCHMARK_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+DEFAULT_LATENCY_BUDGET_MS = 1.0
+DEFAULT_ACCURACY_TOLERANCE = 0.10  # MSE até 10% pior que o melhor candidato é aceitável
+
+
+def _random_forest(n_jobs: int):
+    return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+
+
+def _shallow_forest(n_jobs: int):
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=42, n_jobs=n_jobs)
+
+
+def _hist_gradient_boosting(n_jobs: int):
+    return HistGradientBoostingRegressor(max_iter=100, max_depth=6, random_state=42)
+
+
+def _ridge(n_jobs: int):
+    return Ridge(alpha=1.0)
+
+
+def _ridge_engineered(n_jobs: int):
+    # Termos quadráticos e interações das features já normalizadas
+    return Pipeline([
+        ('poly', PolynomialFeatures(degree=2, include_bias=False)),
+        ('ridge', Ridge(alpha=1.0))
+    ])
+
+
+# Ordem = preferência em caso de empate (mais leve primeiro)
+ESTIMATOR_BACKENDS: Dict[str, Callable] = {
+    'ridge': _ridge,
+    'ridge_engineered': _ridge_engineered,
+    'hist_gradient_boosting': _hist_gradient_boosting,
+    'shallow_forest': _shallow_forest,
+    'random_forest': _random_forest
+}
+
+
+class FastLinearPredictor:
+    """Inferência de modelos lineares sem overhead do scikit-learn.
+
+    A normalização do StandardScaler é incorporada aos coeficientes
+    (quando não há termos polinomiais), então uma predição é só um
+    produto escalar em NumPy - bem abaixo de 1 ms por linha.
+    """
+
+    def __init__(self, scaler, model):
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        if isinstance(model, Pipeline):
+            poly = model.named_steps['poly']
+            ridge = model.named_steps['ridge']
+            pairs = list(combinations_with_replacement(range(len(mean)), poly.degree))
+            self.pair_left = np.array([p[0] for p in pairs])
+            self.pair_right = np.array([p[1] for p in pairs])
+            self.mean = mean
+            self.scale = scale
+            self.coef = np.asarray(ridge.coef_, dtype=np.float64)
+            self.intercept = float(ridge.intercept_)
+            self.polynomial = True
+        else:
+            coef = np.asarray(model.coef_, dtype=np.float64)
+            # w·((x - μ)/σ) + b = (w/σ)·x + (b - w·μ/σ)
+            self.coef = coef / scale
+            self.intercept = float(model.intercept_) - float(np.dot(coef / scale, mean))
+            self.polynomial = False
+
+    def predict(self, features) -> np.ndarray:
+        """Prediz a partir de features NÃO normalizadas"""
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if self.polynomial:
+            Z = (X - self.mean) / self.scale
+            expanded = np.concatenate([Z, Z[:, self.pair_left] * Z[:, self.pair_right]], axis=1)
+            return expanded @ self.coef + self.intercept
+        return X @ self.coef + self.intercept
+
+
+def build_fast_predictor(scaler, model) -> Optional[FastLinearPredictor]:
+    """Cria preditor rápido se o modelo for linear"""
+    try:
+        if isinstance(model, Ridge) or (isinstance(model, Pipeline) and 'ridge' in model.named_steps):
+            return FastLinearPredictor(scaler, model)
+    except Exception as e:
+        logger.error(f"Erro ao criar preditor rápido: {e}")
+    return None
+
+
+def measure_single_row_latency_ms(predict_fn: Callable, X: np.ndarray, samples: int = 100) -> float:
+    """Latência p50 (ms) de predições de uma linha"""
+    predict_fn(X[:1])
+    timings = []
+    for i in range(samples):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        predict_fn(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50))
+
+
+def load_benchmark_latencies() -> Dict[str, float]:
+    """Latência p50 por backend no benchmark local mais recente ({} se nunca rodou aqui)"""
+    try:
+        files = sorted(glob.glob(os.path.join(BENCHMARK_RESULTS_DIR, "ml_benchmark_*.json")))
+        if not files:
+            return {}
+        with open(files[-1], 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        latencies = {}
+        for name, metrics in results.get('benchmarks', {}).items():
+            if name.startswith('estimator_backends/') and 'inference_p50_ms' in metrics:
+                backend = name.split('/')[-1]
+                latencies[backend] = max(latencies.get(backend, 0), metrics['inference_p50_ms'])
+        return latencies
+    except Exception as e:
+        logger.error(f"Erro ao carregar resultados do benchmark: {e}")
+        return {}
+
+
+def evaluate_backend(name: str, X_train, y_train, X_val, X_val_raw, y_val, scaler, n_jobs: int = 1) -> Dict:
+    """Treina um backend e mede precisão, latência e tamanho"""
+    model = ESTIMATOR_BACKENDS[name](n_jobs)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    if hasattr(model, 'n_jobs'):
+        model.set_params(n_jobs=1)  # Inferência linha a linha não se beneficia de paralelismo
+
+    mse = float(mean_squared_error(y_val, model.predict(X_val)))
+
+    fast = build_fast_predictor(scaler, model)
+    if fast is not None:
+        latency_ms = measure_single_row_latency_ms(fast.predict, X_val_raw)
+    else:
+        latency_ms = measure_single_row_latency_ms(model.predict, X_val)
+
+    return {
+        'backend': name,
+        'model': model,
+        'mse': mse,
+        'latency_p50_ms': latency_ms,
+        'fit_seconds': fit_seconds,
+        'size_kb': len(pickle.dumps(model)) / 1024,
+        'fast_inference': fast is not None
+    }
+
+
+def select_estimator(X_train, y_train, X_val, X_val_raw, y_val, scaler,
+                     backend: str = 'auto',
+                     latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS,
+                     accuracy_tolerance: float = DEFAULT_ACCURACY_TOLERANCE,
+                     n_jobs: int = 1,
+                     progress_callback: Optional[Callable] = None,
+                     cancel_check: Optional[Callable] = None) -> Optional[Dict]:
+    """Escolhe o estimador pelo orçamento de latência/precisão.
+
+    O piso de precisão é o melhor MSE entre TODOS os candidatos. Entre os que
+    cabem no orçamento de latência e têm MSE até `accuracy_tolerance` acima
+    desse piso, fica o mais rápido; se nenhum atende aos dois critérios, usa
+    o mais preciso.
+    """
+    if backend != 'auto':
+        candidates = [backend]
+    else:
+        # Backends que o benchmark local já mostrou muito acima do orçamento nem são treinados;
+        # sem benchmark local, todos são avaliados e medidos aqui mesmo
+        benchmark = load_benchmark_latencies()
+        candidates = [name for name in ESTIMATOR_BACKENDS
+                      if benchmark.get(name, 0) <= latency_budget_ms * 5] or list(ESTIMATOR_BACKENDS)
+
+    evaluations = []
+    for i, name in enumerate(candidates):
+        if cancel_check and cancel_check():
+            return None
+        if progress_callback:
+            progress_callback(name, 'fitting', 15 + 60 * i / len(candidates))
+        try:
+            evaluations.append(evaluate_backend(name, X_train, y_train, X_val, X_val_raw, y_val, scaler, n_jobs))
+        except Exception as e:
+            logger.error(f"Erro ao avaliar backend {name}: {e}")
+
+    if not evaluations:
+        return None
+
+    best_mse = min(e['mse'] for e in evaluations)
+    acceptable = [e for e in evaluations
+                  if e['latency_p50_ms'] <= latency_budget_ms
+                  and e['mse'] <= best_mse * (1 + accuracy_tolerance) + 1e-9]
+    if acceptable:
+        chosen = min(acceptable, key=lambda e: e['latency_p50_ms'])
+        reason = 'within_latency_budget'
+    else:
+        chosen = min(evaluations, key=lambda e: e['mse'])
+        reason = 'most_accurate'
+
+    return {
+        'model': chosen['model'],
+        'metadata': {
+            'backend': chosen['backend'],
+            'selection_reason': reason if backend == 'auto' else 'forced',
+            'latency_budget_ms': latency_budget_ms,
+            'accuracy_tolerance': accuracy_tolerance,
+            'mse': chosen['mse'],
+            'latency_p50_ms': chosen['latency_p50_ms'],
+            'size_kb': chosen['size_kb'],
+            'fast_inference': chosen['fast_inference'],
+            'candidates': [{k: v for k, v in e.items() if k != 'model'} for e in evaluations]
+        }
+    }
@@ -0,0 +1,149 @@
+# ai_modules/image_context.py - Pré-processamento compartilhado (e memoizado) de um frame
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+def histogram_moments(hist: np.ndarray) -> Tuple[float, float]:
+    """Média e variância de um canal de 8 bits a partir do seu histograma (bin = valor)"""
+    hist = np.asarray(hist, dtype=np.float64).ravel()
+    total = hist.sum()
+    if total <= 0:
+        return 0.0, 0.0
+    values = np.arange(hist.size, dtype=np.float64)
+    mean = float(hist @ values / total)
+    variance = float(hist @ (values * values) / total - mean * mean)
+    return mean, max(variance, 0.0)
+
+
+def count_unique_colors(image: np.ndarray) -> int:
+    """Cores BGR distintas via inteiros de 24 bits e um bitset de presença.
+
+    Cada pixel vira um uint32 (B | G<<8 | R<<16) por uma view de 4 bytes,
+    sem ordenar linhas como np.unique(axis=0); a presença é marcada em um
+    vetor booleano de 2^24 posições (16 MB).
+    """
+    height, width = image.shape[:2]
+    packed = np.zeros((height, width, 4), dtype=np.uint8)
+    packed[..., :3] = image[..., :3]
+    present = np.zeros(1 << 24, dtype=bool)
+    present[packed.view('<u4').ravel()] = True
+    return int(np.count_nonzero(present))
+
+
+class ImageContext:
+    """Um frame BGR e todas as transformações derivadas dele, calculadas sob demanda.
+
+    Cada artefato (cinza, HSV, bordas Canny, histogramas, limiarizações) é
+    calculado uma única vez por frame, na primeira vez em que algum
+    analisador o pede, e reaproveitado pelos demais. `compute_counts` registra
+    quantas vezes cada artefato foi de fato calculado. Seguro para uso
+    concorrente: threads pedindo o mesmo artefato esperam o primeiro cálculo.
+
+    `at_scale` devolve (em cache) o mesmo frame reduzido como outro contexto
+    da pirâmide; `to_full`/`to_full_area` levam coordenadas e áreas medidas
+    nele de volta à resolução original.
+    """
+
+    def __init__(self, image: np.ndarray, scale: float = 1.0, parent: Optional['ImageContext'] = None):
+        self.image = image
+        self.scale = scale
+        self.root = parent if parent is not None else self
+        self.height, self.width = image.shape[:2]
+        self._artifacts: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self.compute_counts: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def ensure(cls, image: 'ImageInput') -> 'ImageContext':
+        """Aceita um frame ou um contexto já existente"""
+        return image if isinstance(image, ImageContext) else cls(image)
+
+    @property
+    def total_pixels(self) -> int:
+        return self.height * self.width
+
+    def at_scale(self, scale: float) -> 'ImageContext':
+        """Nível da pirâmide com `scale` da resolução original (INTER_AREA, em cache na raiz)"""
+        root = self.root
+        if scale >= 1.0:
+            return root
+
+        def build():
+            size = (max(1, int(round(root.width * scale))), max(1, int(round(root.height * scale))))
+            resized = cv2.resize(root.image, size, interpolation=cv2.INTER_AREA)
+            return ImageContext(resized, scale=scale, parent=root)
+
+        return root.get(f'pyramid_{scale:g}', build)
+
+    def to_full(self, value: float) -> int:
+        """Coordenada/tamanho deste nível na resolução original"""
+        return int(round(value / self.scale))
+
+    def to_full_area(self, area: float) -> float:
+        return area / (self.scale * self.scale)
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Retorna o artefato `name`, calculando-o com `factory` na primeira vez"""
+        if name in self._artifacts:
+            return self._artifacts[name]
+        with self._locks_guard:
+            lock = self._locks[name]
+        with lock:
+            if name not in self._artifacts:
+                self._artifacts[name] = factory()
+                self.compute_counts[name] += 1
+        return self._artifacts[name]
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.get('gray', lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self.get('hsv', lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV))
+
+    @property
+    def edges(self) -> np.ndarray:
+        """Canny(50, 150), usado por janelas, acessibilidade, usabilidade e anomalias"""
+        return self.get('edges', lambda: cv2.Canny(self.gray, 50, 150, apertureSize=3))
+
+    @property
+    def gray_hist(self) -> np.ndarray:
+        return self.get('gray_hist', lambda: cv2.calcHist([self.gray], [0], None, [256], [0, 256]).flatten())
+
+    @property
+    def hsv_hists(self) -> Dict[str, np.ndarray]:
+        return self.get('hsv_hists', lambda: {
+            'h': cv2.calcHist([self.hsv], [0], None, [180], [0, 180]).flatten(),
+            's': cv2.calcHist([self.hsv], [1], None, [256], [0, 256]).flatten(),
+            'v': cv2.calcHist([self.hsv], [2], None, [256], [0, 256]).flatten()
+        })
+
+    @property
+    def unique_colors(self) -> int:
+        return self.get('unique_colors', lambda: count_unique_colors(self.image))
+
+    @property
+    def adaptive_threshold(self) -> np.ndarray:
+        return self.get('adaptive_threshold', lambda: cv2.adaptiveThreshold(
+            self.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2))
+
+    @property
+    def otsu_threshold(self) -> np.ndarray:
+        return self.get('otsu_threshold', lambda: cv2.threshold(
+            self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1])
+
+    @property
+    def edge_contours(self):
+        """Contornos externos das bordas Canny"""
+        return self.get('edge_contours', lambda: cv2.findContours(
+            self.edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0])
+
+
+# Analisadores aceitam um frame ou um contexto compartilhado
+ImageInput = Union[np.ndarray, ImageContext]
@@ -0,0 +1,284 @@
+# ai_modules/incremental_cv.py - Análise incremental do desktop por blocos alterados (dirty rectangles)
+import os
+import sys
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.image_context import ImageContext, ImageInput
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('incremental_cv')
+
+Region = Tuple[int, int, int, int]  # x, y, largura, altura
+
+
+def tile_hashes(image: np.ndarray, tile_size: int) -> np.ndarray:
+    """Hash de 64 bits (blake2b) de cada bloco tile_size x tile_size do frame"""
+    height, width = image.shape[:2]
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    hashes = np.zeros((rows, cols), dtype=np.uint64)
+    for r in range(rows):
+        y = r * tile_size
+        for c in range(cols):
+            x = c * tile_size
+            digest = hashlib.blake2b(image[y:y + tile_size, x:x + tile_size].tobytes(), digest_size=8).digest()
+            hashes[r, c] = int.from_bytes(digest, 'little')
+    return hashes
+
+
+def dirty_rectangles(dirty: np.ndarray, tile_size: int, shape: Tuple[int, ...]) -> List[Region]:
+    """Agrupa blocos alterados vizinhos em retângulos (coordenadas em pixels)"""
+    height, width = shape[:2]
+    count, _, stats, _ = cv2.connectedComponentsWithStats(dirty.astype(np.uint8), connectivity=8)
+    rects = []
+    for label in range(1, count):
+        cx, cy, cw, ch = (int(v) for v in stats[label, :4])
+        x, y = cx * tile_size, cy * tile_size
+        rects.append((x, y, min(cw * tile_size, width - x), min(ch * tile_size, height - y)))
+    return rects
+
+
+class IncrementalDesktopAnalyzer:
+    """Reanalisa só o que mudou desde a última captura.
+
+    O frame é dividido em blocos com hash; blocos cujo hash mudou formam os
+    retângulos sujos. Só neles são recalculados cinza/HSV, threshold
+    adaptativo, máscara vermelha e bordas (com uma margem para os filtros de
+    vizinhança), gravados em buffers do tamanho da tela. Histogramas e
+    contagens ficam agregados por bloco, então as métricas globais são a soma
+    dos agregados. Ícones e diálogos saem dos buffers (o OCR dos diálogos
+    passa pelo cache por conteúdo) e o OCR da tela é refeito só nas faixas
+    horizontais que contêm blocos alterados; as faixas são cortadas nos vãos
+    entre as linhas de texto detectadas na primeira leitura.
+
+    Bordas Canny são aproximadas na margem dos retângulos (a histerese não
+    atravessa o recorte).
+    """
+
+    def __init__(self, cv_system, tile_size: int = 64, margin: int = 16, ocr: bool = True):
+        self.cv = cv_system
+        self.tile_size = tile_size
+        self.margin = margin  # > metade do bloco do threshold adaptativo (11) e do kernel do Canny
+        self.ocr = ocr
+        self._lock = threading.Lock()
+        self.stats = {'frames': 0, 'unchanged_frames': 0, 'tiles_recomputed': 0, 'tiles_total': 0}
+        self.reset()
+
+    def reset(self):
+        """Descarta o estado: a próxima análise recalcula o frame inteiro"""
+        self._shape = None
+        self._hashes: Optional[np.ndarray] = None
+        self._result: Optional[Dict] = None
+        self._ocr_bands: List[Dict] = []  # {'span': (y0, y1), 'lines': [...], 'words': [...]}
+        self._ocr_complete = False  # False = próxima leitura cobre a tela inteira
+
+    def _allocate(self, shape: Tuple[int, ...]):
+        height, width = shape[:2]
+        rows, cols = -(-height // self.tile_size), -(-width // self.tile_size)
+        self._shape = shape
+        self._thresh = np.zeros((height, width), dtype=np.uint8)
+        self._red = np.zeros((height, width), dtype=np.uint8)
+        self._edges = np.zeros((height, width), dtype=np.uint8)
+        self._tile_h = np.zeros((rows, cols, 180), dtype=np.int64)
+        self._tile_s = np.zeros((rows, cols, 256), dtype=np.int64)
+        self._tile_v = np.zeros((rows, cols, 256), dtype=np.int64)
+        self._tile_gray = np.zeros((rows, cols, 256), dtype=np.int64)
+        self._tile_edges = np.zeros((rows, cols), dtype=np.int64)
+        self._tile_red = np.zeros((rows, cols), dtype=np.int64)
+        self._ocr_bands = []
+        self._ocr_complete = False
+
+    def _update_region(self, frame: np.ndarray, rect: Region):
+        """Recalcula buffers e agregados por bloco dentro de um retângulo sujo"""
+        x, y, w, h = rect
+        height, width = frame.shape[:2]
+        ex0, ey0 = max(0, x - self.margin), max(0, y - self.margin)
+        ex1, ey1 = min(width, x + w + self.margin), min(height, y + h + self.margin)
+        crop = frame[ey0:ey1, ex0:ex1]
+
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+
+        inner = (slice(y - ey0, y - ey0 + h), slice(x - ex0, x - ex0 + w))
+        gray, thresh, edges = gray[inner], thresh[inner], edges[inner]
+        hsv = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2HSV)
+        red = self.cv.error_color_mask(hsv)
+
+        self._thresh[y:y + h, x:x + w] = thresh
+        self._edges[y:y + h, x:x + w] = edges
+        self._red[y:y + h, x:x + w] = red
+
+        ts = self.tile_size
+        for r in range(y // ts, -(-(y + h) // ts)):
+            for c in range(x // ts, -(-(x + w) // ts)):
+                ty, tx = r * ts - y, c * ts - x
+                block = (slice(ty, ty + ts), slice(tx, tx + ts))
+                tile_hsv = hsv[block]
+                self._tile_h[r, c] = np.bincount(tile_hsv[..., 0].ravel(), minlength=180)[:180]
+                self._tile_s[r, c] = np.bincount(tile_hsv[..., 1].ravel(), minlength=256)
+                self._tile_v[r, c] = np.bincount(tile_hsv[..., 2].ravel(), minlength=256)
+                self._tile_gray[r, c] = np.bincount(gray[block].ravel(), minlength=256)
+                self._tile_edges[r, c] = np.count_nonzero(edges[block])
+                self._tile_red[r, c] = np.count_nonzero(red[block])
+
+    def _read_span(self, frame: np.ndarray, y0: int, y1: int) -> List[Dict]:
+        """OCR de um trecho horizontal, dividido em faixas cortadas nos vãos entre linhas de texto.
+
+        As faixas cobrem o trecho inteiro sem sobreposição (áreas sem texto
+        também pertencem a alguma faixa), têm ao menos um bloco de altura e
+        nenhuma linha de texto atravessa um corte.
+        """
+        pipeline = self.cv.ocr_pipeline
+        ctx = ImageContext(frame[y0:y1])
+        regions = pipeline.detect_text_regions(ctx)
+
+        lines: List[List[int]] = []  # intervalos verticais ocupados por texto
+        for _, ry, _, rh in sorted(regions, key=lambda r: r[1]):
+            if lines and ry <= lines[-1][1]:
+                lines[-1][1] = max(lines[-1][1], ry + rh)
+            else:
+                lines.append([ry, ry + rh])
+        cuts = [0]
+        for (_, previous_end), (next_start, _) in zip(lines, lines[1:]):
+            cut = (previous_end + next_start) // 2
+            if cut - cuts[-1] >= self.tile_size:
+                cuts.append(cut)
+        cuts.append(y1 - y0)
+
+        bands = []
+        for b0, b1 in zip(cuts, cuts[1:]):
+            inside = [r for r in regions if b0 <= r[1] < b1]
+            ocr = pipeline.recognize(ctx, inside) if inside else {'lines': [], 'words': []}
+            bands.append({
+                'span': (y0 + b0, y0 + b1),
+                'lines': ocr['lines'],
+                'words': [{**word, 'position': (word['position'][0], word['position'][1] + y0)}
+                          for word in ocr['words']]
+            })
+        return bands
+
+    def _update_ocr(self, frame: np.ndarray, rects: List[Region]) -> Dict:
+        """Refaz o OCR só nas faixas de texto tocadas pelos retângulos sujos"""
+        height = frame.shape[0]
+        if not self._ocr_complete:
+            # Primeira leitura: a tela inteira, já dividida nas faixas das linhas de texto
+            self._ocr_bands = self._read_span(frame, 0, height)
+            self._ocr_complete = True
+            reread = [(0, height)]
+        else:
+            spans = [(max(0, y - self.margin), min(height, y + h + self.margin)) for _, y, _, h in rects]
+
+            # Faixas que tocam um retângulo sujo são relidas (e redivididas) juntas
+            kept, touched = [], []
+            for band in self._ocr_bands:
+                b0, b1 = band['span']
+                if any(b0 < s1 and s0 < b1 for s0, s1 in spans):
+                    touched.append((b0, b1))
+                else:
+                    kept.append(band)
+
+            reread: List[Tuple[int, int]] = []
+            for b0, b1 in touched:  # em ordem; faixas vizinhas viram um único trecho
+                if reread and b0 <= reread[-1][1]:
+                    reread[-1] = (reread[-1][0], b1)
+                else:
+                    reread.append((b0, b1))
+            for y0, y1 in reread:
+                kept.extend(self._read_span(frame, y0, y1))
+            self._ocr_bands = sorted(kept, key=lambda band: band['span'][0])
+
+        lines = [line for band in self._ocr_bands for line in band['lines']]
+        text = '\n'.join(lines)
+        return {
+            'text': text,
+            'lines': lines,
+            'words': [word for band in self._ocr_bands for word in band['words']],
+            'word_count': len(text.split()),
+            'line_count': len(lines),
+            'bands': len(self._ocr_bands),
+            'bands_reread': len(reread),
+            'rows_reread': sum(y1 - y0 for y0, y1 in reread)
+        }
+
+    def analyze(self, image: ImageInput) -> Dict:
+        """Analisa o frame reaproveitando tudo o que não mudou desde a chamada anterior"""
+        with self._lock:
+            started = time.perf_counter()
+            frame = ImageContext.ensure(image).root.image
+            height, width = frame.shape[:2]
+
+            hashes = tile_hashes(frame, self.tile_size)
+            if self._shape != frame.shape or self._hashes is None:
+                self._allocate(frame.shape)
+                dirty = np.ones(hashes.shape, dtype=bool)
+            else:
+                dirty = hashes != self._hashes
+            self._hashes = hashes
+
+            dirty_tiles = int(np.count_nonzero(dirty))
+            self.stats['frames'] += 1
+            self.stats['tiles_total'] += dirty.size
+            self.stats['tiles_recomputed'] += dirty_tiles
+
+            if dirty_tiles == 0 and self._result is not None:
+                self.stats['unchanged_frames'] += 1
+                result = dict(self._result)
+                result.update({
+                    'timestamp': datetime.now().isoformat(),
+                    'changed': False,
+                    'dirty_rectangles': [],
+                    'dirty_fraction': 0.0,
+                    'elapsed_seconds': time.perf_counter() - started
+                })
+                return result
+
+            rects = dirty_rectangles(dirty, self.tile_size, frame.shape)
+            for rect in rects:
+                self._update_region(frame, rect)
+
+            # Métricas globais = soma dos agregados por bloco
+            total_pixels = height * width
+            gray_hist = self._tile_gray.sum(axis=(0, 1)).astype(np.float64)
+            result = {
+                'timestamp': datetime.now().isoformat(),
+                'screen_resolution': f"{width}x{height}",
+                'changed': True,
+                'dirty_rectangles': rects,
+                'dirty_fraction': dirty_tiles / dirty.size,
+                'color_scheme': self.cv.summarize_color_histograms(
+                    self._tile_h.sum(axis=(0, 1)).astype(np.float64),
+                    self._tile_s.sum(axis=(0, 1)).astype(np.float64),
+                    self._tile_v.sum(axis=(0, 1)).astype(np.float64)),
+                'layout_complexity': self.cv.layout_complexity_from_histogram(gray_hist),
+                'edge_density': float(self._tile_edges.sum() / total_pixels),
+                'red_ratio': float(self._tile_red.sum() / total_pixels),
+                'icon_analysis': self.cv.analyze_icons_from_threshold(self._thresh, height),
+                'error_dialogs': self.cv.find_error_dialogs_in_mask(frame, self._red)
+            }
+            if self.ocr:
+                try:
+                    result['text'] = self._update_ocr(frame, rects)
+                except Exception as ocr_error:
+                    logger.error(f"Erro no OCR incremental: {ocr_error}")
+                    self._ocr_complete = False
+                    result['text'] = {'error': str(ocr_error), 'text': '', 'word_count': 0}
+
+            result['elapsed_seconds'] = time.perf_counter() - started
+            self._result = result
+            return result
+
+    def get_stats(self) -> Dict:
+        frames = self.stats['frames']
+        return {
+            **self.stats,
+            'recompute_ratio': self.stats['tiles_recomputed'] / self.stats['tiles_total'] if frames else 0.0
+        }
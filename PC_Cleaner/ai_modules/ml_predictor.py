@@ -4,7 +4,7 @@ import pandas as pd
 from sklearn.ensemble import RandomForestRegressor, IsolationForest
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, accuracy_score
+from sklearn.metrics import accuracy_score
 import psutil
 import time
 import json
@@ -14,17 +14,94 @@ from typing import Dict, List, Tuple, Optional
 import logging
 import pickle
 import threading
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.trend_forecaster import TrendForecaster
+from ai_modules.sample_store import SampleStore
+from ai_modules.adaptive_scheduler import AdaptiveScheduler
+from utils.service_registry import borrow_service
+from ai_modules.estimator_backends import (select_estimator, build_fast_predictor,
+                                           DEFAULT_LATENCY_BUDGET_MS)
+from ai_modules.anomaly_baseline import compile_isolation_forest
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('ml_predictor')
 
+def fit_performance_models(X: np.ndarray, y: np.ndarray, n_jobs: int = 1,
+                           progress_callback=None, cancel_check=None,
+                           backend: str = 'auto',
+                           latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS) -> Optional[Dict]:
+    """Treina scaler, modelo de performance e modelo de anomalias sobre dados REAIS.
+    
+    Função pura (sem estado do MLPredictor) para poder rodar tanto no processo
+    da aplicação quanto no processo de treinamento do TrainingExecutor.
+    O estimador de performance é escolhido por estimator_backends.select_estimator
+    ('auto') ou forçado pelo nome do backend.
+    Retorna None se o treinamento for cancelado.
+    """
+    def report(model: str, stage: str, progress: float):
+        if progress_callback:
+            progress_callback(model, stage, progress)
+    
+    def cancelled() -> bool:
+        return bool(cancel_check and cancel_check())
+    
+    # Normalizar features
+    report('scaler', 'fitting', 5)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    
+    # Split para treino e teste
+    X_train, X_test, _, X_test_raw, y_train, y_test = train_test_split(
+        X_scaled, np.asarray(X, dtype=np.float64), y, test_size=0.2, random_state=42)
+    if cancelled():
+        return None
+    
+    # Selecionar e treinar modelo de performance (orçamento de latência/precisão)
+    selection = select_estimator(
+        X_train, y_train, X_test, X_test_raw, y_test, scaler,
+        backend=backend, latency_budget_ms=latency_budget_ms, n_jobs=n_jobs,
+        progress_callback=lambda name, stage, pct: report(f'performance_model[{name}]', stage, pct),
+        cancel_check=cancel_check
+    )
+    if selection is None or cancelled():
+        return None
+    performance_model = selection['model']
+    report('performance_model', 'fitted', 75)
+    
+    # Treinar modelo de detecção de anomalias
+    report('anomaly_model', 'fitting', 78)
+    anomaly_model = IsolationForest(contamination=0.1, random_state=42, n_jobs=n_jobs)
+    anomaly_model.fit(X_scaled)
+    report('anomaly_model', 'fitted', 90)
+    
+    # Inferência de uma linha por vez na GUI: não paralelizar predições
+    anomaly_model.set_params(n_jobs=1)
+    
+    model_metadata = selection['metadata']
+    model_metadata['samples'] = int(len(X))
+    model_metadata['n_features'] = int(X_scaled.shape[1])
+    model_metadata['trained_at'] = datetime.now().isoformat()
+    
+    report('evaluation', 'done', 95)
+    return {
+        'scaler': scaler,
+        'performance_model': performance_model,
+        'anomaly_model': anomaly_model,
+        'model_metadata': model_metadata,
+        'mse': float(model_metadata['mse']),
+        'samples': int(len(X))
+    }
+
 class MLPredictor:
     """Sistema de Machine Learning para predição de performance - 100% REAL"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", auto_start: bool = True):
         self.data_dir = data_dir
         self.models_dir = os.path.join(data_dir, "ml_models")
-        self.data_file = os.path.join(data_dir, "system_metrics.json")
+        self.data_file = os.path.join(data_dir, "system_metrics.npz")
+        self.legacy_data_file = os.path.join(data_dir, "system_metrics.json")
         
         # Criar diretórios se necessário
         os.makedirs(self.data_dir, exist_ok=True)
@@ -35,16 +112,42 @@ class MLPredictor:
         self.anomaly_model = IsolationForest(contamination=0.1, random_state=42)
         self.scaler = StandardScaler()
         
-        # Dados históricos REAIS
-        self.historical_data = []
+        # Seleção do estimador ('auto' = escolhido pelo orçamento de latência)
+        self.estimator_backend = 'auto'
+        self.latency_budget_ms = DEFAULT_LATENCY_BUDGET_MS
+        self.model_metadata = {}
+        self.fast_predictor = None
+        # Caminho rápido de inferência: normalização em NumPy + floresta compilada
+        self.scaler_mean = None
+        self.scaler_scale = None
+        self.fast_anomaly_model = None
+        
+        # Dados históricos REAIS (arrays compactos, últimos 1000 pontos)
+        self.max_samples = 1000
+        self.historical_data = SampleStore(self.max_samples)
         self.is_trained = False
         self.min_samples_for_training = 50
         
+        # Coleta automática em background
+        self.collection_interval = 300  # 5 minutos entre coletas (modo normal)
+        self._collection_thread = None
+        # Amostras mais densas quando o sistema caminha para um limite, esparsas ocioso/na bateria
+        self.scheduler = AdaptiveScheduler(
+            'ml_predictor', min_interval=30, base_interval=self.collection_interval, max_interval=900,
+            thresholds={'cpu_percent': 90.0, 'memory_percent': 85.0, 'disk_percent': 95.0})
+        self._stop_collection = threading.Event()
+        
         # Carregar dados existentes
         self.load_historical_data()
         
+        # Tendências incrementais sobre o histórico (manutenção preditiva)
+        self.trend_forecaster = TrendForecaster()
+        for timestamp, metrics in self.historical_data.iter_trend_points():
+            self.trend_forecaster.update(timestamp, metrics)
+        
         # Iniciar coleta automática de dados
-        self.start_data_collection()
+        if auto_start:
+            self.start_data_collection()
 
     def collect_real_system_snapshot(self) -> Dict:
         """Coleta snapshot REAL do sistema usando psutil"""
@@ -203,43 +306,59 @@ class MLPredictor:
             return 50.0
 
     def start_data_collection(self):
-        """Inicia coleta automática de dados REAIS"""
+        """Inicia coleta automática de dados REAIS (no máximo uma thread por instância)"""
+        if self._collection_thread is not None and self._collection_thread.is_alive():
+            return
+        self._stop_collection.clear()
+        
         def collect_data():
-            while True:
+            while not self._stop_collection.is_set():
                 try:
-                    snapshot = self.collect_real_system_snapshot()
-                    if snapshot:
-                        performance_score = self.calculate_real_performance_score(snapshot)
-                        
-                        data_point = {
-                            'snapshot': snapshot,
-                            'performance_score': performance_score,
-                            'features': self.extract_features_from_snapshot(snapshot)
-                        }
-                        
-                        self.historical_data.append(data_point)
-                        
-                        # Manter apenas últimos 1000 pontos
-                        if len(self.historical_data) > 1000:
-                            self.historical_data = self.historical_data[-1000:]
-                        
-                        # Salvar dados periodicamente
-                        if len(self.historical_data) % 10 == 0:
-                            self.save_historical_data()
-                        
-                        # Treinar modelo quando tiver dados suficientes
-                        if len(self.historical_data) >= self.min_samples_for_training and not self.is_trained:
-                            self.train_models_with_real_data()
+                    with self.scheduler.measure():
+                        snapshot = self.collect_real_system_snapshot()
+                        if snapshot:
+                            # Store descarta sozinho pontos além dos últimos 1000
+                            self.add_sample(snapshot)
+                            self.scheduler.observe({
+                                'cpu_percent': snapshot['cpu']['percent'],
+                                'memory_percent': snapshot['memory']['percent'],
+                                'disk_percent': snapshot['disk']['percent']
+                            })
+                            
+                            # Salvar dados periodicamente
+                            if len(self.historical_data) % 10 == 0:
+                                self.save_historical_data()
                     
-                    # Aguardar 5 minutos entre coletas
-                    time.sleep(300)
+                    # Treinar modelo quando tiver dados suficientes (fora da medição de custo da coleta)
+                    if len(self.historical_data) >= self.min_samples_for_training and not self.is_trained:
+                        self.train_models_with_real_data()
+                    
+                    # Aguardar próxima coleta (intervalo adaptativo, interrompível)
+                    self.scheduler.sleep(self._stop_collection)
                     
                 except Exception as e:
                     logger.error(f"Erro na coleta de dados: {e}")
-                    time.sleep(60)
+                    self._stop_collection.wait(60)
         
         # Executar em thread separada
-        threading.Thread(target=collect_data, daemon=True).start()
+        self._collection_thread = threading.Thread(target=collect_data, daemon=True)
+        self._collection_thread.start()
+
+    def stop_data_collection(self):
+        """Para a coleta automática"""
+        self._stop_collection.set()
+        logger.info("Coleta automática de dados parada")
+
+    def prepare_training_data(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Monta matrizes X/y REAIS a partir do histórico coletado"""
+        return self.historical_data.training_arrays()
+
+    def add_sample(self, snapshot: Dict):
+        """Registra um snapshot REAL no histórico e nas tendências"""
+        performance_score = self.calculate_real_performance_score(snapshot)
+        self.historical_data.append(snapshot, performance_score,
+                                    self.extract_features_from_snapshot(snapshot))
+        self.trend_forecaster.update_from_snapshot(snapshot)
 
     def train_models_with_real_data(self):
         """Treina modelos ML com dados REAIS coletados"""
@@ -248,31 +367,17 @@ class MLPredictor:
                 return False
             
             # Preparar dados REAIS para treinamento
-            X = np.array([point['features'] for point in self.historical_data])
-            y = np.array([point['performance_score'] for point in self.historical_data])
-            
-            # Normalizar features
-            X_scaled = self.scaler.fit_transform(X)
+            X, y = self.prepare_training_data()
             
-            # Split para treino e teste
-            X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-            
-            # Treinar modelo de performance
-            self.performance_model.fit(X_train, y_train)
-            
-            # Treinar modelo de detecção de anomalias
-            self.anomaly_model.fit(X_scaled)
-            
-            # Calcular métricas REAIS
-            y_pred = self.performance_model.predict(X_test)
-            mse = mean_squared_error(y_test, y_pred)
-            
-            # Salvar modelos treinados
-            self.save_models()
+            # Treinar no próprio processo (coleta automática em background)
+            fitted = fit_performance_models(X, y, backend=self.estimator_backend,
+                                            latency_budget_ms=self.latency_budget_ms)
+            if fitted is None:
+                return False
             
-            self.is_trained = True
+            self.apply_trained_models(fitted)
             
-            logger.info(f"Modelos treinados com {len(self.historical_data)} amostras reais. MSE: {mse:.2f}")
+            logger.info(f"Modelos treinados com {len(self.historical_data)} amostras reais. MSE: {fitted['mse']:.2f}")
             
             return True
             
@@ -280,6 +385,57 @@ class MLPredictor:
             logger.error(f"Erro ao treinar modelos: {e}")
             return False
 
+    def apply_trained_models(self, fitted: Dict):
+        """Aplica modelos treinados (inclusive vindos de outro processo) e salva em disco"""
+        self.performance_model = fitted['performance_model']
+        self.anomaly_model = fitted['anomaly_model']
+        self.scaler = fitted['scaler']
+        self.model_metadata = fitted.get('model_metadata', {})
+        self.build_fast_paths()
+        
+        # Salvar modelos treinados
+        self.save_models()
+        
+        self.is_trained = True
+
+    def build_fast_paths(self):
+        """Prepara a inferência de uma linha sem overhead do scikit-learn"""
+        self.fast_predictor = build_fast_predictor(self.scaler, self.performance_model)
+        self.scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+        self.scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+        self.fast_anomaly_model = compile_isolation_forest(self.anomaly_model, len(self.scaler_mean))
+
+    def scale_features(self, features: List[float]) -> np.ndarray:
+        """Mesma normalização do StandardScaler, em NumPy (uma linha)"""
+        return (np.asarray(features, dtype=np.float64) - self.scaler_mean) / self.scaler_scale
+
+    def predict_performance_score(self, features: List[float]) -> float:
+        """Prediz o score de performance de UMA linha de features (caminho rápido se linear)"""
+        if self.fast_predictor is not None:
+            return float(self.fast_predictor.predict(features)[0])
+        return float(self.performance_model.predict(self.scale_features(features)[None, :])[0])
+
+    def predict_is_anomaly(self, features: List[float]) -> bool:
+        """Detecta anomalia em UMA linha (floresta compilada quando disponível)"""
+        row = self.scale_features(features)
+        if self.fast_anomaly_model is not None:
+            return bool(self.fast_anomaly_model.decision(row) < 0)  # predict == -1 <=> decision_function < 0
+        return bool(self.anomaly_model.predict(row[None, :])[0] == -1)
+
+    def collect_training_samples(self, count: int = 10, interval: float = 2.0,
+                                 should_stop=None) -> int:
+        """Coleta amostras REAIS extras para completar o conjunto de treinamento"""
+        collected = 0
+        for _ in range(count):
+            if should_stop and should_stop():
+                break
+            snapshot = self.collect_real_system_snapshot()
+            if snapshot:
+                self.add_sample(snapshot)
+                collected += 1
+            time.sleep(interval)  # Aguardar entre coletas
+        return collected
+
     def predict_real_performance_impact(self, current_snapshot: Dict = None) -> Dict:
         """Faz predição REAL de impacto na performance"""
         try:
@@ -302,13 +458,12 @@ class MLPredictor:
             
             # Extrair features REAIS
             features = self.extract_features_from_snapshot(current_snapshot)
-            features_scaled = self.scaler.transform([features])
             
             # Predição com modelo treinado
-            predicted_score = self.performance_model.predict(features_scaled)[0]
+            predicted_score = self.predict_performance_score(features)
             
             # Detectar se é anomalia
-            is_anomaly = self.anomaly_model.predict(features_scaled)[0] == -1
+            is_anomaly = self.predict_is_anomaly(features)
             
             # Calcular cenários de otimização REAIS
             optimization_scenarios = self.calculate_real_optimization_scenarios(current_snapshot)
@@ -317,6 +472,7 @@ class MLPredictor:
                 'current_performance_score': self.calculate_real_performance_score(current_snapshot),
                 'predicted_score': predicted_score,
                 'is_anomaly': is_anomaly,
+                'estimator_backend': self.model_metadata.get('backend', 'random_forest'),
                 'confidence_score': min(1.0, len(self.historical_data) / 100),
                 'optimization_scenarios': optimization_scenarios,
                 'recommendations': self.generate_real_recommendations(current_snapshot)
@@ -452,23 +608,26 @@ class MLPredictor:
             return []
 
     def save_historical_data(self):
-        """Salva dados históricos REAIS em arquivo"""
+        """Salva dados históricos REAIS em arquivo (.npz compacto)"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.historical_data, f, indent=2, ensure_ascii=False, default=str)
+            self.historical_data.save(self.data_file)
         except Exception as e:
             logger.error(f"Erro ao salvar dados históricos: {e}")
 
     def load_historical_data(self):
-        """Carrega dados históricos REAIS do arquivo"""
+        """Carrega dados históricos REAIS do arquivo (migra o JSON antigo se necessário)"""
         try:
             if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.historical_data = json.load(f)
+                self.historical_data = SampleStore.load(self.data_file, self.max_samples)
                 logger.info(f"Carregados {len(self.historical_data)} pontos de dados históricos")
+            elif os.path.exists(self.legacy_data_file):
+                self.historical_data = SampleStore.from_legacy_json(self.legacy_data_file, self.max_samples)
+                self.save_historical_data()
+                os.replace(self.legacy_data_file, self.legacy_data_file + ".migrated")
+                logger.info(f"Migrados {len(self.historical_data)} pontos de dados históricos para {self.data_file}")
         except Exception as e:
             logger.error(f"Erro ao carregar dados históricos: {e}")
-            self.historical_data = []
+            self.historical_data = SampleStore(self.max_samples)
 
     def save_models(self):
         """Salva modelos treinados"""
@@ -485,6 +644,10 @@ class MLPredictor:
             with open(os.path.join(self.models_dir, 'scaler.pkl'), 'wb') as f:
                 pickle.dump(self.scaler, f)
             
+            # Salvar metadados da seleção do estimador
+            with open(os.path.join(self.models_dir, 'model_metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.model_metadata, f, indent=2, ensure_ascii=False)
+            
             logger.info("Modelos salvos com sucesso")
             
         except Exception as e:
@@ -507,6 +670,12 @@ class MLPredictor:
                 with open(scaler_path, 'rb') as f:
                     self.scaler = pickle.load(f)
                 
+                metadata_path = os.path.join(self.models_dir, 'model_metadata.json')
+                if os.path.exists(metadata_path):
+                    with open(metadata_path, 'r', encoding='utf-8') as f:
+                        self.model_metadata = json.load(f)
+                self.build_fast_paths()
+                
                 self.is_trained = True
                 logger.info("Modelos carregados com sucesso")
                 return True
@@ -517,6 +686,10 @@ class MLPredictor:
             logger.error(f"Erro ao carregar modelos: {e}")
             return False
 
+    def get_maintenance_forecast(self) -> Dict:
+        """Retorna previsões de manutenção baseadas no histórico REAL"""
+        return self.trend_forecaster.get_forecast_report()
+
     def get_real_system_status(self) -> Dict:
         """Retorna status REAL atual do sistema"""
         try:
@@ -543,10 +716,10 @@ class MLPredictor:
 def quick_system_analysis() -> Dict:
     """Análise rápida REAL do sistema"""
     try:
-        predictor = MLPredictor()
-        snapshot = predictor.collect_real_system_snapshot()
-        performance_score = predictor.calculate_real_performance_score(snapshot)
-        recommendations = predictor.generate_real_recommendations(snapshot)
+        with borrow_service('ml_predictor') as predictor:
+            snapshot = predictor.collect_real_system_snapshot()
+            performance_score = predictor.calculate_real_performance_score(snapshot)
+            recommendations = predictor.generate_real_recommendations(snapshot)
         
         return {
             'performance_score': performance_score,
@@ -561,29 +734,19 @@ def quick_system_analysis() -> Dict:
 def train_all_models_quick() -> Dict:
     """Treina todos os modelos rapidamente com dados REAIS"""
     try:
-        predictor = MLPredictor()
-        
-        # Coletar dados por alguns segundos se não houver dados suficientes
-        if len(predictor.historical_data) < predictor.min_samples_for_training:
-            logger.info("Coletando dados para treinamento...")
-            for _ in range(10):  # Coletar 10 amostras
-                snapshot = predictor.collect_real_system_snapshot()
-                if snapshot:
-                    performance_score = predictor.calculate_real_performance_score(snapshot)
-                    data_point = {
-                        'snapshot': snapshot,
-                        'performance_score': performance_score,
-                        'features': predictor.extract_features_from_snapshot(snapshot)
-                    }
-                    predictor.historical_data.append(data_point)
-                time.sleep(2)  # Aguardar 2 segundos entre coletas
-        
-        # Tentar treinar
-        success = predictor.train_models_with_real_data()
+        with borrow_service('ml_predictor') as predictor:
+            # Coletar dados por alguns segundos se não houver dados suficientes
+            if len(predictor.historical_data) < predictor.min_samples_for_training:
+                logger.info("Coletando dados para treinamento...")
+                predictor.collect_training_samples(10, 2)
+            
+            # Tentar treinar
+            success = predictor.train_models_with_real_data()
+            data_points = len(predictor.historical_data)
         
         return {
             'success': success,
-            'data_points': len(predictor.historical_data),
+            'data_points': data_points,
             'training_time': 20,  # Tempo REAL estimado
             'improvement': 5.2 if success else 0
         }
@@ -0,0 +1,243 @@
+# ai_modules/ocr_pipeline.py - OCR em passada única, restrito a regiões de texto e com cache por conteúdo
+import os
+import sys
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.image_context import ImageContext, ImageInput
+from ai_modules.spatial_index import merge_overlapping_boxes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('ocr_pipeline')
+
+# Configuração do pytesseract (ajustar path se necessário)
+# pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+Region = Tuple[int, int, int, int]  # x, y, largura, altura
+
+
+class OcrPipeline:
+    """Tesseract só onde há texto, uma vez por conteúdo.
+
+    1. Regiões de texto são localizadas por gradiente morfológico + fechamento
+       horizontal (linhas de texto viram blocos compactos);
+    2. cada região é recortada do frame limiarizado e passa por um único
+       `image_to_data`; o texto corrido é reconstruído a partir das palavras
+       (bloco/parágrafo/linha), sem um segundo `image_to_string`;
+    3. os recortes rodam em paralelo (cada chamada é um processo tesseract) e
+       o resultado fica em um cache LRU indexado pelo hash do conteúdo do
+       recorte, então áreas da tela que não mudaram não são relidas.
+    """
+
+    def __init__(self, config: str = r'--oem 3 --psm 6 -l por+eng', max_workers: Optional[int] = None,
+                 cache_size: int = 1024, min_confidence: float = 30, max_regions: int = 48,
+                 band_height: int = 160, padding: int = 4):
+        self.config = config
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self.min_confidence = min_confidence
+        self.max_regions = max_regions  # acima disso, regiões são agrupadas em faixas horizontais
+        self.band_height = band_height
+        self.padding = padding
+        self._cache: 'OrderedDict[str, List[Dict]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.stats = {'runs': 0, 'tiles': 0, 'cache_hits': 0, 'tesseract_calls': 0, 'last_seconds': 0.0}
+
+        if self.max_workers > 1:
+            # Vários processos tesseract simultâneos: evitar que cada um abra várias threads OpenMP
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ocr')
+            return self._pool
+
+    def detect_text_regions(self, image: ImageInput) -> List[Region]:
+        """Retângulos candidatos a conter texto, em ordem de leitura.
+
+        Blocos mais altos que `band_height` (parágrafos com entrelinha
+        apertada, texto dentro de molduras) são fatiados, não descartados.
+        """
+        ctx = ImageContext.ensure(image)
+        gray = ctx.gray
+
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if h < 8 or w < 8:
+                continue
+            x0, x1 = max(0, x - self.padding), min(ctx.width, x + w + self.padding)
+            for top, bottom in self._split_rows(binary, x, y, w, h):
+                # Texto tem muitas transições; áreas lisas ou bordas isoladas ficam de fora
+                if bottom - top < 8 or cv2.countNonZero(binary[top:bottom, x:x + w]) / float(w * (bottom - top)) < 0.15:
+                    continue
+                # Margem vertical só nas bordas do bloco: fatias vizinhas que se
+                # sobrepusessem seriam unidas de novo em merge_overlapping_boxes
+                y0 = max(0, top - self.padding) if top == y else top
+                y1 = min(ctx.height, bottom + self.padding) if bottom == y + h else bottom
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+
+        # Regiões com margem que se sobrepõem seriam lidas duas vezes
+        regions = merge_overlapping_boxes(regions)
+        regions.sort(key=lambda r: (r[1], r[0]))
+        if len(regions) > self.max_regions:
+            regions = self._merge_into_bands(regions)
+        return regions
+
+    def _split_rows(self, binary: np.ndarray, x: int, y: int, w: int, h: int) -> List[Tuple[int, int]]:
+        """Faixas (y0, y1) de no máximo `band_height` linhas cobrindo o bloco.
+
+        Cada corte fica na metade inferior da faixa, na linha com menos
+        bordas: em texto, o espaço entre duas linhas.
+        """
+        if h <= self.band_height:
+            return [(y, y + h)]
+        profile = np.count_nonzero(binary[y:y + h, x:x + w], axis=1)
+        spans, start = [], 0
+        while h - start > self.band_height:
+            low = start + self.band_height // 2
+            cut = low + int(np.argmin(profile[low:start + self.band_height + 1]))
+            spans.append((y + start, y + cut))
+            start = cut
+        spans.append((y + start, y + h))
+        return spans
+
+    def _merge_into_bands(self, regions: List[Region]) -> List[Region]:
+        """Agrupa regiões (ordenadas por y) em faixas horizontais sem cortar linhas"""
+        bands = []
+        bx0, by0, bx1, by1 = None, None, None, None
+        for x, y, w, h in regions:
+            if bx0 is not None and (y <= by1 or y + h - by0 <= self.band_height):
+                bx0, by0, bx1, by1 = min(bx0, x), min(by0, y), max(bx1, x + w), max(by1, y + h)
+                continue
+            if bx0 is not None:
+                bands.append((bx0, by0, bx1 - bx0, by1 - by0))
+            bx0, by0, bx1, by1 = x, y, x + w, y + h
+        if bx0 is not None:
+            bands.append((bx0, by0, bx1 - bx0, by1 - by0))
+        return bands
+
+    def _tile_key(self, tile: np.ndarray) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(tile.shape).encode())
+        digest.update(self.config.encode())
+        digest.update(np.ascontiguousarray(tile).data)
+        return digest.hexdigest()
+
+    def ocr_tile(self, tile: np.ndarray) -> List[Dict]:
+        """Palavras de um recorte (coordenadas relativas ao recorte), via cache"""
+        key = self._tile_key(tile)
+        with self._cache_lock:
+            words = self._cache.get(key)
+            if words is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return words
+
+        data = pytesseract.image_to_data(tile, config=self.config, output_type=pytesseract.Output.DICT)
+        words = []
+        for i in range(len(data['text'])):
+            word = str(data['text'][i]).strip()
+            if not word:
+                continue
+            words.append({
+                'text': word,
+                'confidence': float(data['conf'][i]),
+                'position': (int(data['left'][i]), int(data['top'][i])),
+                'size': (int(data['width'][i]), int(data['height'][i])),
+                'line_key': (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            })
+
+        with self._cache_lock:
+            self.stats['tesseract_calls'] += 1
+            self._cache[key] = words
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return words
+
+    def read_text(self, tile: np.ndarray) -> str:
+        """Texto corrido de um recorte (substitui image_to_string)"""
+        return '\n'.join(self._lines_from_words([((0,) + w['line_key'], w) for w in self.ocr_tile(tile)]))
+
+    @staticmethod
+    def _lines_from_words(keyed_words: List[Tuple[tuple, Dict]]) -> List[str]:
+        lines: 'OrderedDict[tuple, List[str]]' = OrderedDict()
+        for key, word in keyed_words:
+            lines.setdefault(key, []).append(word['text'])
+        return [' '.join(parts) for parts in lines.values()]
+
+    def recognize(self, image: ImageInput, regions: Optional[List[Region]] = None) -> Dict:
+        """OCR do frame inteiro (memoizado no ImageContext quando regions=None)"""
+        ctx = ImageContext.ensure(image)
+        if regions is None:
+            return ctx.get('ocr', lambda: self._recognize(ctx, self.detect_text_regions(ctx)))
+        return self._recognize(ctx, regions)
+
+    def _recognize(self, ctx: ImageContext, regions: List[Region]) -> Dict:
+        started = time.perf_counter()
+        thresh = ctx.otsu_threshold
+        tiles = [thresh[y:y + h, x:x + w] for x, y, w, h in regions]
+
+        if len(tiles) > 1 and self.max_workers > 1:
+            tile_words = list(self._get_pool().map(self.ocr_tile, tiles))
+        else:
+            tile_words = [self.ocr_tile(tile) for tile in tiles]
+
+        words, keyed = [], []
+        for index, ((x, y, _, _), found) in enumerate(zip(regions, tile_words)):
+            for word in found:
+                keyed.append(((index,) + word['line_key'], word))
+                if word['confidence'] > self.min_confidence:  # Filtrar palavras com baixa confiança
+                    words.append({
+                        'text': word['text'],
+                        'confidence': word['confidence'],
+                        'position': (x + word['position'][0], y + word['position'][1]),
+                        'size': word['size']
+                    })
+
+        lines = self._lines_from_words(keyed)
+        elapsed = time.perf_counter() - started
+        with self._cache_lock:
+            self.stats['runs'] += 1
+            self.stats['tiles'] += len(tiles)
+            self.stats['last_seconds'] = elapsed
+
+        return {
+            'text': '\n'.join(lines),
+            'lines': lines,
+            'words': words,
+            'regions': len(regions),
+            'elapsed_seconds': elapsed
+        }
+
+    def get_stats(self) -> Dict:
+        with self._cache_lock:
+            return {**self.stats, 'cache_entries': len(self._cache)}
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
@@ -0,0 +1,165 @@
+# ai_modules/process_profiles.py - Perfis de recursos por executável com médias decaídas
+import os
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('process_profiles')
+
+PROFILE_METRICS = ['cpu_percent', 'rss_mb', 'io_mb_per_sec', 'threads']
+
+# Desvios só contam acima destes valores absolutos (evita alertas por ruído de processos ociosos)
+MIN_ABSOLUTE_DEVIATION = np.array([15.0, 200.0, 5.0, 50.0])
+
+
+class ProcessCache:
+    """Leituras anteriores por PID, para converter contadores de I/O em taxas"""
+
+    def __init__(self):
+        self._io: Dict[int, Tuple[float, float]] = {}
+
+    def io_rate(self, pid: int, io_counters, now: float) -> float:
+        """MB/s de leitura+escrita desde a última amostra do processo"""
+        if io_counters is None:
+            return 0.0
+        total_mb = (io_counters.read_bytes + io_counters.write_bytes) / (1024 * 1024)
+        previous = self._io.get(pid)
+        self._io[pid] = (now, total_mb)
+        if previous is None or now <= previous[0] or total_mb < previous[1]:
+            return 0.0
+        return (total_mb - previous[1]) / (now - previous[0])
+
+    def prune(self, alive_pids):
+        """Descarta PIDs que não existem mais"""
+        alive = set(alive_pids)
+        for pid in [pid for pid in self._io if pid not in alive]:
+            del self._io[pid]
+
+
+class ProcessProfileStore:
+    """Perfil por executável: média e variância com decaimento exponencial.
+
+    Os perfis ficam em arrays (uma linha por executável) e cada amostra é
+    aplicada a todos os processos de uma vez com operações vetorizadas, então
+    o custo por ciclo continua baixo mesmo com centenas de processos. O número
+    de perfis é limitado por LRU.
+    """
+
+    def __init__(self, capacity: int = 512, half_life_hours: float = 24.0,
+                 min_observations: int = 10, z_threshold: float = 4.0):
+        self.capacity = capacity
+        self.half_life_seconds = half_life_hours * 3600
+        self.min_observations = min_observations
+        self.z_threshold = z_threshold
+
+        n = len(PROFILE_METRICS)
+        self.rows: "OrderedDict[str, int]" = OrderedDict()  # nome -> linha (ordem = LRU)
+        self.weight = np.zeros(capacity, dtype=np.float64)
+        self.observations = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros((capacity, n), dtype=np.float64)
+        self.sq = np.zeros((capacity, n), dtype=np.float64)  # soma ponderada dos quadrados dos desvios
+        self.last_update = np.zeros(capacity, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _row_for(self, name: str) -> int:
+        row = self.rows.get(name)
+        if row is not None:
+            self.rows.move_to_end(name)
+            return row
+        if len(self.rows) < self.capacity:
+            row = len(self.rows)
+        else:
+            _, row = self.rows.popitem(last=False)  # Executável visto há mais tempo
+        self.rows[name] = row
+        self.weight[row] = 0
+        self.observations[row] = 0
+        self.mean[row] = 0
+        self.sq[row] = 0
+        self.last_update[row] = 0
+        return row
+
+    def update(self, samples: Dict[str, List[float]], now: float) -> List[Dict]:
+        """Atualiza os perfis com uma amostra por executável e retorna os desvios"""
+        if not samples:
+            return []
+
+        names = list(samples.keys())
+        if len(names) > self.capacity:
+            # Mais executáveis que perfis: manter os que mais consomem CPU nesta amostra
+            names = sorted(names, key=lambda name: samples[name][0], reverse=True)[:self.capacity]
+        rows = np.array([self._row_for(name) for name in names])
+        values = np.asarray([samples[name] for name in names], dtype=np.float64)
+
+        # z-scores contra o histórico ANTES de incorporar a amostra
+        variance = np.where(self.weight[rows, None] > 0,
+                            self.sq[rows] / np.maximum(self.weight[rows, None], 1e-9), 0.0)
+        std = np.sqrt(variance)
+        old_mean = self.mean[rows]
+        deviation = values - old_mean
+        z = np.where(std > 1e-9, deviation / np.maximum(std, 1e-9), 0.0)
+
+        mature = self.observations[rows] >= self.min_observations
+        flagged = mature[:, None] & (z > self.z_threshold) & (deviation > MIN_ABSOLUTE_DEVIATION)
+
+        # Atualização com decaimento pelo tempo desde a última amostra do executável
+        elapsed = np.where(self.last_update[rows] > 0, now - self.last_update[rows], 0.0)
+        decay = np.power(0.5, np.maximum(elapsed, 0) / self.half_life_seconds)
+        new_weight = self.weight[rows] * decay + 1.0
+        delta = deviation
+        new_mean = old_mean + delta / new_weight[:, None]
+        self.sq[rows] = self.sq[rows] * decay[:, None] + delta * (values - new_mean)
+        self.mean[rows] = new_mean
+        self.weight[rows] = new_weight
+        self.observations[rows] += 1
+        self.last_update[rows] = now
+
+        deviations = []
+        for i in np.flatnonzero(flagged.any(axis=1)):
+            metrics = [PROFILE_METRICS[m] for m in np.flatnonzero(flagged[i])]
+            deviations.append({
+                'process_name': names[i],
+                'metrics': metrics,
+                'values': {m: float(values[i, PROFILE_METRICS.index(m)]) for m in metrics},
+                'expected': {m: float(old_mean[i, PROFILE_METRICS.index(m)]) for m in metrics},
+                'z_scores': {m: float(z[i, PROFILE_METRICS.index(m)]) for m in metrics}
+            })
+        return deviations
+
+    def is_mature(self, name: str) -> bool:
+        row = self.rows.get(name)
+        return row is not None and self.observations[row] >= self.min_observations
+
+    def get_profile(self, name: str) -> Optional[Dict]:
+        row = self.rows.get(name)
+        if row is None:
+            return None
+        std = np.sqrt(self.sq[row] / max(self.weight[row], 1e-9))
+        return {
+            'observations': int(self.observations[row]),
+            'mean': dict(zip(PROFILE_METRICS, self.mean[row].tolist())),
+            'std': dict(zip(PROFILE_METRICS, std.tolist()))
+        }
+
+    def save(self, path: str):
+        temp_path = path + ".tmp.npz"
+        rows = np.array(list(self.rows.values()), dtype=np.int64)
+        np.savez(temp_path, names=np.array(list(self.rows.keys()), dtype=str),
+                 weight=self.weight[rows], observations=self.observations[rows],
+                 mean=self.mean[rows], sq=self.sq[rows], last_update=self.last_update[rows])
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'ProcessProfileStore':
+        store = cls(**kwargs)
+        with np.load(path, allow_pickle=False) as data:
+            names = data['names'].tolist()[-store.capacity:]
+            count = len(names)
+            store.rows = OrderedDict((name, i) for i, name in enumerate(names))
+            for attr in ['weight', 'observations', 'mean', 'sq', 'last_update']:
+                getattr(store, attr)[:count] = data[attr][-count:] if count else data[attr][:0]
+        return store
@@ -0,0 +1,139 @@
+# ai_modules/root_cause.py - Ranking de processos responsáveis por anomalias de sistema
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('root_cause')
+
+# Tipo de anomalia -> série de sistema explicada pelos processos
+ROOT_CAUSE_METRICS = {
+    'high_cpu_usage': 'cpu',
+    'high_memory_usage': 'memory'
+}
+
+METRIC_UNITS = {'cpu': '%', 'memory': 'MB'}
+
+
+class RootCauseEngine:
+    """Histórico curto por executável em arrays circulares (janela x processos).
+
+    A cada coleta completa guarda CPU (escala do sistema: % / núcleos) e RSS
+    de cada executável junto com a série do sistema. Quando um alerta abre,
+    `rank` compara o trecho recente com o início da janela para todos os
+    processos de uma vez: participação na variação do sistema e correlação
+    com a série do sistema.
+    """
+
+    def __init__(self, window: int = 30, capacity: int = 512):
+        self.window = window
+        self.capacity = capacity
+        self.rows: Dict[str, int] = {}
+        self.names: List[Optional[str]] = [None] * capacity
+        self.last_seen = np.full(capacity, -1, dtype=np.int64)  # índice da última amostra com o processo
+        self.series = {
+            'cpu': np.zeros((capacity, window), dtype=np.float32),
+            'memory': np.zeros((capacity, window), dtype=np.float32)
+        }
+        self.system = {
+            'cpu': np.zeros(window, dtype=np.float32),
+            'memory': np.zeros(window, dtype=np.float32)
+        }
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.count = 0  # total de amostras registradas
+
+    def _row_for(self, name: str) -> int:
+        """Linha do executável; marcada como vista já aqui, para não ser despejada na mesma coleta"""
+        row = self.rows.get(name)
+        if row is None:
+            if len(self.rows) < self.capacity:
+                row = len(self.rows)
+            else:
+                row = int(np.argmin(self.last_seen))  # executável ausente há mais tempo
+                del self.rows[self.names[row]]
+                for series in self.series.values():
+                    series[row] = 0
+            self.rows[name] = row
+            self.names[row] = name
+        self.last_seen[row] = self.count
+        return row
+
+    def record(self, timestamp: float, samples: Dict[str, List[float]], cpu_percent: float,
+               memory_used_mb: float, cpu_count: int = 1):
+        """Registra uma coleta: samples = {nome: [cpu %, rss_mb, ...]} (agregado por executável)"""
+        slot = self.count % self.window
+        for series in self.series.values():
+            series[:, slot] = 0  # processos ausentes nesta amostra contam como zero
+
+        if samples:
+            names = list(samples.keys())
+            if len(names) > self.capacity:
+                names = sorted(names, key=lambda name: samples[name][0], reverse=True)[:self.capacity]
+            rows = np.array([self._row_for(name) for name in names])
+            values = np.asarray([samples[name][:2] for name in names], dtype=np.float32)
+            self.series['cpu'][rows, slot] = values[:, 0] / max(cpu_count, 1)
+            self.series['memory'][rows, slot] = values[:, 1]
+
+        self.system['cpu'][slot] = cpu_percent
+        self.system['memory'][slot] = memory_used_mb
+        self.timestamps[slot] = timestamp
+        self.count += 1
+
+    def _ordered(self, values: np.ndarray, n: int) -> np.ndarray:
+        """Últimas n colunas em ordem cronológica"""
+        end = self.count % self.window
+        order = (np.arange(end - n, end)) % self.window
+        return values[..., order]
+
+    def rank(self, metric: str, top: int = 5, recent_fraction: float = 0.2) -> List[Dict]:
+        """Processos que melhor explicam a variação recente da métrica do sistema"""
+        n = min(self.count, self.window)
+        if n < 4 or not self.rows:
+            return []
+
+        active = np.array(sorted(self.rows.values()))
+        matrix = self._ordered(self.series[metric][active], n).astype(np.float64)
+        system = self._ordered(self.system[metric], n).astype(np.float64)
+
+        # Variação: média do trecho recente menos média do início da janela
+        recent = max(1, int(round(n * recent_fraction)))
+        deltas = matrix[:, -recent:].mean(axis=1) - matrix[:, :-recent].mean(axis=1)
+        system_delta = system[-recent:].mean() - system[:-recent].mean()
+
+        # Participação na variação do sistema (ou no nível atual, se o sistema já estava alto)
+        reference = system_delta if system_delta > 1e-6 else max(system[-recent:].mean(), 1e-6)
+        basis = deltas if system_delta > 1e-6 else matrix[:, -recent:].mean(axis=1)
+        share = basis / reference
+
+        # Correlação de Pearson de cada processo com a série do sistema (vetorizada)
+        centered = matrix - matrix.mean(axis=1, keepdims=True)
+        system_centered = system - system.mean()
+        norms = np.linalg.norm(centered, axis=1) * np.linalg.norm(system_centered)
+        correlation = np.where(norms > 1e-9, centered @ system_centered / np.maximum(norms, 1e-9), 0.0)
+
+        score = np.clip(share, 0, None) * (0.5 + 0.5 * np.clip(correlation, 0, None))
+        candidates = np.flatnonzero(score > 0)
+        if candidates.size == 0:
+            return []
+        order = candidates[np.argsort(score[candidates])[::-1][:top]]
+
+        return [{
+            'process_name': self.names[active[i]],
+            'score': float(score[i]),
+            'share': float(min(share[i], 1.0)),
+            'correlation': float(correlation[i]),
+            'delta': float(deltas[i]),
+            'current': float(matrix[i, -1]),
+            'unit': METRIC_UNITS[metric]
+        } for i in order]
+
+    def explain(self, anomaly_type: str, top: int = 5) -> List[Dict]:
+        metric = ROOT_CAUSE_METRICS.get(anomaly_type)
+        return self.rank(metric, top) if metric else []
+
+
+def describe_culprits(culprits: List[Dict], limit: int = 3) -> str:
+    """Resumo curto para a descrição do alerta"""
+    parts = [f"{c['process_name']} ({c['share']:.0%}, {c['current']:.0f}{c['unit']})" for c in culprits[:limit]]
+    return "Provável causa: " + ", ".join(parts) if parts else ""
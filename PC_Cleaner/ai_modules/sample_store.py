@@ -0,0 +1,300 @@
+# ai_modules/sample_store.py - Armazenamento compacto de amostras históricas do MLPredictor
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Iterator, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('sample_store')
+
+N_FEATURES = 18
+TOP_PROCESSES = 5  # top_cpu_processes e top_memory_processes têm até 5 entradas cada
+
+# Campos do snapshot que não estão nas features (necessários para reconstruí-lo)
+AUX_COLUMNS = [
+    ('cpu', 'count'),
+    ('memory', 'total_gb'),
+    ('memory', 'used_gb'),
+    ('swap', 'total_gb'),
+    ('swap', 'used_gb'),
+    ('disk', 'total_gb'),
+    ('disk', 'used_gb'),
+    ('temperatures', 'max')
+]
+
+# Contadores cumulativos: int64 para não perder precisão
+COUNTER_COLUMNS = [
+    ('disk_io', 'read_count'),
+    ('disk_io', 'write_count'),
+    ('network', 'packets_sent'),
+    ('network', 'packets_recv')
+]
+
+
+class SampleStore:
+    """Histórico de amostras em arrays NumPy de tamanho fixo.
+
+    Cada amostra ocupa uma linha float32 de features, o score, alguns campos
+    auxiliares e os top processos como ids de nomes deduplicados - algumas
+    centenas de bytes contra vários KB do snapshot em JSON. O snapshot legível
+    é reconstruído sob demanda por get_snapshot().
+
+    Cheio, funciona como buffer circular: `head` aponta a amostra mais antiga
+    e cada append sobrescreve uma linha em O(1). As linhas só são
+    reordenadas (da mais antiga para a mais nova) quando os arrays são lidos
+    em bloco ou salvos.
+
+    A coleta (append) e o treino/salvamento rodam em threads diferentes:
+    escrita, reordenação e toda leitura passam pelo mesmo lock, e as leituras
+    em bloco devolvem cópias tiradas de um único estado consistente.
+
+    Mantém compatibilidade com o uso antigo de `historical_data` como lista:
+    len(), iteração e indexação retornam {'snapshot', 'performance_score', 'features'}.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.count = 0
+        self.head = 0  # linha da amostra mais antiga (≠ 0 só depois de encher)
+        self.process_names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.boot_times = np.zeros(capacity, dtype=np.float64)
+        self.features = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+        self.scores = np.zeros(capacity, dtype=np.float32)
+        self.aux = np.zeros((capacity, len(AUX_COLUMNS)), dtype=np.float32)
+        self.counters = np.zeros((capacity, len(COUNTER_COLUMNS)), dtype=np.int64)
+        # [top_cpu (5) | top_memory (5)]; nome -1 = posição vazia
+        self.proc_pids = np.zeros((capacity, 2 * TOP_PROCESSES), dtype=np.int32)
+        self.proc_names = np.full((capacity, 2 * TOP_PROCESSES), -1, dtype=np.int32)
+        self.proc_cpu = np.zeros((capacity, 2 * TOP_PROCESSES), dtype=np.float32)
+        self.proc_memory = np.zeros((capacity, 2 * TOP_PROCESSES), dtype=np.float32)
+
+    _ARRAYS = ['timestamps', 'boot_times', 'features', 'scores', 'aux', 'counters',
+               'proc_pids', 'proc_names', 'proc_cpu', 'proc_memory']
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _row(self, index: int) -> int:
+        """Linha física da amostra `index` (0 = mais antiga)"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("índice fora do histórico")
+        return (self.head + index) % self.capacity
+
+    def _unroll(self):
+        """Reordena as linhas para a mais antiga ficar em 0 (antes de leituras em bloco; com o lock)"""
+        if self.head == 0:
+            return
+        for attr in self._ARRAYS:
+            array = getattr(self, attr)
+            array[:] = np.roll(array, -self.head, axis=0)
+        self.head = 0
+
+    def __getitem__(self, index):
+        with self._lock:
+            if isinstance(index, slice):
+                return [self[i] for i in range(*index.indices(self.count))]
+            row = self._row(index)
+            return {
+                'snapshot': self._snapshot_at(row),
+                'performance_score': float(self.scores[row]),
+                'features': self.features[row].tolist()
+            }
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Cópia sob o lock: appends durante a iteração não deslocam as amostras
+        yield from self[:]
+
+    def _name_id(self, name: Optional[str]) -> int:
+        name = name or ''
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.process_names)
+            self.process_names.append(name)
+            self._name_ids[name] = name_id
+        return name_id
+
+    def append(self, snapshot: Dict, performance_score: float, features: List[float]):
+        """Adiciona uma amostra (descarta a mais antiga quando cheio)"""
+        with self._lock:
+            self._append(snapshot, performance_score, features)
+
+    def _append(self, snapshot: Dict, performance_score: float, features: List[float]):
+        if self.count == self.capacity:
+            i = self.head  # sobrescreve a mais antiga
+            self.head = (self.head + 1) % self.capacity
+        else:
+            i = (self.head + self.count) % self.capacity
+            self.count += 1
+
+        try:
+            self.timestamps[i] = datetime.fromisoformat(snapshot['timestamp']).timestamp()
+        except (KeyError, ValueError, TypeError):
+            self.timestamps[i] = datetime.now().timestamp()
+        self.boot_times[i] = snapshot.get('system', {}).get('boot_time', 0) or 0
+        self.features[i] = np.asarray(features, dtype=np.float32)[:N_FEATURES]
+        self.scores[i] = performance_score
+
+        for c, (section, key) in enumerate(AUX_COLUMNS):
+            if section == 'temperatures':
+                readings = [t for values in snapshot.get('temperatures', {}).values() for t in values]
+                self.aux[i, c] = max(readings) if readings else np.nan
+            else:
+                self.aux[i, c] = snapshot.get(section, {}).get(key, 0) or 0
+        for c, (section, key) in enumerate(COUNTER_COLUMNS):
+            self.counters[i, c] = int(snapshot.get(section, {}).get(key, 0) or 0)
+
+        self.proc_names[i] = -1
+        self.proc_pids[i] = 0
+        self.proc_cpu[i] = 0
+        self.proc_memory[i] = 0
+        processes = snapshot.get('processes', {})
+        for offset, key in ((0, 'top_cpu_processes'), (TOP_PROCESSES, 'top_memory_processes')):
+            for j, proc in enumerate(processes.get(key, [])[:TOP_PROCESSES]):
+                self.proc_names[i, offset + j] = self._name_id(proc.get('name'))
+                self.proc_pids[i, offset + j] = proc.get('pid') or 0
+                self.proc_cpu[i, offset + j] = proc.get('cpu_percent') or 0
+                self.proc_memory[i, offset + j] = proc.get('memory_percent') or 0
+
+    def _processes(self, i: int, offset: int) -> List[Dict]:
+        processes = []
+        for j in range(offset, offset + TOP_PROCESSES):
+            name_id = self.proc_names[i, j]
+            if name_id < 0:
+                break
+            processes.append({
+                'pid': int(self.proc_pids[i, j]),
+                'name': self.process_names[name_id],
+                'cpu_percent': float(self.proc_cpu[i, j]),
+                'memory_percent': float(self.proc_memory[i, j])
+            })
+        return processes
+
+    def get_snapshot(self, index: int) -> Dict:
+        """Reconstrói o snapshot legível (mesmo formato de collect_real_system_snapshot)"""
+        with self._lock:
+            return self._snapshot_at(self._row(index))
+
+    def _snapshot_at(self, index: int) -> Dict:
+        f = self.features[index].astype(float)
+        aux = dict(zip(AUX_COLUMNS, self.aux[index].astype(float)))
+        counters = dict(zip(COUNTER_COLUMNS, self.counters[index].tolist()))
+        max_temperature = aux[('temperatures', 'max')]
+
+        return {
+            'timestamp': datetime.fromtimestamp(self.timestamps[index]).isoformat(),
+            'cpu': {
+                'percent': f[0],
+                'frequency_mhz': f[1],
+                'count': int(aux[('cpu', 'count')])
+            },
+            'memory': {
+                'percent': f[2],
+                'total_gb': aux[('memory', 'total_gb')],
+                'available_gb': f[3],
+                'used_gb': aux[('memory', 'used_gb')]
+            },
+            'swap': {
+                'percent': f[4],
+                'total_gb': aux[('swap', 'total_gb')],
+                'used_gb': aux[('swap', 'used_gb')]
+            },
+            'disk': {
+                'percent': f[5],
+                'total_gb': aux[('disk', 'total_gb')],
+                'free_gb': f[6],
+                'used_gb': aux[('disk', 'used_gb')]
+            },
+            'disk_io': {
+                'read_mb': f[7],
+                'write_mb': f[8],
+                'read_count': counters[('disk_io', 'read_count')],
+                'write_count': counters[('disk_io', 'write_count')]
+            },
+            'network': {
+                'bytes_sent_mb': f[9],
+                'bytes_recv_mb': f[10],
+                'packets_sent': counters[('network', 'packets_sent')],
+                'packets_recv': counters[('network', 'packets_recv')]
+            },
+            'processes': {
+                'count': int(f[11]),
+                'top_cpu_processes': self._processes(index, 0),
+                'top_memory_processes': self._processes(index, TOP_PROCESSES)
+            },
+            'system': {
+                'uptime_hours': f[12],
+                'boot_time': float(self.boot_times[index])
+            },
+            'temperatures': {} if np.isnan(max_temperature) else {'max': [max_temperature]}
+        }
+
+    def training_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Cópias (X float64, y float64) do mesmo estado do histórico, linhas alinhadas"""
+        with self._lock:
+            self._unroll()
+            return self.features[:self.count].astype(np.float64), self.scores[:self.count].astype(np.float64)
+
+    def iter_trend_points(self) -> Iterator[Tuple[float, Dict[str, float]]]:
+        """Pontos (timestamp, métricas) para o TrendForecaster sem reconstruir snapshots"""
+        with self._lock:
+            self._unroll()
+            timestamps = self.timestamps[:self.count].copy()
+            features = self.features[:self.count].copy()
+            used_gb = self.aux[:self.count, AUX_COLUMNS.index(('memory', 'used_gb'))].copy()
+        for i in range(len(timestamps)):
+            f = features[i]
+            yield float(timestamps[i]), {
+                'cpu_percent': float(f[0]),
+                'memory_percent': float(f[2]),
+                'memory_used_gb': float(used_gb[i]),
+                'disk_percent': float(f[5]),
+                'disk_free_gb': float(f[6])
+            }
+
+    def save(self, path: str):
+        """Salva em .npz (escrita atômica)"""
+        temp_path = path + ".tmp.npz"
+        with self._lock:
+            self._unroll()
+            arrays = {attr: getattr(self, attr)[:self.count].copy() for attr in self._ARRAYS}
+            process_names = np.array(self.process_names, dtype=str)
+        np.savez(temp_path, process_names=process_names, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, capacity: int = 1000) -> 'SampleStore':
+        """Carrega de .npz (só cópia de arrays, sem parse de JSON)"""
+        store = cls(capacity)
+        with np.load(path, allow_pickle=False) as data:
+            count = min(len(data['scores']), capacity)
+            for attr in cls._ARRAYS:
+                getattr(store, attr)[:count] = data[attr][-count:] if count else data[attr][:0]
+            store.process_names = data['process_names'].tolist()
+        store._name_ids = {name: i for i, name in enumerate(store.process_names)}
+        store.count = count
+        return store
+
+    @classmethod
+    def from_legacy_json(cls, path: str, capacity: int = 1000) -> 'SampleStore':
+        """Converte o formato antigo (lista de dicts em JSON indentado)"""
+        store = cls(capacity)
+        with open(path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        for point in legacy[-capacity:]:
+            snapshot = point.get('snapshot', {})
+            if snapshot and point.get('features'):
+                store.append(snapshot, point.get('performance_score', 0), point['features'])
+        return store
+
+    def memory_bytes(self) -> int:
+        return sum(getattr(self, attr).nbytes for attr in self._ARRAYS)
@@ -0,0 +1,213 @@
+# ai_modules/screen_capture.py - Captura de tela com backends plugáveis e reaproveitamento de buffers
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import ImageGrab
+
+try:
+    import mss
+except ImportError:  # Backend opcional; sem ele a captura usa o ImageGrab do PIL
+    mss = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('screen_capture')
+
+Region = Tuple[int, int, int, int]  # left, top, largura, altura (coordenadas da tela virtual)
+
+
+class CaptureBackend:
+    """Interface dos backends: `grab` devolve os pixels crus e o formato deles.
+
+    Monitores seguem a convenção do mss: 0 = todas as telas, 1 = principal.
+    """
+
+    name = 'base'
+    color_format = 'RGB'  # 'RGB' ou 'BGRA'
+
+    def monitors(self) -> List[Region]:
+        raise NotImplementedError
+
+    def grab(self, region: Region) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MssBackend(CaptureBackend):
+    """mss: BGRA direto do sistema, exposto como view sem cópia (np.frombuffer)"""
+
+    name = 'mss'
+    color_format = 'BGRA'
+
+    def __init__(self):
+        if mss is None:
+            raise ImportError("mss não está instalado")
+        self._local = threading.local()  # Instâncias do mss não podem ser compartilhadas entre threads
+
+    def _sct(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def monitors(self) -> List[Region]:
+        return [(m['left'], m['top'], m['width'], m['height']) for m in self._sct().monitors]
+
+    def grab(self, region: Region) -> np.ndarray:
+        left, top, width, height = region
+        shot = self._sct().grab({'left': left, 'top': top, 'width': width, 'height': height})
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class PilBackend(CaptureBackend):
+    """ImageGrab do PIL (sempre disponível); uma cópia para numpy é inevitável"""
+
+    name = 'pil'
+    color_format = 'RGB'
+
+    def __init__(self):
+        self._monitors: Optional[List[Region]] = None
+
+    def monitors(self) -> List[Region]:
+        if self._monitors is None:
+            primary = ImageGrab.grab().size
+            try:
+                everything = ImageGrab.grab(all_screens=True).size
+            except TypeError:  # all_screens só existe em versões recentes (e só no Windows)
+                everything = primary
+            self._monitors = [(0, 0, everything[0], everything[1]), (0, 0, primary[0], primary[1])]
+        return self._monitors
+
+    def grab(self, region: Region) -> np.ndarray:
+        monitors = self.monitors()
+        if region == monitors[1]:
+            image = ImageGrab.grab()
+        elif region == monitors[0]:
+            image = ImageGrab.grab(all_screens=True)  # Origem da tela virtual pode ser negativa: sem bbox
+        else:
+            left, top, width, height = region
+            try:
+                image = ImageGrab.grab(bbox=(left, top, left + width, top + height), all_screens=True)
+            except TypeError:
+                image = ImageGrab.grab(bbox=(left, top, left + width, top + height))
+        return np.asarray(image.convert('RGB') if image.mode != 'RGB' else image)
+
+
+BACKENDS = {
+    'mss': MssBackend,
+    'pil': PilBackend
+}
+
+
+def create_backend(name: str = 'auto') -> CaptureBackend:
+    """'auto' = mss se instalado, senão PIL"""
+    if name == 'auto':
+        name = 'mss' if mss is not None else 'pil'
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de captura desconhecido: {name}")
+    return BACKENDS[name]()
+
+
+class ScreenCapture:
+    """Captura BGR pronta para OpenCV, opcionalmente sem alocar um frame novo a cada chamada.
+
+    Com `reuse_buffer=True` os frames são escritos em um anel de `ring_size`
+    buffers pré-alocados (a conversão de cor e a redução escrevem direto no
+    destino), então um frame devolvido continua válido só até `ring_size`
+    capturas depois - uso restrito a quem consome o frame antes da próxima
+    captura (monitoramento incremental). Com `reuse_buffer=False` a conversão
+    de cor aloca um frame próprio do chamador. `scale` < 1 reduz na captura
+    (INTER_AREA) e `region`/`monitor` restringem a área capturada.
+    """
+
+    def __init__(self, backend: str = 'auto', monitor: int = 1, region: Optional[Region] = None,
+                 scale: float = 1.0, ring_size: int = 2, latency_window: int = 120):
+        self.backend = create_backend(backend)
+        self.monitor = monitor
+        self.region = region
+        self.scale = scale
+        self.ring_size = max(1, ring_size)
+        self._ring: List[Optional[np.ndarray]] = [None] * self.ring_size
+        self._scaled: Optional[np.ndarray] = None  # Buffer intermediário da redução (formato do backend)
+        self._next = 0
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=latency_window)
+        self.stats = {'captures': 0, 'errors': 0, 'buffer_allocations': 0}
+
+    def resolve_region(self, region: Optional[Region] = None, monitor: Optional[int] = None) -> Region:
+        if region is not None:
+            return region
+        if self.region is not None and monitor is None:
+            return self.region
+        monitors = self.backend.monitors()
+        index = self.monitor if monitor is None else monitor
+        if not 0 <= index < len(monitors):
+            raise ValueError(f"Monitor {index} inexistente ({len(monitors) - 1} disponíveis)")
+        return monitors[index]
+
+    def _buffer(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        buffer = self._ring[slot]
+        if buffer is None or buffer.shape != shape:
+            buffer = self._ring[slot] = np.empty(shape, dtype=np.uint8)
+            self.stats['buffer_allocations'] += 1
+        return buffer
+
+    def capture(self, region: Optional[Region] = None, monitor: Optional[int] = None,
+                scale: Optional[float] = None, reuse_buffer: bool = True) -> np.ndarray:
+        """Captura e devolve um frame BGR (buffer do anel se reuse_buffer, senão um array novo)"""
+        started = time.perf_counter()
+        scale = self.scale if scale is None else scale
+        try:
+            raw = self.backend.grab(self.resolve_region(region, monitor))
+            code = cv2.COLOR_BGRA2BGR if self.backend.color_format == 'BGRA' else cv2.COLOR_RGB2BGR
+
+            with self._lock:
+                if scale < 1.0:
+                    size = (max(1, int(round(raw.shape[1] * scale))), max(1, int(round(raw.shape[0] * scale))))
+                    if self._scaled is None or self._scaled.shape[:2] != (size[1], size[0]) \
+                            or self._scaled.shape[2] != raw.shape[2]:
+                        self._scaled = np.empty((size[1], size[0], raw.shape[2]), dtype=np.uint8)
+                        self.stats['buffer_allocations'] += 1
+                    cv2.resize(raw, size, dst=self._scaled, interpolation=cv2.INTER_AREA)
+                    raw = self._scaled
+
+                if reuse_buffer:
+                    slot = self._next
+                    self._next = (self._next + 1) % self.ring_size
+                    frame = self._buffer(slot, (raw.shape[0], raw.shape[1], 3))
+                    cv2.cvtColor(raw, code, dst=frame)
+                else:
+                    frame = cv2.cvtColor(raw, code)  # Frame próprio: sobrevive às próximas capturas
+                self.stats['captures'] += 1
+                self.latencies_ms.append((time.perf_counter() - started) * 1000)
+            return frame
+
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+
+    def get_stats(self) -> Dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            'backend': self.backend.name,
+            'scale': self.scale,
+            'last_ms': self.latencies_ms[-1] if self.latencies_ms else 0.0,
+            'avg_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+            **self.stats
+        }
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,286 @@
+# ai_modules/screenshot_timeline.py - Comparação em lote de uma linha do tempo de screenshots
+"""
+Percorre os screenshots de um diretório (ou de um intervalo de tempo) em
+ordem cronológica e compara cada frame com o anterior:
+
+- decodificação em um pool de threads com pré-busca limitada (memória
+  constante: só o frame anterior e os próximos `prefetch` ficam em memória);
+- cada frame é reduzido uma vez para cinza em `working_width` px;
+- SSIM e MSE por bloco a partir de somas inteiras (Σx, Σx², Σxy) por bloco;
+  as somas de cada frame são reaproveitadas no par seguinte;
+- saída: série de intensidade de mudança, regiões alteradas por par e os
+  blocos que mais mudam ao longo do período.
+
+Uso:
+    python ai_modules/screenshot_timeline.py data/screenshots
+    python ai_modules/screenshot_timeline.py data/screenshots --start 2024-05-01T08:00 --end 2024-05-01T18:00
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
+# Constantes do SSIM para 8 bits
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+def list_screenshots(directory: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> List[Tuple[datetime, str]]:
+    """Screenshots do diretório em ordem cronológica (data do nome do arquivo ou mtime)"""
+    frames = []
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        match = TIMESTAMP_PATTERN.search(entry.name)
+        try:
+            moment = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S') if match else None
+        except ValueError:
+            moment = None
+        if moment is None:
+            moment = datetime.fromtimestamp(entry.stat().st_mtime)
+        if (start and moment < start) or (end and moment > end):
+            continue
+        frames.append((moment, entry.path))
+    frames.sort()
+    return frames
+
+
+class ScreenshotTimeline:
+    """Compara frames consecutivos por blocos (SSIM/MSE) em streaming"""
+
+    def __init__(self, working_width: int = 640, tile_size: int = 16, ssim_threshold: float = 0.9,
+                 max_workers: Optional[int] = None, prefetch: int = 8):
+        self.working_width = working_width
+        self.tile_size = tile_size
+        self.ssim_threshold = ssim_threshold  # blocos abaixo disso contam como alterados
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.prefetch = max(prefetch, self.max_workers)
+        self._working_size: Optional[Tuple[int, int]] = None  # (largura, altura), definido pelo 1º frame
+        self._read_flag, self._reduction = cv2.IMREAD_GRAYSCALE, 1
+
+    def _decode(self, item: Tuple[datetime, str]) -> Optional[Dict]:
+        moment, path = item
+        image = cv2.imread(path, self._read_flag)
+        if image is None:
+            return None
+        height, width = image.shape
+        if self._read_flag != cv2.IMREAD_GRAYSCALE:
+            width, height = width * self._reduction, height * self._reduction  # tamanho aproximado do original
+        if self._working_size is None:
+            working_height = max(self.tile_size, int(round(height * self.working_width / width)))
+            # Múltiplos do bloco: sem sobras nas bordas
+            self._working_size = (self.working_width // self.tile_size * self.tile_size,
+                                  working_height // self.tile_size * self.tile_size)
+            # Demais frames já decodificados reduzidos (1/2, 1/4 ou 1/8) quando sobra resolução
+            for flag, reduction in ((cv2.IMREAD_REDUCED_GRAYSCALE_8, 8), (cv2.IMREAD_REDUCED_GRAYSCALE_4, 4),
+                                    (cv2.IMREAD_REDUCED_GRAYSCALE_2, 2)):
+                if width // reduction >= self._working_size[0] and height // reduction >= self._working_size[1]:
+                    self._read_flag, self._reduction = flag, reduction
+                    break
+        gray = cv2.resize(image, self._working_size, interpolation=cv2.INTER_AREA)
+
+        # Somas por bloco, reaproveitadas nos dois pares de que o frame participa
+        x = gray.astype(np.int32)
+        rows, cols = gray.shape[0] // self.tile_size, gray.shape[1] // self.tile_size
+        blocks = (rows, self.tile_size, cols, self.tile_size)
+        return {
+            'timestamp': moment,
+            'path': path,
+            'original_size': (width, height),
+            'pixels': x,
+            'sum': x.reshape(blocks).sum(axis=(1, 3), dtype=np.int64),
+            'sum_sq': (x * x).reshape(blocks).sum(axis=(1, 3), dtype=np.int64)
+        }
+
+    def iter_frames(self, items: List[Tuple[datetime, str]]) -> Iterator[Dict]:
+        """Frames decodificados em ordem, com no máximo `prefetch` decodificações pendentes"""
+        queue = iter(items)
+        # Primeiro frame legível fora do pool: define o tamanho de trabalho para todos
+        for item in queue:
+            first = self._decode(item)
+            if first is not None:
+                yield first
+                break
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='timeline_decode') as pool:
+            pending = deque()
+            for item in queue:
+                pending.append(pool.submit(self._decode, item))
+                if len(pending) >= self.prefetch:
+                    break
+            while pending:
+                frame = pending.popleft().result()
+                next_item = next(queue, None)
+                if next_item is not None:
+                    pending.append(pool.submit(self._decode, next_item))
+                if frame is not None:
+                    yield frame
+
+    def compare_pair(self, previous: Dict, current: Dict) -> Tuple[Dict, np.ndarray]:
+        """SSIM/MSE por bloco entre dois frames; retorna o resumo e a máscara de blocos alterados"""
+        n = self.tile_size * self.tile_size
+        rows, cols = current['sum'].shape
+        sum_xy = (previous['pixels'] * current['pixels']).reshape(
+            rows, self.tile_size, cols, self.tile_size).sum(axis=(1, 3), dtype=np.int64)
+
+        sx, sy = previous['sum'], current['sum']
+        sxx, syy = previous['sum_sq'], current['sum_sq']
+
+        # MSE exato a partir das somas inteiras: Σ(x-y)² = Σx² + Σy² - 2Σxy
+        tile_mse = (sxx + syy - 2 * sum_xy) / n
+
+        mx, my = sx / n, sy / n
+        vx = sxx / n - mx * mx
+        vy = syy / n - my * my
+        cov = sum_xy / n - mx * my
+        tile_ssim = ((2 * mx * my + SSIM_C1) * (2 * cov + SSIM_C2)) / \
+                    ((mx * mx + my * my + SSIM_C1) * (vx + vy + SSIM_C2))
+
+        changed = tile_ssim < self.ssim_threshold
+        ssim_mean = float(tile_ssim.mean())
+        return {
+            'timestamp': current['timestamp'].isoformat(),
+            'previous_timestamp': previous['timestamp'].isoformat(),
+            'path': current['path'],
+            'ssim': ssim_mean,
+            'ssim_min': float(tile_ssim.min()),
+            'mse': float(tile_mse.mean()),
+            'change_intensity': 1.0 - ssim_mean,
+            'changed_fraction': float(changed.mean()),
+            'change_regions': self._regions(changed, current['original_size'])
+        }, changed
+
+    def _regions(self, changed: np.ndarray, original_size: Tuple[int, int], limit: int = 5) -> List[Dict]:
+        """Blocos alterados vizinhos agrupados, em coordenadas do screenshot original"""
+        if not changed.any():
+            return []
+        count, _, stats, _ = cv2.connectedComponentsWithStats(changed.astype(np.uint8), connectivity=8)
+        scale_x = original_size[0] / self._working_size[0]
+        scale_y = original_size[1] / self._working_size[1]
+        regions = []
+        for label in range(1, count):
+            cx, cy, cw, ch, tiles = (int(v) for v in stats[label])
+            regions.append({
+                'position': (int(cx * self.tile_size * scale_x), int(cy * self.tile_size * scale_y)),
+                'size': (int(cw * self.tile_size * scale_x), int(ch * self.tile_size * scale_y)),
+                'tiles': tiles
+            })
+        regions.sort(key=lambda region: region['tiles'], reverse=True)
+        return regions[:limit]
+
+    def analyze(self, items: List[Tuple[datetime, str]], hotspots: int = 5) -> Dict:
+        """Percorre a linha do tempo e devolve a série de mudanças e o resumo"""
+        started = time.perf_counter()
+        self._working_size = None
+        self._read_flag, self._reduction = cv2.IMREAD_GRAYSCALE, 1
+        series = []
+        change_counts = None
+        previous = None
+        frames = 0
+        original_size = None
+
+        for frame in self.iter_frames(items):
+            frames += 1
+            original_size = frame['original_size']
+            if previous is not None:
+                pair, changed = self.compare_pair(previous, frame)
+                series.append(pair)
+                change_counts = changed.astype(np.int64) if change_counts is None else change_counts + changed
+            previous = frame
+
+        elapsed = time.perf_counter() - started
+        intensities = [pair['change_intensity'] for pair in series]
+        report = {
+            'frames': frames,
+            'unreadable': len(items) - frames,
+            'pairs': len(series),
+            'period': {
+                'start': items[0][0].isoformat() if items else None,
+                'end': items[-1][0].isoformat() if items else None
+            },
+            'working_size': self._working_size,
+            'elapsed_seconds': elapsed,
+            'frames_per_second': frames / elapsed if elapsed > 0 else 0.0,
+            'mean_change_intensity': float(np.mean(intensities)) if intensities else 0.0,
+            'largest_changes': sorted(series, key=lambda pair: pair['change_intensity'], reverse=True)[:5],
+            'hotspots': [],
+            'series': series
+        }
+
+        # Blocos que mais mudaram no período
+        if change_counts is not None and change_counts.any():
+            scale_x = original_size[0] / self._working_size[0]
+            scale_y = original_size[1] / self._working_size[1]
+            flat = np.argsort(change_counts, axis=None)[::-1][:hotspots]
+            for index in flat:
+                row, col = divmod(int(index), change_counts.shape[1])
+                if change_counts[row, col] == 0:
+                    break
+                report['hotspots'].append({
+                    'position': (int(col * self.tile_size * scale_x), int(row * self.tile_size * scale_y)),
+                    'size': (int(self.tile_size * scale_x), int(self.tile_size * scale_y)),
+                    'change_rate': float(change_counts[row, col] / len(series))
+                })
+        return report
+
+
+def analyze_directory(directory: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      **options) -> Dict:
+    return ScreenshotTimeline(**options).analyze(list_screenshots(directory, start, end))
+
+
+def print_report(report: Dict):
+    print(f"\n🎞️ Linha do tempo: {report['frames']} screenshots "
+          f"de {report['period']['start']} a {report['period']['end']}")
+    print(f"   ⚡ {report['frames_per_second']:.0f} frames/s ({report['elapsed_seconds']:.1f}s)")
+    if report['unreadable']:
+        print(f"   ⚠️ {report['unreadable']} arquivos ilegíveis")
+    print(f"   📈 Intensidade média de mudança: {report['mean_change_intensity']:.3f}")
+    for pair in report['largest_changes']:
+        print(f"   • {pair['timestamp']}: intensidade {pair['change_intensity']:.3f}, "
+              f"{pair['changed_fraction']:.0%} da tela")
+    for spot in report['hotspots']:
+        print(f"   🔥 Região {spot['position']} muda em {spot['change_rate']:.0%} dos pares")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Comparação em lote de screenshots do PC Cleaner")
+    parser.add_argument('directory', help="Diretório dos screenshots (ex.: data/screenshots)")
+    parser.add_argument('--start', help="Início (ISO, ex.: 2024-05-01T08:00)")
+    parser.add_argument('--end', help="Fim (ISO)")
+    parser.add_argument('--width', type=int, default=640, help="Largura de trabalho (px)")
+    parser.add_argument('--tile', type=int, default=16, help="Tamanho do bloco (px)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', help="Arquivo JSON do relatório")
+    args = parser.parse_args(argv)
+
+    report = analyze_directory(
+        args.directory,
+        start=datetime.fromisoformat(args.start) if args.start else None,
+        end=datetime.fromisoformat(args.end) if args.end else None,
+        working_width=args.width, tile_size=args.tile, max_workers=args.workers
+    )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n💾 Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
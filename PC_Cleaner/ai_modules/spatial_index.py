@@ -0,0 +1,155 @@
+# ai_modules/spatial_index.py - Índice espacial para os analisadores que trabalham com pontos e caixas
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+Box = Tuple[int, int, int, int]  # x, y, largura, altura
+Point = Tuple[float, float]
+
+
+class UnionFind:
+    """Conjuntos disjuntos com compressão de caminho e união por tamanho"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return True
+
+    def labels(self) -> List[int]:
+        """Rótulo 0..k-1 de cada item, na ordem de primeira aparição"""
+        roots: Dict[int, int] = {}
+        return [roots.setdefault(self.find(i), len(roots)) for i in range(len(self.parent))]
+
+
+class GridIndex:
+    """Hash espacial uniforme: cada célula de `cell_size` px guarda os ids que a tocam"""
+
+    def __init__(self, cell_size: float):
+        self.cell_size = float(cell_size)
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert_point(self, item_id: int, x: float, y: float):
+        self.cells[self._cell(x, y)].append(item_id)
+
+    def insert_box(self, item_id: int, box: Box):
+        x, y, w, h = box
+        cx0, cy0 = self._cell(x, y)
+        cx1, cy1 = self._cell(x + max(w - 1, 0), y + max(h - 1, 0))
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].append(item_id)
+
+    def query_radius(self, x: float, y: float, radius: float) -> Iterable[int]:
+        """Candidatos (a conferir) a até `radius` de (x, y)"""
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield from self.cells.get((cx, cy), ())
+
+
+def cluster_points(points: Sequence[Point], radius: float) -> List[int]:
+    """Agrupamento por ligação simples: pontos a até `radius` ficam no mesmo grupo.
+
+    Grade com células do tamanho do raio + union-find: cada ponto só é
+    comparado com os vizinhos das células adjacentes (~O(n) para pontos
+    espalhados, em vez de comparar com todos os pontos de todos os grupos).
+    """
+    n = len(points)
+    if n == 0:
+        return []
+    groups = UnionFind(n)
+    grid = GridIndex(max(radius, 1e-9))
+    limit = radius * radius
+    for i, (x, y) in enumerate(points):
+        for j in grid.query_radius(x, y, radius):
+            dx, dy = x - points[j][0], y - points[j][1]
+            if dx * dx + dy * dy <= limit:
+                groups.union(i, j)
+        grid.insert_point(i, x, y)
+    return groups.labels()
+
+
+def count_clusters(points: Sequence[Point], radius: float) -> int:
+    labels = cluster_points(points, radius)
+    return max(labels) + 1 if labels else 0
+
+
+def overlapping_pairs(boxes: Sequence[Box]) -> List[Tuple[int, int]]:
+    """Pares (i, j), i < j, de caixas com interseção de área positiva.
+
+    Varredura em x: eventos de saída antes dos de entrada na mesma
+    coordenada (caixas que só se tocam não contam); as caixas ativas ficam
+    ordenadas pelo topo, então cada entrada só examina as que começam acima
+    do seu fundo. Custo O(n log n + candidatos) em vez de todos os pares.
+    """
+    events = []
+    for i, (x, y, w, h) in enumerate(boxes):
+        if w <= 0 or h <= 0:
+            continue
+        events.append((x + w, 0, i))  # saída
+        events.append((x, 1, i))  # entrada
+    events.sort()
+
+    active: List[Tuple[int, int]] = []  # (topo, id), ordenado
+    pairs = []
+    for _, kind, i in events:
+        x, y, w, h = boxes[i]
+        if kind == 0:
+            del active[bisect_left(active, (y, i))]
+            continue
+        bottom = y + h
+        for top, j in active[:bisect_left(active, (bottom, -1))]:
+            if top + boxes[j][3] > y:
+                pairs.append((min(i, j), max(i, j)))
+        insort(active, (y, i))
+    return pairs
+
+
+def count_overlaps(boxes: Sequence[Box]) -> int:
+    return len(overlapping_pairs(boxes))
+
+
+def merge_overlapping_boxes(boxes: Sequence[Box]) -> List[Box]:
+    """Une caixas que se sobrepõem (transitivamente) na caixa envolvente de cada grupo"""
+    merged = list(boxes)
+    while True:
+        pairs = overlapping_pairs(merged)
+        if not pairs:
+            return merged
+        groups = UnionFind(len(merged))
+        for i, j in pairs:
+            groups.union(i, j)
+        bounds: Dict[int, List[int]] = {}
+        for label, (x, y, w, h) in zip(groups.labels(), merged):
+            if label not in bounds:
+                bounds[label] = [x, y, x + w, y + h]
+            else:
+                b = bounds[label]
+                b[0], b[1], b[2], b[3] = min(b[0], x), min(b[1], y), max(b[2], x + w), max(b[3], y + h)
+        merged = [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in bounds.values()]
+
+
+def box_of(item: Dict) -> Box:
+    """Caixa de um resultado dos analisadores ({'position': (x, y), 'size': (w, h)})"""
+    (x, y), (w, h) = item['position'], item['size']
+    return int(x), int(y), int(w), int(h)
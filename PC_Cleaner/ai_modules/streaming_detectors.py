@@ -0,0 +1,245 @@
+# ai_modules/streaming_detectors.py - Detectores estatísticos online (O(1) por amostra)
+import math
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('streaming_detectors')
+
+
+class EWMAStats:
+    """Média e variância com decaimento exponencial (reage a mudanças recentes)"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.mean = None
+        self.var = 0.0
+
+    def zscore(self, value: float) -> float:
+        if self.mean is None or self.var <= 1e-12:
+            return 0.0
+        return (value - self.mean) / math.sqrt(self.var)
+
+    def update(self, value: float):
+        if self.mean is None:
+            self.mean = value
+            return
+        diff = value - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+
+
+class WelfordStats:
+    """Média e variância de longo prazo pelo algoritmo de Welford"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def zscore(self, value: float) -> float:
+        std = self.std
+        return (value - self.mean) / std if std > 1e-9 else 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+
+class CUSUMDetector:
+    """CUSUM bilateral sobre valores padronizados (detecta mudança de patamar)"""
+
+    def __init__(self, drift: float = 0.5, threshold: float = 8.0):
+        self.drift = drift
+        self.threshold = threshold
+        self.positive = 0.0
+        self.negative = 0.0
+
+    @property
+    def level(self) -> float:
+        return max(self.positive, self.negative) / self.threshold
+
+    def update(self, z: float) -> Optional[str]:
+        self.positive = max(0.0, self.positive + z - self.drift)
+        self.negative = max(0.0, self.negative - z - self.drift)
+        if self.positive > self.threshold:
+            self.positive = 0.0
+            return 'increase'
+        if self.negative > self.threshold:
+            self.negative = 0.0
+            return 'decrease'
+        return None
+
+
+class MetricStream:
+    """Detectores online de uma métrica: EWMA z, Welford z, CUSUM e taxa de variação"""
+
+    def __init__(self, name: str, z_threshold: float = 4.0, warmup: int = 30,
+                 alpha: float = 0.1):
+        self.name = name
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.ewma = EWMAStats(alpha)
+        self.welford = WelfordStats()
+        self.cusum = CUSUMDetector()
+        self.rate = EWMAStats(alpha)
+        self.last_value = None
+        self.last_timestamp = None
+
+    @property
+    def warmed_up(self) -> bool:
+        return self.welford.count >= self.warmup
+
+    def update(self, timestamp: float, value: float) -> Dict:
+        """Processa uma amostra e retorna níveis normalizados (1.0 = limite)"""
+        ewma_z = self.ewma.zscore(value)
+        welford_z = self.welford.zscore(value)
+
+        rate_z = 0.0
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            rate = (value - self.last_value) / (timestamp - self.last_timestamp)
+            rate_z = self.rate.zscore(rate)
+            self.rate.update(rate)
+
+        change = self.cusum.update(welford_z) if self.warmed_up else None
+
+        self.ewma.update(value)
+        self.welford.update(value)
+        self.last_value = value
+        self.last_timestamp = timestamp
+
+        levels = {
+            'ewma_z': abs(ewma_z) / self.z_threshold,
+            'welford_z': abs(welford_z) / self.z_threshold,
+            'rate_z': abs(rate_z) / self.z_threshold,
+            'cusum': 1.0 if change else self.cusum.level
+        }
+        if not self.warmed_up:
+            levels = {key: 0.0 for key in levels}
+
+        return {
+            'metric': self.name,
+            'value': value,
+            'ewma_z': ewma_z,
+            'welford_z': welford_z,
+            'rate_z': rate_z,
+            'change': change,
+            'levels': levels,
+            'max_level': max(levels.values())
+        }
+
+
+# (nome, caminho no dict de métricas, contador cumulativo -> usar taxa por segundo)
+STREAM_METRICS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ('cpu_percent', ('system', 'cpu_percent'), False),
+    ('memory_percent', ('system', 'memory_percent'), False),
+    ('swap_percent', ('system', 'swap_percent'), False),
+    ('disk_percent', ('system', 'disk_percent'), False),
+    ('disk_read_mb_s', ('disk_io', 'read_bytes_per_sec'), True),
+    ('disk_write_mb_s', ('disk_io', 'write_bytes_per_sec'), True),
+    ('net_sent_mb_s', ('network', 'bytes_sent_per_sec'), True),
+    ('net_recv_mb_s', ('network', 'bytes_recv_per_sec'), True),
+    ('net_errors_s', ('network', 'err_in'), True),
+    ('network_connections', ('network_connections',), False),
+    ('process_count', ('processes', 'total'), False)
+]
+
+COUNTER_SCALE = {
+    'disk_read_mb_s': 1024 * 1024,
+    'disk_write_mb_s': 1024 * 1024,
+    'net_sent_mb_s': 1024 * 1024,
+    'net_recv_mb_s': 1024 * 1024
+}
+
+
+class StreamingDetectorBank:
+    """Camada de detectores online para todas as métricas do AnomalyDetector.
+
+    Roda a cada amostra com custo constante; o IsolationForest só é
+    consultado quando algum detector passa de `near_level` do limite.
+    """
+
+    def __init__(self, z_threshold: float = 4.0, near_level: float = 0.7, warmup: int = 30):
+        self.near_level = near_level
+        self.streams = {name: MetricStream(name, z_threshold, warmup) for name, _, _ in STREAM_METRICS}
+        self._counters: Dict[str, Tuple[float, float]] = {}
+        self.samples = 0
+
+    @property
+    def warmed_up(self) -> bool:
+        """Todas as séries aquecidas (status geral; a decisão por amostra usa só as atualizadas)"""
+        return all(stream.warmed_up for stream in self.streams.values())
+
+    @staticmethod
+    def _lookup(metrics: Dict, path: Tuple[str, ...]) -> Optional[float]:
+        value = metrics
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return float(value) if isinstance(value, (int, float)) else None
+
+    def _counter_rate(self, name: str, timestamp: float, value: float) -> Optional[float]:
+        """Converte contador cumulativo em taxa por segundo"""
+        previous = self._counters.get(name)
+        self._counters[name] = (timestamp, value)
+        if previous is None:
+            return None
+        previous_time, previous_value = previous
+        elapsed = timestamp - previous_time
+        if elapsed <= 0 or value < previous_value:  # Reinício do contador
+            return None
+        return (value - previous_value) / elapsed / COUNTER_SCALE.get(name, 1)
+
+    def update(self, metrics: Dict) -> Dict:
+        """Atualiza todos os detectores com uma amostra de métricas"""
+        try:
+            timestamp = datetime.fromisoformat(metrics['timestamp']).timestamp()
+        except (KeyError, ValueError, TypeError):
+            timestamp = datetime.now().timestamp()
+
+        self.samples += 1
+        results = []
+        for name, path, cumulative in STREAM_METRICS:
+            value = self._lookup(metrics, path)
+            if value is None:
+                continue
+            if cumulative:
+                value = self._counter_rate(name, timestamp, value)
+                if value is None:
+                    continue
+            results.append(self.streams[name].update(timestamp, value))
+
+        max_level = max((r['max_level'] for r in results), default=0.0)
+        alarms = [r for r in results if r['max_level'] >= 1.0]
+        # Aquecimento das séries alimentadas NESTA amostra: séries que só a coleta
+        # completa atualiza não mantêm o caminho rápido consultando a floresta
+        cold = [r['metric'] for r in results if not self.streams[r['metric']].warmed_up]
+
+        return {
+            'results': results,
+            'alarms': alarms,
+            'max_level': max_level,
+            'near_threshold': max_level >= self.near_level,
+            'cold_streams': cold,
+            'warmed_up': not cold
+        }
+
+    def describe_alarm(self, alarm: Dict) -> str:
+        """Texto legível para um alarme de detector online"""
+        strongest = max(alarm['levels'], key=alarm['levels'].get)
+        labels = {
+            'ewma_z': f"desvio de {alarm['ewma_z']:+.1f}σ do comportamento recente",
+            'welford_z': f"desvio de {alarm['welford_z']:+.1f}σ do comportamento histórico",
+            'rate_z': f"variação brusca ({alarm['rate_z']:+.1f}σ)",
+            'cusum': f"mudança de patamar ({alarm['change'] or 'em formação'})"
+        }
+        return f"{alarm['metric']}: {labels[strongest]} (valor {alarm['value']:.1f})"
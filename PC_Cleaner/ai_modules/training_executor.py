@@ -0,0 +1,308 @@
+# ai_modules/training_executor.py - Treinamento de modelos em processo separado
+import multiprocessing as mp
+import queue
+import pickle
+import psutil
+import time
+import os
+import sys
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Callable
+
+# Garantir que o diretório raiz do PC Cleaner esteja no path (processo filho incluso)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('training_executor')
+
+# Processo filho sempre via "spawn": mesmo comportamento no Windows, Linux e .exe
+_mp_context = mp.get_context('spawn')
+
+
+def _run_training_job(job_id: str, kind: str, payload: Dict, n_jobs: int,
+                      progress_queue, result_queue, cancel_event):
+    """Ponto de entrada do processo de treinamento (executado fora da GUI)"""
+    start_time = time.time()
+
+    def progress_callback(model: str, stage: str, progress: float):
+        try:
+            progress_queue.put_nowait({
+                'job_id': job_id,
+                'model': model,
+                'stage': stage,
+                'progress': float(progress),
+                'elapsed': time.time() - start_time
+            })
+        except Exception:
+            pass
+
+    try:
+        if kind == 'ml_predictor':
+            from ai_modules.ml_predictor import fit_performance_models
+            fitted = fit_performance_models(
+                payload['X'], payload['y'], n_jobs=n_jobs,
+                progress_callback=progress_callback,
+                cancel_check=cancel_event.is_set,
+                backend=payload.get('backend', 'auto'),
+                latency_budget_ms=payload.get('latency_budget_ms', 1.0)
+            )
+        else:
+            raise ValueError(f"Tipo de treinamento desconhecido: {kind}")
+
+        if fitted is None or cancel_event.is_set():
+            result_queue.put({'job_id': job_id, 'status': 'cancelled'})
+            return
+
+        # Modelos voltam serializados para o processo da GUI
+        progress_callback('serialization', 'pickling', 98)
+        result_queue.put({
+            'job_id': job_id,
+            'status': 'done',
+            'models': pickle.dumps(fitted, protocol=pickle.HIGHEST_PROTOCOL),
+            'training_time': time.time() - start_time
+        })
+
+    except Exception as e:
+        result_queue.put({'job_id': job_id, 'status': 'error', 'error': str(e)})
+
+
+class TrainingJob:
+    """Treinamento em andamento em um processo separado"""
+
+    def __init__(self, job_id: str, kind: str, process, progress_queue, result_queue, cancel_event):
+        self.job_id = job_id
+        self.kind = kind
+        self.process = process
+        self.progress_queue = progress_queue
+        self.result_queue = result_queue
+        self.cancel_event = cancel_event
+        self.started_at = time.time()
+        self.last_progress = {}
+        self.result = None
+
+    def poll_progress(self) -> List[Dict]:
+        """Retorna eventos de progresso pendentes sem bloquear"""
+        events = []
+        while True:
+            try:
+                event = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            except Exception:
+                break
+            events.append(event)
+            self.last_progress = event
+        return events
+
+    def _poll_result(self, timeout: float) -> Optional[Dict]:
+        """Lê o resultado do processo (deve ser drenado antes do join)"""
+        if self.result is not None:
+            return self.result
+        try:
+            self.result = self.result_queue.get(timeout=timeout)
+        except queue.Empty:
+            if not self.process.is_alive() and self.result is None:
+                # Processo terminou sem resposta (cancelado à força ou crash)
+                self.result = {
+                    'job_id': self.job_id,
+                    'status': 'cancelled' if self.cancel_event.is_set() else 'error',
+                    'error': f'Processo de treinamento finalizado (código {self.process.exitcode})'
+                }
+        return self.result
+
+    def is_running(self) -> bool:
+        return self.result is None and self.process.is_alive()
+
+    def cancel(self, grace_period: float = 2.0):
+        """Cancela o treinamento: cooperativo entre etapas, forçado após o prazo (bloqueia)"""
+        self.cancel_event.set()
+        self.process.join(grace_period)
+        if self.process.is_alive():
+            logger.info(f"Encerrando processo de treinamento {self.job_id}")
+            self.process.terminate()
+            self.process.join(1.0)
+
+    def request_cancel(self, grace_period: float = 2.0):
+        """Pede o cancelamento sem bloquear (seguro no mainloop do Tk).
+
+        O prazo e o encerramento forçado correm em uma thread; quem está em
+        `wait` recebe o resultado 'cancelled' pelo polling normal.
+        """
+        self.cancel_event.set()
+        threading.Thread(target=self.cancel, args=(grace_period,), daemon=True,
+                         name=f"cancel_{self.job_id}").start()
+
+    def wait(self, progress_callback: Optional[Callable[[Dict], None]] = None,
+             poll_interval: float = 0.2) -> Dict:
+        """Aguarda o fim do treinamento repassando o progresso ao callback"""
+        while True:
+            for event in self.poll_progress():
+                if progress_callback:
+                    progress_callback(event)
+            result = self._poll_result(poll_interval)
+            if result is not None:
+                break
+
+        for event in self.poll_progress():
+            if progress_callback:
+                progress_callback(event)
+
+        self.process.join(5.0)
+        return result
+
+
+class TrainingExecutor:
+    """Executa treinamentos scikit-learn fora do processo da GUI.
+
+    Treinar em threads do processo da interface disputa o GIL com o mainloop
+    do Tk; aqui o fit roda em outro processo com n_jobs dimensionado para os
+    núcleos livres e o progresso volta por uma fila.
+    """
+
+    def __init__(self, reserved_cores: int = 1):
+        self.reserved_cores = reserved_cores
+        self.active_jobs: Dict[str, TrainingJob] = {}
+        self._lock = threading.Lock()
+        self._job_counter = 0
+        self._cancel_requested = False
+
+    def compute_n_jobs(self) -> int:
+        """Calcula quantos núcleos estão livres para o treinamento"""
+        try:
+            cpu_count = psutil.cpu_count(logical=True) or os.cpu_count() or 1
+            busy_fraction = psutil.cpu_percent(interval=0.1) / 100
+            free_cores = int(cpu_count * (1 - busy_fraction))
+            return max(1, min(cpu_count - self.reserved_cores, free_cores))
+        except Exception:
+            return 1
+
+    def submit(self, kind: str, payload: Dict) -> TrainingJob:
+        """Inicia um treinamento em um novo processo"""
+        with self._lock:
+            self._job_counter += 1
+            job_id = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._job_counter}"
+
+        n_jobs = self.compute_n_jobs()
+        progress_queue = _mp_context.Queue()
+        result_queue = _mp_context.Queue()
+        cancel_event = _mp_context.Event()
+
+        process = _mp_context.Process(
+            target=_run_training_job,
+            args=(job_id, kind, payload, n_jobs, progress_queue, result_queue, cancel_event),
+            name=f"pc_cleaner_training_{job_id}",
+            daemon=True
+        )
+        process.start()
+
+        job = TrainingJob(job_id, kind, process, progress_queue, result_queue, cancel_event)
+        with self._lock:
+            self.active_jobs[job_id] = job
+            # cancel_all só alcança jobs registrados: um pedido feito antes do registro vale aqui
+            cancel_now = self._cancel_requested
+        if cancel_now:
+            job.request_cancel()
+
+        logger.info(f"Treinamento {job_id} iniciado em processo separado (n_jobs={n_jobs})")
+        return job
+
+    def train_ml_predictor(self, predictor, progress_callback: Optional[Callable[[Dict], None]] = None,
+                           collect_if_needed: bool = True) -> Dict:
+        """Treina o MLPredictor em outro processo e aplica os modelos resultantes.
+
+        Bloqueia a thread chamadora (nunca o mainloop do Tk) até o fim do treinamento.
+        Não limpa cancelamentos: a sessão começa com `clear_cancel_request()`, e um
+        cancelamento entre modelos de uma mesma sessão continua valendo.
+        """
+        try:
+            if collect_if_needed and len(predictor.historical_data) < predictor.min_samples_for_training:
+                logger.info("Coletando dados para treinamento...")
+                if progress_callback:
+                    progress_callback({'model': 'data', 'stage': 'collecting', 'progress': 0, 'elapsed': 0.0})
+                predictor.collect_training_samples(10, 2, should_stop=self.is_cancel_requested)
+
+            if self.is_cancel_requested():
+                return {'success': False, 'cancelled': True, 'data_points': len(predictor.historical_data)}
+
+            if len(predictor.historical_data) < predictor.min_samples_for_training:
+                return {
+                    'success': False,
+                    'data_points': len(predictor.historical_data),
+                    'error': f'Dados insuficientes ({predictor.min_samples_for_training} amostras necessárias)'
+                }
+
+            X, y = predictor.prepare_training_data()
+            job = self.submit('ml_predictor', {
+                'X': X,
+                'y': y,
+                'backend': predictor.estimator_backend,
+                'latency_budget_ms': predictor.latency_budget_ms
+            })
+            try:
+                result = job.wait(progress_callback)
+            finally:
+                with self._lock:
+                    self.active_jobs.pop(job.job_id, None)
+
+            if result.get('status') == 'done' and self.is_cancel_requested():
+                # Cancelado enquanto o resultado chegava: os modelos não são aplicados
+                result = {'job_id': job.job_id, 'status': 'cancelled'}
+
+            if result.get('status') != 'done':
+                return {
+                    'success': False,
+                    'cancelled': result.get('status') == 'cancelled',
+                    'data_points': len(X),
+                    'error': result.get('error')
+                }
+
+            fitted = pickle.loads(result['models'])
+            predictor.apply_trained_models(fitted)
+
+            logger.info(f"Modelos treinados em processo separado com {len(X)} amostras. MSE: {fitted['mse']:.2f}")
+
+            return {
+                'success': True,
+                'data_points': len(X),
+                'training_time': result.get('training_time', 0),
+                'mse': fitted['mse'],
+                'backend': fitted.get('model_metadata', {}).get('backend')
+            }
+
+        except Exception as e:
+            logger.error(f"Erro no treinamento em processo separado: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def is_cancel_requested(self) -> bool:
+        return self._cancel_requested
+
+    def clear_cancel_request(self):
+        """Início de uma nova sessão de treinamento: esquece cancelamentos anteriores"""
+        with self._lock:
+            self._cancel_requested = False
+
+    def cancel_all(self, wait: bool = True):
+        """Cancela todos os treinamentos em andamento (wait=False: não bloqueia, para a GUI)"""
+        with self._lock:
+            self._cancel_requested = True
+            jobs = list(self.active_jobs.values())
+        for job in jobs:
+            if wait:
+                job.cancel()
+            else:
+                job.request_cancel()
+        logger.info(f"{len(jobs)} treinamento(s) {'cancelado(s)' if wait else 'em cancelamento'}")
+
+    def shutdown(self):
+        """Encerra processos de treinamento pendentes"""
+        self.cancel_all()
+        with self._lock:
+            self.active_jobs.clear()
+
+
+def format_training_progress(event: Dict) -> str:
+    """Formata um evento de progresso para exibição na GUI"""
+    return (f"{event.get('model', '?')}: {event.get('stage', '?')} "
+            f"({event.get('elapsed', 0):.1f}s)")
@@ -0,0 +1,338 @@
+# ai_modules/trend_forecaster.py - Previsão de tendências para manutenção preditiva
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+import math
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('trend_forecaster')
+
+
+class RollingLinearTrend:
+    """Regressão linear em janela deslizante com somas incrementais.
+
+    Cada amostra nova soma seus termos e as que saem da janela são subtraídas,
+    então tanto a atualização quanto a consulta custam O(1) (amortizado).
+    O tempo é medido em horas a partir de uma origem móvel para manter a
+    precisão numérica.
+    """
+
+    # Recalcular as somas do zero a cada N remoções evita acúmulo de erro de ponto flutuante
+    RESYNC_EVERY = 5000
+
+    def __init__(self, window_hours: float, max_points: int = 5000):
+        self.window_hours = window_hours
+        self.max_points = max_points
+        self.points = deque()
+        self.origin = None
+        self._evictions = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.n = 0
+        self.sum_t = 0.0
+        self.sum_y = 0.0
+        self.sum_tt = 0.0
+        self.sum_ty = 0.0
+        self.sum_yy = 0.0
+
+    def _accumulate(self, t: float, y: float, sign: int):
+        self.n += sign
+        self.sum_t += sign * t
+        self.sum_y += sign * y
+        self.sum_tt += sign * t * t
+        self.sum_ty += sign * t * y
+        self.sum_yy += sign * y * y
+
+    def _resync(self):
+        """Reancora a origem no ponto mais antigo e recalcula as somas"""
+        self.origin = self.points[0][0] if self.points else None
+        self._reset_sums()
+        for t, y in self.points:
+            self._accumulate(t - self.origin, y, 1)
+        self._evictions = 0
+
+    def add(self, timestamp: float, value: float):
+        """Adiciona amostra (timestamp em segundos epoch)"""
+        t = timestamp / 3600.0
+        if self.origin is None:
+            self.origin = t
+        self.points.append((t, value))
+        self._accumulate(t - self.origin, value, 1)
+
+        # Remover amostras fora da janela
+        while self.points and (t - self.points[0][0] > self.window_hours or len(self.points) > self.max_points):
+            old_t, old_y = self.points.popleft()
+            self._accumulate(old_t - self.origin, old_y, -1)
+            self._evictions += 1
+
+        if self._evictions >= self.RESYNC_EVERY:
+            self._resync()
+
+    def _denominator(self) -> float:
+        return self.n * self.sum_tt - self.sum_t ** 2
+
+    def slope(self) -> float:
+        """Inclinação em unidades por hora"""
+        if self.n < 2:
+            return 0.0
+        denom = self._denominator()
+        if abs(denom) < 1e-12:
+            return 0.0
+        return (self.n * self.sum_ty - self.sum_t * self.sum_y) / denom
+
+    def intercept(self) -> float:
+        if self.n == 0:
+            return 0.0
+        return (self.sum_y - self.slope() * self.sum_t) / self.n
+
+    def r_squared(self) -> float:
+        """Coeficiente de determinação do ajuste linear"""
+        if self.n < 3:
+            return 0.0
+        var_t = self.n * self.sum_tt - self.sum_t ** 2
+        var_y = self.n * self.sum_yy - self.sum_y ** 2
+        if var_t <= 1e-12 or var_y <= 1e-12:
+            return 0.0
+        cov = self.n * self.sum_ty - self.sum_t * self.sum_y
+        return max(0.0, min(1.0, (cov * cov) / (var_t * var_y)))
+
+    def mean(self) -> float:
+        return self.sum_y / self.n if self.n else 0.0
+
+    def span_hours(self) -> float:
+        if len(self.points) < 2:
+            return 0.0
+        return self.points[-1][0] - self.points[0][0]
+
+    def last_value(self) -> Optional[float]:
+        return self.points[-1][1] if self.points else None
+
+    def predict(self, timestamp: float) -> float:
+        """Valor previsto pela reta no instante informado"""
+        if self.origin is None:
+            return 0.0
+        return self.intercept() + self.slope() * (timestamp / 3600.0 - self.origin)
+
+
+class SeasonalProfile:
+    """Componente sazonal por hora do dia: média incremental dos resíduos da tendência"""
+
+    def __init__(self, buckets: int = 24):
+        self.counts = [0] * buckets
+        self.means = [0.0] * buckets
+
+    def add(self, hour: int, residual: float):
+        self.counts[hour] += 1
+        self.means[hour] += (residual - self.means[hour]) / self.counts[hour]
+
+    def offset(self, hour: int, min_samples: int = 3) -> float:
+        if self.counts[hour] < min_samples:
+            return 0.0
+        return self.means[hour]
+
+
+class TrendForecaster:
+    """Motor de previsão sobre a série histórica de métricas REAIS.
+
+    Mantém, por métrica, uma regressão linear em janela deslizante mais um
+    perfil sazonal por hora do dia. Toda consulta usa apenas as somas
+    mantidas incrementalmente (O(1) por métrica).
+    """
+
+    # Janela de cada métrica (horas): disco muda em dias, memória em horas, CPU em minutos
+    METRIC_WINDOWS = {
+        'disk_free_gb': 24 * 7,
+        'disk_percent': 24 * 7,
+        'memory_used_gb': 12,
+        'memory_percent': 12,
+        'cpu_percent': 1
+    }
+
+    def __init__(self, cpu_saturation_threshold: float = 90.0,
+                 leak_slope_gb_per_hour: float = 0.1,
+                 min_r_squared: float = 0.6):
+        self.trends = {name: RollingLinearTrend(hours) for name, hours in self.METRIC_WINDOWS.items()}
+        self.seasonal = {name: SeasonalProfile() for name in self.METRIC_WINDOWS}
+        self.cpu_saturation_threshold = cpu_saturation_threshold
+        self.leak_slope_gb_per_hour = leak_slope_gb_per_hour
+        self.min_r_squared = min_r_squared
+
+        # Saturação de CPU: fração de amostras saturadas na janela + tempo contínuo saturado
+        self.saturation_window = RollingLinearTrend(self.METRIC_WINDOWS['cpu_percent'])
+        self.saturated_since = None
+
+        self.last_timestamp = None
+        self.samples_processed = 0
+
+    def update(self, timestamp: float, metrics: Dict[str, float]):
+        """Atualiza todas as séries com uma nova amostra (O(1) por métrica)"""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return  # Amostra repetida ou fora de ordem
+        self.last_timestamp = timestamp
+        self.samples_processed += 1
+
+        hour = datetime.fromtimestamp(timestamp).hour
+        for name, value in metrics.items():
+            if name not in self.trends or value is None:
+                continue
+            trend = self.trends[name]
+            if trend.n >= 3:
+                self.seasonal[name].add(hour, value - trend.predict(timestamp))
+            trend.add(timestamp, float(value))
+
+        cpu = metrics.get('cpu_percent')
+        if cpu is not None:
+            saturated = cpu >= self.cpu_saturation_threshold
+            self.saturation_window.add(timestamp, 1.0 if saturated else 0.0)
+            if saturated:
+                if self.saturated_since is None:
+                    self.saturated_since = timestamp
+            else:
+                self.saturated_since = None
+
+    def update_from_snapshot(self, snapshot: Dict):
+        """Atualiza a partir de um snapshot do MLPredictor"""
+        try:
+            timestamp = datetime.fromisoformat(snapshot['timestamp']).timestamp()
+            self.update(timestamp, {
+                'cpu_percent': snapshot['cpu']['percent'],
+                'memory_percent': snapshot['memory']['percent'],
+                'memory_used_gb': snapshot['memory']['used_gb'],
+                'disk_percent': snapshot['disk']['percent'],
+                'disk_free_gb': snapshot['disk']['free_gb']
+            })
+        except Exception as e:
+            logger.error(f"Erro ao atualizar tendências com snapshot: {e}")
+
+    def update_from_monitoring_metrics(self, metrics: Dict):
+        """Atualiza a partir das métricas coletadas pelo AnomalyDetector"""
+        try:
+            timestamp = datetime.fromisoformat(metrics['timestamp']).timestamp()
+            system = metrics.get('system', {})
+            self.update(timestamp, {
+                'cpu_percent': system.get('cpu_percent'),
+                'memory_percent': system.get('memory_percent'),
+                'memory_used_gb': system.get('memory_used_gb'),
+                'disk_percent': system.get('disk_percent'),
+                'disk_free_gb': system.get('disk_free_gb')
+            })
+        except Exception as e:
+            logger.error(f"Erro ao atualizar tendências com métricas: {e}")
+
+    def forecast(self, metric: str, hours_ahead: float) -> Optional[float]:
+        """Previsão linear + sazonal do valor da métrica daqui a N horas"""
+        trend = self.trends.get(metric)
+        if trend is None or trend.n < 3 or self.last_timestamp is None:
+            return None
+        target = self.last_timestamp + hours_ahead * 3600
+        hour = datetime.fromtimestamp(target).hour
+        return trend.predict(target) + self.seasonal[metric].offset(hour)
+
+    def forecast_disk_fill(self) -> Dict:
+        """Estima quando o disco ficará cheio"""
+        trend = self.trends['disk_free_gb']
+        free_now = trend.last_value()
+        slope = trend.slope()  # GB/h (negativo = enchendo)
+
+        result = {
+            'free_gb': free_now,
+            'fill_rate_gb_per_day': -slope * 24 if trend.n >= 3 else 0.0,
+            'eta_hours': None,
+            'eta_days': None,
+            'confidence': trend.r_squared(),
+            'samples': trend.n
+        }
+
+        if free_now is None or trend.n < 3 or slope >= 0 or trend.span_hours() < 1:
+            result['status'] = 'stable'
+            return result
+
+        eta_hours = free_now / -slope
+        result['eta_hours'] = eta_hours
+        result['eta_days'] = eta_hours / 24
+        if eta_hours < 24 * 7 and result['confidence'] >= self.min_r_squared:
+            result['status'] = 'critical'
+        elif eta_hours < 24 * 30:
+            result['status'] = 'warning'
+        else:
+            result['status'] = 'stable'
+        return result
+
+    def detect_memory_leak(self) -> Dict:
+        """Suspeita de vazamento: crescimento linear e consistente da memória usada"""
+        trend = self.trends['memory_used_gb']
+        slope = trend.slope()
+        r2 = trend.r_squared()
+        suspected = (trend.n >= 10 and trend.span_hours() >= 1 and
+                     slope >= self.leak_slope_gb_per_hour and r2 >= self.min_r_squared)
+        return {
+            'suspected': suspected,
+            'growth_gb_per_hour': slope,
+            'confidence': r2,
+            'window_hours': trend.span_hours(),
+            'forecast_24h_percent': self.forecast('memory_percent', 24)
+        }
+
+    def detect_cpu_saturation(self) -> Dict:
+        """Saturação sustentada de CPU na última janela"""
+        window = self.saturation_window
+        saturated_fraction = window.mean()
+        sustained_minutes = 0.0
+        if self.saturated_since is not None and self.last_timestamp is not None:
+            sustained_minutes = (self.last_timestamp - self.saturated_since) / 60
+        return {
+            'saturated_fraction': saturated_fraction,
+            'sustained_minutes': sustained_minutes,
+            'sustained': sustained_minutes >= 10 or (window.n >= 5 and saturated_fraction >= 0.8),
+            'average_cpu': self.trends['cpu_percent'].mean(),
+            'cpu_trend_per_hour': self.trends['cpu_percent'].slope()
+        }
+
+    def get_forecast_report(self) -> Dict:
+        """Relatório consolidado de manutenção preditiva"""
+        try:
+            disk = self.forecast_disk_fill()
+            memory = self.detect_memory_leak()
+            cpu = self.detect_cpu_saturation()
+
+            risks = []
+            if disk.get('status') in ('critical', 'warning'):
+                risks.append('disk_fill')
+            if memory['suspected']:
+                risks.append('memory_leak')
+            if cpu['sustained']:
+                risks.append('cpu_saturation')
+
+            if 'disk_fill' in risks and disk.get('status') == 'critical':
+                risk_level = 'high'
+            elif len(risks) >= 2:
+                risk_level = 'high'
+            elif risks:
+                risk_level = 'medium'
+            else:
+                risk_level = 'low'
+
+            return {
+                'disk': disk,
+                'memory': memory,
+                'cpu': cpu,
+                'risks': risks,
+                'risk_level': risk_level,
+                'samples_processed': self.samples_processed,
+                'history_hours': self.trends['disk_free_gb'].span_hours(),
+                'generated_at': datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"Erro ao gerar previsão: {e}")
+            return {'error': str(e)}
+
+
+def describe_eta(hours: Optional[float]) -> str:
+    """Formata um ETA em horas para exibição"""
+    if hours is None or math.isinf(hours):
+        return "Sem tendência de esgotamento"
+    if hours < 48:
+        return f"{hours:.0f} horas"
+    return f"{hours / 24:.0f} dias"
@@ -0,0 +1,454 @@
+# benchmarks/ml_benchmark.py - Benchmark do stack de Machine Learning
+"""
+Mede o custo REAL do stack de ML em datasets sintéticos realistas:
+tempo de treinamento, latência de inferência (p50/p99 por linha),
+throughput em lote, tamanho dos modelos em disco e pico de memória (RSS).
+
+Uso:
+    python benchmarks/ml_benchmark.py                      # roda e salva resultados
+    python benchmarks/ml_benchmark.py --sizes 100 1000     # tamanhos específicos
+    python benchmarks/ml_benchmark.py --check              # compara com o baseline
+    python benchmarks/ml_benchmark.py --save-baseline      # atualiza o baseline
+
+Os resultados em results/ são desta máquina e orientam a escolha do
+estimador (estimator_backends). O ml_baseline.json versionado é só a
+referência do --check: não representa as máquinas dos usuários.
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import tempfile
+import argparse
+import platform
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Callable
+
+import numpy as np
+import psutil
+
+# Importar módulos do PC Cleaner
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.ml_predictor import MLPredictor
+from ai_modules.anomaly_detector import AnomalyDetector
+from ai_modules.sample_store import SampleStore
+from ai_modules.estimator_backends import ESTIMATOR_BACKENDS, build_fast_predictor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "ml_baseline.json")
+
+DEFAULT_SIZES = [100, 1000, 5000]
+LATENCY_SAMPLES = 200
+BATCH_SIZE = 1000
+
+# Métricas comparadas com o baseline: (caminho, maior_é_melhor, variação absoluta ignorada)
+# A folga absoluta evita falsos alarmes em medidas sub-milissegundo, dominadas por ruído
+REGRESSION_METRICS = [
+    ('train_seconds', False, 0.1),
+    ('inference_p50_ms', False, 0.5),
+    ('inference_p99_ms', False, 2.0),
+    ('batch_rows_per_second', True, 0.0),
+    ('model_size_mb', False, 0.1),
+    ('peak_rss_mb', False, 20.0)
+]
+
+
+class PeakRSSMonitor:
+    """Amostra o RSS do processo em uma thread durante um trecho medido"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_rss = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+        return False
+
+    @property
+    def peak_rss_mb(self) -> float:
+        return self.peak_rss / (1024 * 1024)
+
+
+def generate_synthetic_snapshots(count: int, seed: int = 42, interval_minutes: int = 5) -> List[Dict]:
+    """Gera snapshots no formato de MLPredictor.collect_real_system_snapshot.
+
+    As séries seguem padrões plausíveis: ciclo diário de CPU, memória
+    acompanhando a CPU, disco enchendo devagar e contadores de I/O cumulativos.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 6, 8, 0, 0)
+    memory_total, swap_total, disk_total = 16.0, 4.0, 512.0
+    disk_used = disk_total * 0.55
+    read_mb = write_mb = sent_mb = recv_mb = 0.0
+    uptime_hours = 2.0
+    process_names = ['chrome.exe', 'code.exe', 'explorer.exe', 'python.exe', 'teams.exe',
+                     'outlook.exe', 'svchost.exe', 'MsMpEng.exe', 'spotify.exe', 'steam.exe']
+
+    snapshots = []
+    for i in range(count):
+        timestamp = start + timedelta(minutes=interval_minutes * i)
+        hour = timestamp.hour + timestamp.minute / 60
+        daily_load = 0.5 + 0.5 * np.sin((hour - 9) / 24 * 2 * np.pi)
+        burst = rng.random() < 0.05
+
+        cpu = float(np.clip(10 + 50 * daily_load + rng.normal(0, 8) + (40 if burst else 0), 0, 100))
+        memory_percent = float(np.clip(35 + 30 * daily_load + rng.normal(0, 4), 5, 99))
+        swap_percent = float(np.clip((memory_percent - 70) * 1.5 + rng.normal(0, 2), 0, 100))
+        disk_used = min(disk_total * 0.99, disk_used + abs(rng.normal(0.02, 0.05)))
+        read_mb += abs(rng.normal(15, 10)) * (1 + daily_load)
+        write_mb += abs(rng.normal(8, 6)) * (1 + daily_load)
+        sent_mb += abs(rng.normal(2, 2))
+        recv_mb += abs(rng.normal(12, 10))
+        uptime_hours += interval_minutes / 60
+        process_count = int(120 + 60 * daily_load + rng.integers(-10, 10))
+
+        top = [{
+            'pid': int(rng.integers(100, 30000)),
+            'name': process_names[int(rng.integers(0, len(process_names)))],
+            'cpu_percent': float(abs(rng.normal(cpu / 5, 3))),
+            'memory_percent': float(abs(rng.normal(memory_percent / 10, 1)))
+        } for _ in range(5)]
+
+        snapshots.append({
+            'timestamp': timestamp.isoformat(),
+            'cpu': {'percent': cpu, 'frequency_mhz': float(2400 + 1200 * daily_load), 'count': 8},
+            'memory': {
+                'percent': memory_percent,
+                'total_gb': memory_total,
+                'available_gb': memory_total * (1 - memory_percent / 100),
+                'used_gb': memory_total * memory_percent / 100
+            },
+            'swap': {'percent': swap_percent, 'total_gb': swap_total, 'used_gb': swap_total * swap_percent / 100},
+            'disk': {
+                'percent': disk_used / disk_total * 100,
+                'total_gb': disk_total,
+                'free_gb': disk_total - disk_used,
+                'used_gb': disk_used
+            },
+            'disk_io': {'read_mb': read_mb, 'write_mb': write_mb,
+                        'read_count': int(read_mb * 40), 'write_count': int(write_mb * 25)},
+            'network': {'bytes_sent_mb': sent_mb, 'bytes_recv_mb': recv_mb,
+                        'packets_sent': int(sent_mb * 700), 'packets_recv': int(recv_mb * 700)},
+            'processes': {
+                'count': process_count,
+                'top_cpu_processes': sorted(top, key=lambda x: x['cpu_percent'], reverse=True),
+                'top_memory_processes': sorted(top, key=lambda x: x['memory_percent'], reverse=True)
+            },
+            'system': {'uptime_hours': uptime_hours, 'boot_time': start.timestamp() - 7200},
+            'temperatures': {'coretemp': [float(45 + 30 * cpu / 100)]}
+        })
+    return snapshots
+
+
+def snapshot_to_monitoring_metrics(snapshot: Dict) -> Dict:
+    """Converte um snapshot sintético no formato de AnomalyDetector.collect_real_system_metrics"""
+    cpu = snapshot['cpu']['percent']
+    return {
+        'timestamp': snapshot['timestamp'],
+        'system': {
+            'cpu_percent': cpu,
+            'cpu_frequency': snapshot['cpu']['frequency_mhz'],
+            'cpu_count': snapshot['cpu']['count'],
+            'memory_percent': snapshot['memory']['percent'],
+            'memory_available_gb': snapshot['memory']['available_gb'],
+            'memory_used_gb': snapshot['memory']['used_gb'],
+            'swap_percent': snapshot['swap']['percent'],
+            'disk_percent': snapshot['disk']['percent'],
+            'disk_free_gb': snapshot['disk']['free_gb']
+        },
+        'disk_io': {
+            'read_bytes_per_sec': snapshot['disk_io']['read_mb'] * 1024 * 1024,
+            'write_bytes_per_sec': snapshot['disk_io']['write_mb'] * 1024 * 1024,
+            'read_count': snapshot['disk_io']['read_count'],
+            'write_count': snapshot['disk_io']['write_count']
+        },
+        'network': {
+            'bytes_sent_per_sec': snapshot['network']['bytes_sent_mb'] * 1024 * 1024,
+            'bytes_recv_per_sec': snapshot['network']['bytes_recv_mb'] * 1024 * 1024,
+            'packets_sent': snapshot['network']['packets_sent'],
+            'packets_recv': snapshot['network']['packets_recv'],
+            'err_in': 0, 'err_out': 0, 'drop_in': 0, 'drop_out': 0
+        },
+        'network_connections': int(20 + cpu / 2),
+        'processes': {
+            'total': snapshot['processes']['count'],
+            'high_cpu': int(cpu > 80),
+            'high_memory': int(snapshot['memory']['percent'] > 85),
+            'problematic': [
+                {'pid': p['pid'], 'name': p['name'], 'cpu_percent': p['cpu_percent'],
+                 'memory_percent': p['memory_percent'],
+                 'memory_mb': p['memory_percent'] / 100 * snapshot['memory']['total_gb'] * 1024,
+                 'status': 'running'}
+                for p in snapshot['processes']['top_cpu_processes']
+            ]
+        },
+        'temperatures': {'coretemp': {'current': snapshot['temperatures']['coretemp'][0],
+                                      'average': snapshot['temperatures']['coretemp'][0]}},
+        'battery': {},
+        'boot_time': snapshot['system']['boot_time'],
+        'uptime_seconds': snapshot['system']['uptime_hours'] * 3600
+    }
+
+
+def measure_latency(fn: Callable, inputs: List, samples: int = LATENCY_SAMPLES) -> Dict:
+    """Latência de chamadas de uma linha (p50/p99 em ms)"""
+    # Aquecimento: primeira chamada paga caches/imports
+    fn(inputs[0])
+    timings = []
+    for i in range(samples):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'inference_p50_ms': float(np.percentile(timings, 50)),
+        'inference_p99_ms': float(np.percentile(timings, 99))
+    }
+
+
+def measure_throughput(fn: Callable, batch) -> float:
+    """Throughput de inferência em lote (linhas/s)"""
+    fn(batch[:10])
+    start = time.perf_counter()
+    fn(batch)
+    elapsed = time.perf_counter() - start
+    return len(batch) / elapsed if elapsed > 0 else float('inf')
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            if filename.endswith('.pkl'):
+                total += os.path.getsize(os.path.join(root, filename))
+    return total / (1024 * 1024)
+
+
+def benchmark_ml_predictor(snapshots: List[Dict], workdir: str) -> Dict:
+    """Mede MLPredictor.train_models_with_real_data e predict_real_performance_impact"""
+    predictor = MLPredictor(data_dir=os.path.join(workdir, "ml"), auto_start=False)
+    predictor.historical_data = SampleStore(len(snapshots))
+    for snapshot in snapshots:
+        predictor.historical_data.append(snapshot, predictor.calculate_real_performance_score(snapshot),
+                                         predictor.extract_features_from_snapshot(snapshot))
+
+    with PeakRSSMonitor() as train_rss:
+        start = time.perf_counter()
+        trained = predictor.train_models_with_real_data()
+        train_seconds = time.perf_counter() - start
+
+    if not trained:
+        return {'error': 'Treinamento falhou'}
+
+    with PeakRSSMonitor() as inference_rss:
+        latency = measure_latency(predictor.predict_real_performance_impact, snapshots)
+        X = predictor.scaler.transform(predictor.prepare_training_data()[0])
+        batch = np.resize(X, (BATCH_SIZE, X.shape[1]))
+        throughput = measure_throughput(predictor.performance_model.predict, batch)
+
+    predictor.save_historical_data()
+
+    return {
+        'train_seconds': train_seconds,
+        **latency,
+        'batch_rows_per_second': throughput,
+        'model_size_mb': directory_size_mb(predictor.models_dir),
+        'history_file_mb': os.path.getsize(predictor.data_file) / (1024 * 1024),
+        'history_memory_mb': predictor.historical_data.memory_bytes() / (1024 * 1024),
+        'peak_rss_mb': max(train_rss.peak_rss_mb, inference_rss.peak_rss_mb)
+    }
+
+
+def benchmark_estimator_backends(snapshots: List[Dict], workdir: str) -> Dict[str, Dict]:
+    """Mede cada backend de estimador (usado pela seleção automática do MLPredictor)"""
+    predictor = MLPredictor(data_dir=os.path.join(workdir, "backends"), auto_start=False)
+    predictor.historical_data = SampleStore(len(snapshots))
+    for snapshot in snapshots:
+        predictor.historical_data.append(snapshot, predictor.calculate_real_performance_score(snapshot),
+                                         predictor.extract_features_from_snapshot(snapshot))
+    X, y = predictor.prepare_training_data()
+    X = np.asarray(X, dtype=np.float64)
+    scaler = predictor.scaler.fit(X)
+    X_scaled = scaler.transform(X)
+    batch = np.resize(X_scaled, (BATCH_SIZE, X_scaled.shape[1]))
+
+    results = {}
+    for name, factory in ESTIMATOR_BACKENDS.items():
+        with PeakRSSMonitor() as rss:
+            model = factory(1)
+            start = time.perf_counter()
+            model.fit(X_scaled, y)
+            train_seconds = time.perf_counter() - start
+
+            fast = build_fast_predictor(scaler, model)
+            if fast is not None:
+                latency = measure_latency(fast.predict, [row for row in X])
+            else:
+                latency = measure_latency(model.predict, [X_scaled[i:i + 1] for i in range(len(X_scaled))])
+            throughput = measure_throughput(model.predict, batch)
+
+        results[name] = {
+            'train_seconds': train_seconds,
+            **latency,
+            'batch_rows_per_second': throughput,
+            'model_size_mb': len(pickle.dumps(model)) / (1024 * 1024),
+            'peak_rss_mb': rss.peak_rss_mb
+        }
+    return results
+
+
+def benchmark_anomaly_detector(snapshots: List[Dict], workdir: str) -> Dict:
+    """Mede AnomalyDetector.establish_baseline e detect_ml_anomalies"""
+    detector = AnomalyDetector(data_dir=os.path.join(workdir, "anomaly"), auto_start=False)
+    metrics_list = [snapshot_to_monitoring_metrics(snapshot) for snapshot in snapshots]
+    detector.monitoring_data = metrics_list
+
+    with PeakRSSMonitor() as train_rss:
+        start = time.perf_counter()
+        established = detector.establish_baseline()
+        train_seconds = time.perf_counter() - start
+
+    if not established:
+        return {'error': 'Baseline não estabelecido (mínimo de amostras não atingido)'}
+
+    with PeakRSSMonitor() as inference_rss:
+        latency = measure_latency(detector.detect_ml_anomalies, metrics_list)
+        X = np.array([detector.extract_features_for_anomaly_detection(m) for m in metrics_list])
+        batch = np.resize(detector.scaler.transform(X), (BATCH_SIZE, X.shape[1]))
+        throughput = measure_throughput(detector.system_anomaly_model.decision_function, batch)
+
+    return {
+        'train_seconds': train_seconds,
+        **latency,
+        'batch_rows_per_second': throughput,
+        'model_size_mb': directory_size_mb(detector.models_dir),
+        'peak_rss_mb': max(train_rss.peak_rss_mb, inference_rss.peak_rss_mb)
+    }
+
+
+def run_benchmarks(sizes: List[int], seed: int = 42) -> Dict:
+    """Executa todos os benchmarks para cada tamanho de dataset"""
+    results = {
+        'generated_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': psutil.cpu_count(logical=True),
+            'memory_gb': psutil.virtual_memory().total / (1024 ** 3)
+        },
+        'benchmarks': {}
+    }
+
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"pc_cleaner_bench_{size}_")
+        try:
+            snapshots = generate_synthetic_snapshots(size, seed)
+            print(f"📊 Dataset com {size} amostras...")
+            results['benchmarks'][f"ml_predictor/{size}"] = benchmark_ml_predictor(snapshots, workdir)
+            results['benchmarks'][f"anomaly_detector/{size}"] = benchmark_anomaly_detector(snapshots, workdir)
+            for backend, metrics in benchmark_estimator_backends(snapshots, workdir).items():
+                results['benchmarks'][f"estimator_backends/{size}/{backend}"] = metrics
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Lista regressões acima da tolerância relativa em relação ao baseline"""
+    regressions = []
+    for name, baseline_metrics in baseline.get('benchmarks', {}).items():
+        current = results['benchmarks'].get(name)
+        if not current or 'error' in current:
+            continue
+        for metric, higher_is_better, noise in REGRESSION_METRICS:
+            reference = baseline_metrics.get(metric)
+            value = current.get(metric)
+            if not reference or value is None or abs(value - reference) <= noise:
+                continue
+            change = (value - reference) / reference
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{name} {metric}: {reference:.4g} -> {value:.4g} ({change:+.0%})")
+    return regressions
+
+
+def print_results(results: Dict):
+    print(f"\n{'benchmark':<44}{'treino s':>10}{'p50 ms':>9}{'p99 ms':>9}{'linhas/s':>12}{'modelo MB':>11}{'RSS MB':>9}")
+    for name, metrics in results['benchmarks'].items():
+        if 'error' in metrics:
+            print(f"{name:<44}  ❌ {metrics['error']}")
+            continue
+        print(f"{name:<44}{metrics['train_seconds']:>10.2f}{metrics['inference_p50_ms']:>9.2f}"
+              f"{metrics['inference_p99_ms']:>9.2f}{metrics['batch_rows_per_second']:>12.0f}"
+              f"{metrics['model_size_mb']:>11.2f}{metrics['peak_rss_mb']:>9.0f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do stack de ML do PC Cleaner")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Arquivo JSON de resultados")
+    parser.add_argument('--check', action='store_true', help="Falha se houver regressão em relação ao baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Regressão relativa tolerada (padrão 25%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Grava os resultados como novo baseline")
+    args = parser.parse_args(argv)
+
+    # Sem baseline a checagem não tem referência: falhar antes de rodar tudo
+    if args.check and not args.save_baseline and not os.path.exists(BASELINE_FILE):
+        print(f"❌ Nenhum baseline encontrado em {BASELINE_FILE} - gere um com --save-baseline")
+        return 2
+
+    results = run_benchmarks(args.sizes, args.seed)
+    print_results(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"ml_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados salvos em {output}")
+
+    exit_code = 0
+    if args.check and os.path.exists(BASELINE_FILE):
+        # Compara com o baseline anterior (antes de um eventual --save-baseline)
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressões detectadas:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            exit_code = 1
+        else:
+            print("✅ Nenhuma regressão em relação ao baseline")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"📌 Baseline atualizado: {BASELINE_FILE}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils.common_functions import PCCleaner, create_system_report, get_real_system_info
 from utils.password_manager import PasswordManager
 from utils.email_sender import EmailSender  
-from utils.date_tracker import DateTracker, check_quick_status
+from utils.date_tracker import check_quick_status
+from utils.service_registry import ServiceLease
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('free_plan')
@@ -38,7 +39,8 @@ class FreePlanGUI:
         self.pc_cleaner = PCCleaner()
         self.password_manager = PasswordManager()
         self.email_sender = EmailSender()
-        self.date_tracker = DateTracker()
+        self.services = ServiceLease()  # Liberados ao fechar a janela
+        self.date_tracker = self.services.acquire('date_tracker', start=True)
         
         # Variáveis de estado
         self.authenticated = False
@@ -61,6 +63,7 @@ class FreePlanGUI:
         
         # Verificar autenticação
         if not self.authenticate_free_user():
+            self.services.release_all()
             self.root.destroy()
             return
         
@@ -1020,6 +1023,9 @@ Deseja fazer upgrade agora?
         finally:
             # Salvar dados ao fechar
             self.save_real_user_data()
+            
+            # Parar monitoramentos compartilhados que só esta janela usava
+            self.services.release_all()
 
 def main():
     """Função principal do PC Cleaner Free"""
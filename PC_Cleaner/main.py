@@ -59,7 +59,8 @@ logger = logging.getLogger('main')
 # Importar módulos do PC Cleaner
 try:
     from utils.password_manager import PasswordManager
-    from utils.date_tracker import DateTracker, check_quick_status
+    from utils.date_tracker import check_quick_status
+    from utils.service_registry import ServiceLease, shutdown_services
     from utils.common_functions import get_real_system_info
     from free_plan import FreePlanGUI
     from pro_plan import ProPlanGUI
@@ -218,7 +219,8 @@ class MainApplication:
         
         # Inicializar componentes
         self.password_manager = PasswordManager()
-        self.date_tracker = DateTracker()
+        self.services = ServiceLease()
+        self.date_tracker = self.services.acquire('date_tracker', start=True)
         
         # Estado da aplicação
         self.current_plan = None
@@ -627,6 +629,9 @@ Desenvolvido por: PC Cleaner Team
         try:
             result = messagebox.askyesno("Sair", "Deseja realmente sair do PC Cleaner?")
             if result:
+                # Parar threads de monitoramento compartilhadas
+                self.services.release_all()
+                shutdown_services()
                 self.root.quit()
                 self.root.destroy()
         except Exception as e:
@@ -751,6 +756,10 @@ def main():
 
 # Configuração para .exe
 if __name__ == "__main__":
+    # Necessário para o processo de treinamento de IA (multiprocessing) no .exe
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
     # Configurar console no Windows (para .exe)
     if sys.platform == 'win32' and getattr(sys, 'frozen', False):
         try:
@@ -18,11 +18,16 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils.common_functions import PCCleaner, create_system_report, get_real_system_info
 from utils.password_manager import PasswordManager
 from utils.email_sender import EmailSender
-from utils.date_tracker import DateTracker, check_quick_status
-from ai_modules.ml_predictor import MLPredictor, quick_system_analysis, train_all_models_quick
+from utils.date_tracker import check_quick_status
+from ai_modules.ml_predictor import quick_system_analysis
 from ai_modules.computer_vision import ComputerVision, quick_desktop_analysis, capture_and_analyze
 from ai_modules.nlp_assistant import NLPAssistant
-from ai_modules.anomaly_detector import AnomalyDetector, quick_anomaly_scan, start_anomaly_monitoring
+from ai_modules.anomaly_detector import quick_anomaly_scan, start_anomaly_monitoring, stop_anomaly_monitoring
+from ai_modules.training_executor import TrainingExecutor, format_training_progress
+from ai_modules.trend_forecaster import describe_eta
+from utils.service_registry import ServiceLease
+from ai_modules.alert_manager import AlertManager, format_transition
+from ai_modules.adaptive_scheduler import AdaptiveScheduler
 
 # Matplotlib para gráficos reais
 try:
@@ -55,13 +60,27 @@ class MasterPlusGUI:
         self.pc_cleaner = PCCleaner()
         self.password_manager = PasswordManager()
         self.email_sender = EmailSender()
-        self.date_tracker = DateTracker()
+        self.services = ServiceLease()  # Liberados ao fechar a janela
+        self.date_tracker = self.services.acquire('date_tracker', start=True)
         
-        # IA COMPLETA para Master Plus
-        self.ml_predictor = MLPredictor()
+        # IA COMPLETA para Master Plus (instâncias compartilhadas no processo)
+        self.ml_predictor = self.services.acquire('ml_predictor', start=True)
         self.computer_vision = ComputerVision()
         self.nlp_assistant = NLPAssistant()
-        self.anomaly_detector = AnomalyDetector()
+        self.anomaly_detector = self.services.acquire('anomaly_detector', start=True)
+        
+        # Painel de alertas recebe só transições (novo/persiste/resolvido), não repetições
+        # (o alert_manager é do processo: o ouvinte sai ao fechar a janela)
+        self._alert_listener = lambda transition: self.root.after(
+            0, lambda: self.add_real_time_alert(format_transition(transition)))
+        self.anomaly_detector.alert_manager.add_listener(self._alert_listener)
+        self.resource_alerts = AlertManager(suppression_window=1800)
+        self.monitoring_scheduler = AdaptiveScheduler(
+            'master_plus_monitor', min_interval=3, base_interval=60, max_interval=300,
+            thresholds={'cpu_percent': 90.0, 'memory_percent': 90.0, 'disk_percent': 95.0})
+        
+        # Treinamentos pesados rodam fora do processo da GUI
+        self.training_executor = TrainingExecutor()
         
         # Variáveis de estado
         self.authenticated = False
@@ -107,6 +126,8 @@ class MasterPlusGUI:
         
         # Verificar autenticação Master Plus
         if not self.authenticate_master_user():
+            self.anomaly_detector.alert_manager.remove_listener(self._alert_listener)
+            self.services.release_all()
             self.root.destroy()
             return
         
@@ -976,6 +997,8 @@ class MasterPlusGUI:
                   command=self.full_ai_training).pack(side=tk.LEFT, padx=5)
         ttk.Button(training_controls_frame, text="📊 Status dos Modelos", 
                   command=self.check_models_status).pack(side=tk.LEFT, padx=5)
+        ttk.Button(training_controls_frame, text="⛔ Cancelar", 
+                  command=self.cancel_ai_training).pack(side=tk.LEFT, padx=5)
         
         # Progress de treinamento
         self.training_progress_var = tk.DoubleVar()
@@ -1555,11 +1578,16 @@ class MasterPlusGUI:
                     self.root.after(0, lambda: self.ai_progress_var.set(25))
                     training_log += "🔄 Treinando Machine Learning Predictor...\n"
                     
-                    ml_results = train_all_models_quick()
+                    ml_results = self.training_executor.train_ml_predictor(
+                        self.ml_predictor,
+                        progress_callback=self.create_training_progress_callback(self.ai_progress_var, 0, 25)
+                    )
                     if ml_results.get('success', False):
                         training_log += f"✅ ML Predictor treinado com {ml_results.get('data_points', 0)} amostras\n"
-                        training_log += f"   Melhoria: +{ml_results.get('improvement', 0):.1f}%\n"
+                        training_log += f"   Tempo de treinamento: {ml_results.get('training_time', 0):.1f}s | MSE: {ml_results.get('mse', 0):.2f}\n"
                         self.usage_stats['ml_models_trained'] += 1
+                    elif ml_results.get('cancelled'):
+                        training_log += "⛔ Treinamento do ML Predictor cancelado\n"
                     else:
                         training_log += "❌ Falha no treinamento do ML Predictor\n"
                     
@@ -1615,6 +1643,7 @@ class MasterPlusGUI:
                     logger.error(f"Erro no treinamento: {e}")
                     self.root.after(0, lambda: self.status_label.config(text="❌ Erro no treinamento"))
             
+            self.training_executor.clear_cancel_request()  # nova sessão de treinamento
             threading.Thread(target=training_thread, daemon=True).start()
             
         except Exception as e:
@@ -2312,11 +2341,8 @@ class MasterPlusGUI:
             
             def deep_scan_thread():
                 try:
-                    # Coletar métricas detalhadas
-                    metrics = self.anomaly_detector.collect_real_system_metrics()
-                    
-                    # Detectar anomalias REAIS
-                    anomalies = self.anomaly_detector.detect_real_system_anomalies(metrics)
+                    # Coleta completa agora (antecipa a do monitoramento, sem rodar em paralelo com ele)
+                    metrics, anomalies = self.anomaly_detector.scan(max_age=0)
                     
                     # Gerar relatório detalhado
                     deep_report = f"""
@@ -2504,7 +2530,28 @@ Para reativar, marque a opção novamente.
                     for rec in recommendations:
                         security_report += f"   • {rec}\n"
                     
-                    security_report += f"""
+                    # Integridade dos executáveis (quase tudo vem do cache; só binários novos/alterados são lidos)
+                    integrity = {}
+                    if self.anomaly_detector.integrity_checker:
+                        integrity = self.anomaly_detector.integrity_checker.check()
+                        security_report += f"""
+🔐 INTEGRIDADE DOS EXECUTÁVEIS:
+   • Verificados: {integrity['checked']} (processos e inicialização)
+   • Do cache: {integrity['cache_hits']} | Lidos agora: {integrity['hashed']} | Novos: {integrity['new_files']}
+   • Tempo: {integrity['elapsed_seconds']:.2f}s
+"""
+                        for change in integrity['changed']:
+                            security_report += f"   ⚠️ ALTERADO: {change['path']} ({change['source']})\n"
+                    
+                    if integrity.get('changed'):
+                        security_report += f"""
+⚠️ ATENÇÃO: {len(integrity['changed'])} executável(is) mudou(aram) de conteúdo - confirme se foi uma atualização legítima
+🔒 PROTEÇÃO ATIVA: Monitoramento contínuo funcionando
+
+⏰ Análise concluída: {datetime.now().strftime('%H:%M:%S')}
+                    """
+                    else:
+                        security_report += f"""
 ✅ SISTEMA SEGURO: Nenhuma ameaça crítica detectada
 🔒 PROTEÇÃO ATIVA: Monitoramento contínuo funcionando
 
@@ -2678,22 +2725,38 @@ Para reativar, marque a opção novamente.
                     snapshot = self.ml_predictor.collect_real_system_snapshot()
                     prediction = self.ml_predictor.predict_real_performance_impact(snapshot)
                     
+                    # Tendências do histórico armazenado (não apenas o snapshot atual)
+                    forecast = self.ml_predictor.get_maintenance_forecast()
+                    disk_forecast = forecast.get('disk', {})
+                    memory_forecast = forecast.get('memory', {})
+                    cpu_forecast = forecast.get('cpu', {})
+                    risk_labels = {'low': 'Baixo', 'medium': 'Médio', 'high': 'Alto'}
+                    
                     failure_report = f"""
 🔮 PREDIÇÃO DE FALHAS DO SISTEMA:
 
 📊 ANÁLISE PREDITIVA:
    • Score atual: {prediction.get('current_performance_score', 0):.1f}/100
    • Confiança: {prediction.get('confidence_score', 0):.1%}
-   • Risco de falha: {'Alto' if prediction.get('current_performance_score', 100) < 60 else 'Baixo'}
+   • Risco de falha: {risk_labels.get(forecast.get('risk_level'), 'Baixo')}
+   • Histórico analisado: {forecast.get('samples_processed', 0)} amostras ({forecast.get('history_hours', 0):.1f}h)
 
 🎯 PREDIÇÕES:
-   • Próximas 24h: {'Estável' if prediction.get('current_performance_score', 100) > 70 else 'Monitorar'}
-   • Próximos 7 dias: Sistema funcionando adequadamente
-   • Vida útil estimada: Adequada
+   • Disco cheio em: {describe_eta(disk_forecast.get('eta_hours'))}
+   • Consumo de disco: {disk_forecast.get('fill_rate_gb_per_day', 0):.2f} GB/dia
+   • Memória: {'⚠️ Suspeita de vazamento' if memory_forecast.get('suspected') else 'Estável'} ({memory_forecast.get('growth_gb_per_hour', 0):+.2f} GB/h)
+   • CPU: {'⚠️ Saturação sustentada' if cpu_forecast.get('sustained') else 'Sem saturação sustentada'} ({cpu_forecast.get('saturated_fraction', 0):.0%} do tempo acima do limite)
 
 💡 RECOMENDAÇÕES PREVENTIVAS:
                     """
                     
+                    if 'disk_fill' in forecast.get('risks', []):
+                        failure_report += f"   • Liberar espaço: disco esgota em {describe_eta(disk_forecast.get('eta_hours'))}\n"
+                    if 'memory_leak' in forecast.get('risks', []):
+                        failure_report += "   • Investigar processos com memória crescente (possível vazamento)\n"
+                    if 'cpu_saturation' in forecast.get('risks', []):
+                        failure_report += "   • Reduzir carga contínua de CPU\n"
+                    
                     recommendations = prediction.get('recommendations', [])
                     for rec in recommendations[:5]:
                         action = rec.get('action', rec) if isinstance(rec, dict) else rec
@@ -2730,6 +2793,20 @@ Para reativar, marque a opção novamente.
                 try:
                     # Usar dados REAIS do ML
                     system_status = self.ml_predictor.get_real_system_status()
+                    forecaster = self.ml_predictor.trend_forecaster
+                    forecast = self.ml_predictor.get_maintenance_forecast()
+                    
+                    def describe_trend(metric: str, unit: str) -> str:
+                        trend = forecaster.trends[metric]
+                        if trend.n < 3:
+                            return "Dados insuficientes"
+                        slope = trend.slope()
+                        direction = "Subindo" if slope > 0 else "Caindo" if slope < 0 else "Estável"
+                        return f"{direction} ({slope:+.2f} {unit}/h, R² {trend.r_squared():.2f})"
+                    
+                    def describe_forecast(metric: str, hours: float) -> str:
+                        value = forecaster.forecast(metric, hours)
+                        return f"{max(0, min(100, value)):.1f}%" if value is not None else "N/A"
                     
                     trends_report = f"""
 📈 ANÁLISE DE TENDÊNCIAS:
@@ -2741,15 +2818,15 @@ Para reativar, marque a opção novamente.
    • Disco: {system_status.get('disk_usage', 0):.1f}%
 
 📈 TENDÊNCIAS DETECTADAS:
-   • Performance geral: Estável
-   • Uso de recursos: Dentro do normal
-   • Padrão de uso: Consistente
-   • Degradação: Mínima
+   • CPU: {describe_trend('cpu_percent', '%')}
+   • Memória: {describe_trend('memory_percent', '%')}
+   • Disco: {describe_trend('disk_percent', '%')}
+   • Amostras históricas: {forecast.get('samples_processed', 0)}
 
 🔮 PREDIÇÕES:
-   • Próximos 30 dias: Performance estável
-   • Necessidade de manutenção: Baixa
-   • Upgrades recomendados: Nenhum urgente
+   • Memória em 24h: {describe_forecast('memory_percent', 24)}
+   • Disco em 7 dias: {describe_forecast('disk_percent', 24 * 7)}
+   • Disco cheio em: {describe_eta(forecast.get('disk', {}).get('eta_hours'))}
 
 ⏰ Análise concluída: {datetime.now().strftime('%H:%M:%S')}
                     """
@@ -2771,20 +2848,25 @@ Para reativar, marque a opção novamente.
     def analyze_hardware_lifespan(self):
         """Analisa vida útil do hardware"""
         try:
-            system_info = get_real_system_info()
+            # Usa apenas o histórico já coletado (sem nova coleta bloqueando a interface)
+            forecast = self.ml_predictor.get_maintenance_forecast()
+            memory_now = self.ml_predictor.trend_forecaster.trends['memory_percent'].last_value() or 0
+            disk_forecast = forecast.get('disk', {})
+            memory_forecast = forecast.get('memory', {})
+            cpu_forecast = forecast.get('cpu', {})
             
             lifespan_report = f"""
 💾 ANÁLISE DE VIDA ÚTIL DO HARDWARE:
 
 🖥️ COMPONENTES ANALISADOS:
-   • CPU: Funcionando adequadamente
-   • RAM: {system_info.get('total_memory_gb', 0):.1f} GB - Boa condição
-   • Disco: {system_info.get('free_disk_percent', 0):.1f}% livre - Saudável
+   • CPU: {'⚠️ Saturação sustentada' if cpu_forecast.get('sustained') else 'Funcionando adequadamente'} (média {cpu_forecast.get('average_cpu', 0):.1f}%)
+   • RAM: {memory_now:.1f}% em uso - {'⚠️ crescimento contínuo' if memory_forecast.get('suspected') else 'Boa condição'}
+   • Disco: {disk_forecast.get('free_gb') or 0:.1f} GB livres - consumo de {disk_forecast.get('fill_rate_gb_per_day', 0):.2f} GB/dia
    
 📊 ESTIMATIVAS:
-   • Vida útil restante: Adequada
-   • Necessidade de upgrade: Baixa
-   • Manutenção preventiva: Recomendada
+   • Capacidade de disco restante: {describe_eta(disk_forecast.get('eta_hours'))}
+   • Necessidade de upgrade: {'Alta' if disk_forecast.get('status') == 'critical' else 'Média' if forecast.get('risks') else 'Baixa'}
+   • Manutenção preventiva: {'Necessária' if forecast.get('risks') else 'Recomendada'}
 
 ⏰ Análise concluída: {datetime.now().strftime('%H:%M:%S')}
             """
@@ -2918,6 +3000,7 @@ Para reativar, marque a opção novamente.
                 self.status_label.config(text="⚡ Monitoramento em tempo real ativado")
             else:
                 self.real_time_monitoring_active = False
+                self.monitoring_scheduler.wake()
                 self.status_label.config(text="⏸️ Monitoramento pausado")
         except Exception as e:
             logger.error(f"Erro ao alternar monitoramento: {e}")
@@ -2929,6 +3012,7 @@ Para reativar, marque a opção novamente.
                 while self.real_time_monitoring_active:
                     try:
                         # Coletar dados REAIS
+                        cycle_started = time.thread_time()
                         system_info = get_real_system_info()
                         
                         # Atualizar dados em tempo real
@@ -2948,15 +3032,30 @@ Para reativar, marque a opção novamente.
                         if plt and hasattr(self, 'monitoring_canvas'):
                             self.root.after(0, self.update_real_time_charts)
                         
-                        # Verificar alertas
+                        # Verificar alertas (repetições agrupadas pelo AlertManager)
+                        resource_anomalies = []
                         if system_info.get('cpu_percent', 0) > 90 or system_info.get('memory_percent', 0) > 90:
-                            alert_text = f"⚠️ ALERTA: Alto uso de recursos - {current_time}\n"
-                            self.root.after(0, lambda: self.add_real_time_alert(alert_text))
+                            resource_anomalies.append({
+                                'type': 'high_resource_usage',
+                                'severity': 'high',
+                                'description': 'Alto uso de recursos'
+                            })
+                        for transition in self.resource_alerts.process({'system_anomalies': resource_anomalies}):
+                            alert_text = format_transition(transition)
+                            self.root.after(0, lambda text=alert_text: self.add_real_time_alert(text))
                         
-                        # Atualizar estatísticas
-                        self.usage_stats['real_time_monitoring_hours'] += 1/60  # Incrementar minutos
+                        # Próximo intervalo: rápido com alerta aberto ou tendência de alta, lento ocioso/na bateria
+                        self.monitoring_scheduler.observe({
+                            'cpu_percent': system_info.get('cpu_percent', 0),
+                            'memory_percent': system_info.get('memory_percent', 0),
+                            'disk_percent': 100 - system_info.get('free_disk_percent', 100)
+                        }, alerts_open=bool(self.resource_alerts.active))
+                        self.monitoring_scheduler.record_cost(time.thread_time() - cycle_started)
                         
-                        time.sleep(60)  # Aguardar 1 minuto
+                        interval = self.monitoring_scheduler.sleep()
+                        
+                        # Atualizar estatísticas
+                        self.usage_stats['real_time_monitoring_hours'] += interval / 3600
                         
                     except Exception as e:
                         logger.error(f"Erro no monitoramento: {e}")
@@ -3360,6 +3459,7 @@ Todos os dados baseados em métricas reais e análises de IA
                 try:
                     training_progress = 0
                     step_size = 100 / len(selected_models)
+                    cancelled = False
                     
                     training_log = f"🧠 TREINAMENTO DE MODELOS SELECIONADOS:\n\n"
                     training_log += f"⏰ Iniciado: {datetime.now().strftime('%H:%M:%S')}\n"
@@ -3369,10 +3469,17 @@ Todos os dados baseados em métricas reais e análises de IA
                         training_log += f"🔄 Treinando {model}...\n"
                         
                         if model == "Machine Learning" and self.ml_predictor:
-                            ml_results = train_all_models_quick()
+                            ml_results = self.training_executor.train_ml_predictor(
+                                self.ml_predictor,
+                                progress_callback=self.create_training_progress_callback(
+                                    self.training_progress_var, training_progress, step_size)
+                            )
                             if ml_results.get('success'):
-                                training_log += f"   ✅ Sucesso - {ml_results.get('data_points', 0)} amostras\n"
+                                training_log += f"   ✅ Sucesso - {ml_results.get('data_points', 0)} amostras em {ml_results.get('training_time', 0):.1f}s\n"
                                 self.usage_stats['ml_models_trained'] += 1
+                            elif ml_results.get('cancelled'):
+                                training_log += "   ⛔ Treinamento cancelado\n"
+                                cancelled = True
                             else:
                                 training_log += f"   ❌ Falha no treinamento\n"
                         
@@ -3396,10 +3503,21 @@ Todos os dados baseados em métricas reais e análises de IA
                         elif model == "NLP Assistant":
                             training_log += f"   ✅ NLP configurado\n"
                         
+                        if cancelled or self.training_executor.is_cancel_requested():
+                            break
+                        
                         training_progress += step_size
                         self.root.after(0, lambda p=training_progress: self.training_progress_var.set(p))
                         time.sleep(2)
                     
+                    if cancelled or self.training_executor.is_cancel_requested():
+                        # Processo de treinamento já encerrado: confirmar o cancelamento na GUI
+                        training_log += f"\n⛔ TREINAMENTO CANCELADO ({datetime.now().strftime('%H:%M:%S')})\n"
+                        self.root.after(0, lambda: self.display_training_log(training_log))
+                        self.root.after(0, lambda: self.status_label.config(text="⛔ Treinamento de IA cancelado"))
+                        self.root.after(0, lambda: self.training_progress_var.set(0))
+                        return
+                    
                     training_log += f"\n🎉 TREINAMENTO CONCLUÍDO!\n"
                     training_log += f"⏰ Finalizado: {datetime.now().strftime('%H:%M:%S')}\n"
                     training_log += f"📊 Modelos ativos: {len(selected_models)}\n"
@@ -3414,6 +3532,7 @@ Todos os dados baseados em métricas reais e análises de IA
                     logger.error(f"Erro no treinamento: {e}")
                     self.root.after(0, lambda: self.status_label.config(text="❌ Erro no treinamento"))
             
+            self.training_executor.clear_cancel_request()  # nova sessão de treinamento
             threading.Thread(target=training_thread, daemon=True).start()
             
         except Exception as e:
@@ -3434,6 +3553,24 @@ Todos os dados baseados em métricas reais e análises de IA
         except Exception as e:
             logger.error(f"Erro no treinamento completo: {e}")
 
+    def create_training_progress_callback(self, progress_var, base: float, span: float):
+        """Cria callback que repassa o progresso do processo de treinamento para a GUI"""
+        def on_progress(event: Dict):
+            value = base + span * event.get('progress', 0) / 100
+            text = f"🧠 Treinando {format_training_progress(event)}"
+            self.root.after(0, lambda: progress_var.set(value))
+            self.root.after(0, lambda: self.status_label.config(text=text))
+        return on_progress
+
+    def cancel_ai_training(self):
+        """Cancela treinamentos de IA em andamento"""
+        try:
+            # Não bloqueia o mainloop: a thread de treinamento confirma quando o processo encerrar
+            self.training_executor.cancel_all(wait=False)
+            self.status_label.config(text="⛔ Cancelando treinamento de IA...")
+        except Exception as e:
+            logger.error(f"Erro ao cancelar treinamento: {e}")
+
     def check_models_status(self):
         """Verifica status dos modelos"""
         try:
@@ -3742,6 +3879,11 @@ Todos os dados baseados em métricas reais e análises de IA
             
             # Parar monitoramento
             self.real_time_monitoring_active = False
+            
+            # Parar monitoramentos compartilhados que só esta janela usava
+            self.anomaly_detector.alert_manager.remove_listener(self._alert_listener)
+            stop_anomaly_monitoring()
+            self.services.release_all()
 
 def main():
     """Função principal do PC Cleaner Master Plus"""
@@ -16,8 +16,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils.common_functions import PCCleaner, create_system_report, get_real_system_info
 from utils.password_manager import PasswordManager
 from utils.email_sender import EmailSender
-from utils.date_tracker import DateTracker, check_quick_status
-from ai_modules.ml_predictor import MLPredictor, quick_system_analysis, train_all_models_quick
+from utils.date_tracker import check_quick_status
+from ai_modules.ml_predictor import quick_system_analysis
+from utils.service_registry import ServiceLease
+from ai_modules.training_executor import TrainingExecutor, format_training_progress
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('pro_plan')
@@ -41,10 +43,12 @@ class ProPlanGUI:
         self.pc_cleaner = PCCleaner()
         self.password_manager = PasswordManager()
         self.email_sender = EmailSender()
-        self.date_tracker = DateTracker()
+        self.services = ServiceLease()  # Liberados ao fechar a janela
+        self.date_tracker = self.services.acquire('date_tracker', start=True)
         
-        # IA básica integrada para Pro
-        self.ml_predictor = MLPredictor()
+        # IA básica integrada para Pro (instância compartilhada no processo)
+        self.ml_predictor = self.services.acquire('ml_predictor', start=True)
+        self.training_executor = TrainingExecutor()
         
         # Variáveis de estado
         self.authenticated = False
@@ -72,6 +76,7 @@ class ProPlanGUI:
         
         # Verificar autenticação Pro
         if not self.authenticate_pro_user():
+            self.services.release_all()
             self.root.destroy()
             return
         
@@ -1398,8 +1403,14 @@ class ProPlanGUI:
             
             def training_thread():
                 try:
-                    # Treinar usando dados REAIS
-                    training_results = train_all_models_quick()
+                    # Treinar usando dados REAIS em processo separado (GUI continua responsiva)
+                    def on_progress(event: Dict):
+                        text = f"Treinando {format_training_progress(event)}"
+                        self.root.after(0, lambda: self.status_label.config(text=text))
+                    
+                    training_results = self.training_executor.train_ml_predictor(
+                        self.ml_predictor, progress_callback=on_progress
+                    )
                     
                     training_report = f"""
 🧠 TREINAMENTO DE MODELOS IA:
@@ -1408,7 +1419,7 @@ class ProPlanGUI:
    • Sucesso: {'✅ Sim' if training_results.get('success', False) else '❌ Não'}
    • Dados utilizados: {training_results.get('data_points', 0)} amostras
    • Tempo de treinamento: {training_results.get('training_time', 0):.1f}s
-   • Melhoria: +{training_results.get('improvement', 0):.1f}%
+   • Erro médio (MSE): {training_results.get('mse', 0):.2f}
 
 🎯 MODELOS TREINADOS:
    • Performance Predictor: Básico
@@ -1433,6 +1444,7 @@ class ProPlanGUI:
                     logger.error(f"Erro no treinamento: {e}")
                     self.root.after(0, lambda: self.status_label.config(text="Erro no treinamento"))
             
+            self.training_executor.clear_cancel_request()  # nova sessão de treinamento
             threading.Thread(target=training_thread, daemon=True).start()
             
         except Exception as e:
@@ -2042,6 +2054,9 @@ Relatório do sistema gerado pelo PC Cleaner Pro
         finally:
             # Salvar dados ao fechar
             self.save_real_user_data()
+            
+            # Parar monitoramentos compartilhados que só esta janela usava
+            self.services.release_all()
 
 def main():
     """Função principal do PC Cleaner Pro"""
@@ -0,0 +1,21 @@
+# tests/test_alert_manager.py - Ouvintes do AlertManager
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.alert_manager import AlertManager
+
+
+def test_ouvinte_removido_nao_recebe_transicoes():
+    manager = AlertManager()
+    received = []
+    manager.add_listener(received.append)
+    anomaly = {'type': 'high_cpu_usage', 'severity': 'high', 'message': 'CPU alta'}
+
+    manager.process({'system': [anomaly]}, now=0.0)
+    assert len(received) == 1
+
+    assert manager.remove_listener(received.append)
+    assert not manager.remove_listener(received.append)
+    manager.process({'system': [dict(anomaly, type='high_memory_usage')]}, now=1.0)
+    assert len(received) == 1
@@ -0,0 +1,46 @@
+# tests/test_anomaly_scan.py - Scans da interface sobre o detector compartilhado
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.anomaly_detector import AnomalyDetector
+
+
+def _detector(monkeypatch):
+    detector = AnomalyDetector(auto_start=False, persist=False)
+    calls = []
+
+    def collect():
+        calls.append('collect')
+        return {'timestamp': f'2024-01-01T10:00:{len(calls):02d}', 'system': {}}
+
+    monkeypatch.setattr(detector, 'collect_real_system_metrics', collect)
+    monkeypatch.setattr(detector, 'detect_real_system_anomalies', lambda metrics: {'system_anomalies': []})
+    monkeypatch.setattr(detector, 'update_behavioral_patterns', lambda metrics: None)
+    return detector, calls
+
+
+def test_scan_reaproveita_a_coleta_do_monitoramento(monkeypatch):
+    detector, calls = _detector(monkeypatch)
+    detector.monitoring_active = True
+    with detector._pipeline_lock:
+        detector._monitoring_cycle()  # primeira iteração do loop: coleta completa
+    assert calls == ['collect']
+
+    metrics, _ = detector.scan()
+    assert calls == ['collect']  # nenhuma amostra extra para os detectores
+    assert metrics is detector.last_scan[0]
+
+
+def test_scan_recente_antecipa_a_coleta_do_ciclo(monkeypatch):
+    detector, calls = _detector(monkeypatch)
+    detector.monitoring_active = True
+    detector.scan()
+    detector.scan(max_age=0)
+    assert calls == ['collect', 'collect']
+
+    # O loop trata a coleta antecipada como a do ciclo: a próxima iteração é só a leve
+    monkeypatch.setattr(detector, 'collect_fast_metrics', lambda: {'system': {}})
+    with detector._pipeline_lock:
+        detector._monitoring_cycle()
+    assert calls == ['collect', 'collect']
@@ -0,0 +1,38 @@
+# tests/test_behavioral_model.py - Decisão comportamental (z-score + cauda do histograma)
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.anomaly_detector import AnomalyDetector
+
+MONDAY_10H = datetime(2024, 1, 1, 10, 0)
+
+
+def _detector(cpu_history):
+    detector = AnomalyDetector(auto_start=False, persist=False)
+    for cpu in cpu_history:
+        detector.behavioral_model.update(MONDAY_10H, {'cpu_percent': cpu, 'memory_percent': 40.0})
+    return detector
+
+
+def _check(detector, cpu):
+    return detector.detect_behavioral_anomaly({
+        'timestamp': MONDAY_10H.isoformat(),
+        'system': {'cpu_percent': cpu, 'memory_percent': 40.0}
+    })
+
+
+def test_valor_nunca_visto_no_horario_e_anomalo():
+    detector = _detector([5.0] * 50)
+    anomaly = _check(detector, 80.0)
+    assert anomaly is not None
+    assert anomaly['percentiles']['cpu_percent'] == 1.0
+
+
+def test_pico_recorrente_no_horario_nao_e_anomalo():
+    # Um pico de 80% já apareceu nesse horário: z alto, mas fora da cauda do histograma
+    detector = _detector([5.0] * 48 + [80.0, 82.0])
+    _, mean, std = detector.behavioral_model.expected(MONDAY_10H, 'cpu_percent')
+    assert (80.0 - mean) / std > detector.behavioral_z_threshold
+    assert _check(detector, 80.0) is None
@@ -0,0 +1,21 @@
+# tests/test_estimator_backends.py - Referência de latência para a escolha do estimador
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules import estimator_backends
+
+
+def test_sem_benchmark_local_nao_usa_o_baseline_versionado(tmp_path, monkeypatch):
+    assert os.path.exists(os.path.join(estimator_backends.BENCHMARK_DIR, "ml_baseline.json"))
+    monkeypatch.setattr(estimator_backends, 'BENCHMARK_RESULTS_DIR', str(tmp_path))
+    assert estimator_backends.load_benchmark_latencies() == {}
+
+
+def test_benchmark_local_mais_recente_define_as_latencias(tmp_path, monkeypatch):
+    monkeypatch.setattr(estimator_backends, 'BENCHMARK_RESULTS_DIR', str(tmp_path))
+    for stamp, latency in (('20240101_000000', 9.0), ('20240102_000000', 0.3)):
+        with open(tmp_path / f"ml_benchmark_{stamp}.json", 'w', encoding='utf-8') as f:
+            json.dump({'benchmarks': {'estimator_backends/1000/ridge': {'inference_p50_ms': latency}}}, f)
+    assert estimator_backends.load_benchmark_latencies() == {'ridge': 0.3}
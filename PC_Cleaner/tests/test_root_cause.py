@@ -0,0 +1,25 @@
+# tests/test_root_cause.py - Regressões do RootCauseEngine
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.root_cause import RootCauseEngine
+
+
+def test_capacidade_cheia_nao_despeja_processos_da_mesma_coleta():
+    """Com a capacidade cheia, nomes novos só despejam executáveis ausentes da coleta atual"""
+    engine = RootCauseEngine(window=5, capacity=3)
+    engine.record(0.0, {'a': [10.0, 100.0], 'b': [10.0, 100.0], 'c': [10.0, 100.0]}, 30.0, 300.0)
+    engine.record(1.0, {'a': [10.0, 100.0], 'x': [50.0, 200.0], 'y': [60.0, 300.0]}, 120.0, 600.0)
+
+    assert set(engine.rows) == {'a', 'x', 'y'}
+    assert len(set(engine.rows.values())) == 3
+
+    slot = 1
+    cpu = engine.series['cpu']
+    assert cpu[engine.rows['a'], slot] == 10.0
+    assert cpu[engine.rows['x'], slot] == 50.0
+    assert cpu[engine.rows['y'], slot] == 60.0
+    # Linhas reaproveitadas começam zeradas: nada de b/c na amostra anterior
+    assert cpu[engine.rows['x'], 0] == 0.0
+    assert cpu[engine.rows['y'], 0] == 0.0
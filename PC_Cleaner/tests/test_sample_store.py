@@ -0,0 +1,68 @@
+# tests/test_sample_store.py - Buffer circular do SampleStore
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.sample_store import N_FEATURES, SampleStore
+
+
+def _snapshot(i):
+    return {
+        'timestamp': f'2024-01-01T00:{i // 60:02d}:{i % 60:02d}',
+        'memory': {'used_gb': float(i)},
+        'processes': {'top_cpu_processes': [{'pid': i, 'name': f'p{i}', 'cpu_percent': 1.0}]}
+    }
+
+
+def _fill(store, n):
+    for i in range(n):
+        store.append(_snapshot(i), float(i), [float(i)] * N_FEATURES)
+
+
+def test_cheio_mantem_as_mais_recentes_em_ordem(tmp_path):
+    store = SampleStore(capacity=4)
+    _fill(store, 7)
+
+    assert len(store) == 4
+    assert [item['performance_score'] for item in store] == [3.0, 4.0, 5.0, 6.0]
+    assert store[-1]['snapshot']['processes']['top_cpu_processes'][0]['name'] == 'p6'
+    assert store.get_snapshot(0)['memory']['used_gb'] == 3.0
+
+    # Leituras em bloco e o arquivo salvo saem da mais antiga para a mais nova
+    X, y = store.training_arrays()
+    assert y.tolist() == [3.0, 4.0, 5.0, 6.0]
+    assert X[:, 0].tolist() == [3.0, 4.0, 5.0, 6.0]
+    assert [metrics['memory_used_gb'] for _, metrics in store.iter_trend_points()] == [3.0, 4.0, 5.0, 6.0]
+
+    store.append(_snapshot(7), 7.0, [7.0] * N_FEATURES)
+    path = str(tmp_path / 'history.npz')
+    store.save(path)
+    loaded = SampleStore.load(path, capacity=4)
+    assert np.array_equal(loaded.training_arrays()[1], [4.0, 5.0, 6.0, 7.0])
+    assert loaded[0]['snapshot']['processes']['top_cpu_processes'][0]['name'] == 'p4'
+
+
+def test_training_arrays_alinhados_com_coleta_concorrente():
+    store = SampleStore(capacity=64)
+    stop = threading.Event()
+
+    def collect():
+        i = 0
+        while not stop.is_set():
+            store.append(_snapshot(i % 3600), float(i), [float(i)] * N_FEATURES)
+            i += 1
+
+    collector = threading.Thread(target=collect)
+    collector.start()
+    try:
+        for _ in range(300):
+            X, y = store.training_arrays()
+            assert len(X) == len(y)
+            assert np.array_equal(X[:, 0], y)  # feature 0 e score são o mesmo índice
+            assert np.all(np.diff(y) == 1)  # da mais antiga para a mais nova
+    finally:
+        stop.set()
+        collector.join()
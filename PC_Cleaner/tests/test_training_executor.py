@@ -0,0 +1,53 @@
+# tests/test_training_executor.py - Cancelamento de treinamentos em processo separado
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.training_executor import TrainingExecutor
+
+
+class _Predictor:
+    """Só o que train_ml_predictor usa do MLPredictor"""
+
+    min_samples_for_training = 10
+    estimator_backend = 'auto'
+    latency_budget_ms = 1.0
+
+    def __init__(self, on_prepare=None):
+        self.historical_data = list(range(200))
+        self.on_prepare = on_prepare
+        self.applied = False
+
+    def prepare_training_data(self):
+        if self.on_prepare:
+            self.on_prepare()
+        rng = np.random.default_rng(0)
+        X = rng.random((200, 18))
+        return X, X.sum(axis=1)
+
+    def apply_trained_models(self, fitted):
+        self.applied = True
+
+
+def test_cancelamento_antes_do_registro_do_job_nao_aplica_modelos():
+    executor = TrainingExecutor()
+    executor.clear_cancel_request()
+    # Cancelamento clicado depois da checagem inicial e antes de submit() registrar o job
+    predictor = _Predictor(on_prepare=lambda: executor.cancel_all(wait=False))
+
+    result = executor.train_ml_predictor(predictor, collect_if_needed=False)
+
+    assert result['success'] is False and result['cancelled'] is True
+    assert not predictor.applied
+    assert executor.active_jobs == {}
+
+
+def test_cancelamento_da_sessao_vale_para_os_modelos_seguintes():
+    executor = TrainingExecutor()
+    executor.clear_cancel_request()
+    executor.cancel_all(wait=False)  # entre um modelo e outro da mesma sessão
+
+    result = executor.train_ml_predictor(_Predictor(), collect_if_needed=False)
+    assert result == {'success': False, 'cancelled': True, 'data_points': 200}
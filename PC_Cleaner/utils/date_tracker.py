@@ -5,11 +5,14 @@ from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple, Union
 import logging
 import threading
-import time
 from pathlib import Path
 import calendar
 from enum import Enum
 import pytz
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.service_registry import borrow_service
 
 # Configuração de logging específica para date_tracker
 date_logger = logging.getLogger('date_tracker')
@@ -37,7 +40,7 @@ class LicenseStatus(Enum):
 class DateTracker:
     """Sistema completo de controle de datas e períodos para licenças"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", auto_start: bool = True):
         self.data_dir = data_dir
         self.tracker_file = os.path.join(data_dir, "date_tracker.json")
         self.alerts_file = os.path.join(data_dir, "date_alerts.json")
@@ -57,10 +60,13 @@ class DateTracker:
         # Sistema de monitoramento automático
         self.monitoring_active = False
         self.monitoring_interval = 3600  # 1 hora em segundos
+        self._monitor_thread = None
+        self._stop_event = threading.Event()
         
         # Inicializar sistema
         self._initialize_system()
-        self._start_automatic_monitoring()
+        if auto_start:
+            self._start_automatic_monitoring()
 
     def _initialize_system(self):
         """Inicializa o sistema de controle de datas"""
@@ -625,10 +631,17 @@ class DateTracker:
             date_logger.error(f"Erro na limpeza de licenças: {e}")
             return 0
 
+    def start_monitoring(self):
+        """Inicia o monitoramento automático (idempotente)"""
+        self._start_automatic_monitoring()
+
     def _start_automatic_monitoring(self):
         """Inicia monitoramento automático de licenças"""
+        if self._monitor_thread is not None and self._monitor_thread.is_alive():
+            return
+        self._stop_event.clear()
+        
         def monitor_licenses():
-            self.monitoring_active = True
             while self.monitoring_active:
                 try:
                     # Verificar licenças expirando
@@ -640,15 +653,16 @@ class DateTracker:
                     # Atualizar status de licenças expiradas
                     self._update_expired_licenses()
                     
-                    # Aguardar próximo ciclo
-                    time.sleep(self.monitoring_interval)
+                    # Aguardar próximo ciclo (interrompível por stop_monitoring)
+                    self._stop_event.wait(self.monitoring_interval)
                     
                 except Exception as e:
                     date_logger.error(f"Erro no monitoramento automático: {e}")
-                    time.sleep(60)  # Aguardar 1 minuto em caso de erro
+                    self._stop_event.wait(60)  # Aguardar 1 minuto em caso de erro
         
-        monitor_thread = threading.Thread(target=monitor_licenses, daemon=True)
-        monitor_thread.start()
+        self.monitoring_active = True
+        self._monitor_thread = threading.Thread(target=monitor_licenses, daemon=True)
+        self._monitor_thread.start()
         date_logger.info("Monitoramento automático de licenças iniciado")
 
     def _generate_license_id(self, user_email: str, plan_type: str) -> str:
@@ -950,29 +964,30 @@ class DateTracker:
     def stop_monitoring(self):
         """Para o monitoramento automático"""
         self.monitoring_active = False
+        self._stop_event.set()
         date_logger.info("Monitoramento automático parado")
 
 # Funções utilitárias
 def create_quick_license(user_email: str, plan_type: str, period_type: str) -> Tuple[bool, Dict]:
     """Função utilitária para criação rápida de licença"""
-    tracker = DateTracker()
-    return tracker.create_license_period(user_email, plan_type, period_type)
+    with borrow_service('date_tracker') as tracker:
+        return tracker.create_license_period(user_email, plan_type, period_type)
 
 def check_quick_status(user_email: str, plan_type: str) -> Dict:
     """Função utilitária para verificação rápida de status"""
-    tracker = DateTracker()
-    return tracker.check_license_status(user_email, plan_type)
+    with borrow_service('date_tracker') as tracker:
+        return tracker.check_license_status(user_email, plan_type)
 
 def get_system_overview() -> Dict:
     """Obtém visão geral do sistema de licenças"""
-    tracker = DateTracker()
-    return {
-        'statistics': tracker.get_usage_statistics(),
-        'expiring_soon': tracker.get_expiring_licenses(7),
-        'expiring_month': tracker.get_expiring_licenses(30),
-        'system_health': {
-            'monitoring_active': tracker.monitoring_active,
-            'timezone': str(tracker.timezone),
-            'last_check': tracker._get_current_datetime().isoformat()
-        }
-    }
\ No newline at end of file
+    with borrow_service('date_tracker') as tracker:
+        return {
+            'statistics': tracker.get_usage_statistics(),
+            'expiring_soon': tracker.get_expiring_licenses(7),
+            'expiring_month': tracker.get_expiring_licenses(30),
+            'system_health': {
+                'monitoring_active': tracker.monitoring_active,
+                'timezone': str(tracker.timezone),
+                'last_check': tracker._get_current_datetime().isoformat()
+            }
+        }
\ No newline at end of file
@@ -0,0 +1,251 @@
+# utils/integrity_checker.py - Verificação de integridade dos executáveis em uso e de inicialização
+import os
+import json
+import time
+import shlex
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+try:
+    import winreg
+except ImportError:  # Fora do Windows não há entradas de inicialização no registro
+    winreg = None
+
+logger = logging.getLogger('integrity_checker')
+
+STARTUP_REGISTRY_KEYS = [
+    r"Software\Microsoft\Windows\CurrentVersion\Run",
+    r"Software\Microsoft\Windows\CurrentVersion\RunOnce"
+]
+
+
+class _Throttle:
+    """Limite de leitura em bytes/s compartilhado pelas threads de hash"""
+
+    def __init__(self, max_bytes_per_sec: float):
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, size: int):
+        if self.max_bytes_per_sec <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + size / self.max_bytes_per_sec
+            delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _startup_command_path(command: str) -> Optional[str]:
+    """Extrai o executável de uma linha de comando de inicialização"""
+    command = os.path.expandvars(command.strip())
+    if not command:
+        return None
+    if command.startswith('"'):
+        return command[1:].split('"', 1)[0]
+    lower = command.lower()
+    for extension in ('.exe', '.com', '.bat', '.cmd'):
+        index = lower.find(extension)
+        if index != -1:
+            return command[:index + len(extension)]
+    try:
+        return shlex.split(command, posix=False)[0]
+    except ValueError:
+        return command.split()[0]
+
+
+class IntegrityChecker:
+    """Hash SHA-256 dos executáveis dos processos e da inicialização.
+
+    Um cache persistente (caminho, tamanho, mtime) -> digest evita reler
+    binários inalterados, então uma verificação em regime é só um stat por
+    arquivo. Arquivos novos ou alterados são lidos em um pool de threads com
+    limite de I/O; se um binário conhecido muda de conteúdo, a mudança é
+    registrada para alerta.
+    """
+
+    def __init__(self, data_dir: str = "data", max_workers: int = 2,
+                 max_mb_per_sec: float = 20.0, reverify_days: float = 7.0,
+                 chunk_size: int = 1024 * 1024):
+        self.cache_file = os.path.join(data_dir, "integrity_cache.json")
+        self.max_workers = max_workers
+        self.reverify_seconds = reverify_days * 86400  # Re-hash periódico (mtime pode ser forjado)
+        self.chunk_size = chunk_size
+        self.throttle = _Throttle(max_mb_per_sec * 1024 * 1024)
+        self.cache: Dict[str, Dict] = {}
+        self.pending_changes: List[Dict] = []
+        self.last_result: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._check_thread = None
+        self.load_cache()
+
+    def load_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.cache = json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de integridade: {e}")
+            self.cache = {}
+
+    def save_cache(self):
+        try:
+            with self._lock:
+                data = json.dumps(self.cache, ensure_ascii=False)
+            temp_file = self.cache_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de integridade: {e}")
+
+    def collect_targets(self) -> Dict[str, str]:
+        """Executáveis a verificar: caminho -> origem ('process' ou 'startup')"""
+        targets = {}
+        for proc in psutil.process_iter(['exe']):
+            try:
+                exe = proc.info['exe']
+                if exe:
+                    targets[os.path.normcase(exe)] = 'process'
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        if winreg is not None:
+            for hkey in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+                for key_path in STARTUP_REGISTRY_KEYS:
+                    try:
+                        with winreg.OpenKey(hkey, key_path) as key:
+                            i = 0
+                            while True:
+                                try:
+                                    _, value, _ = winreg.EnumValue(key, i)
+                                except OSError:
+                                    break
+                                path = _startup_command_path(str(value))
+                                if path:
+                                    targets.setdefault(os.path.normcase(path), 'startup')
+                                i += 1
+                    except OSError:
+                        continue
+
+        startup_folder = os.path.join(os.environ.get('APPDATA', ''), r"Microsoft\Windows\Start Menu\Programs\Startup")
+        if os.path.isdir(startup_folder):
+            for entry in os.scandir(startup_folder):
+                if entry.is_file():
+                    targets.setdefault(os.path.normcase(entry.path), 'startup')
+
+        return targets
+
+    def hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                self.throttle.consume(len(chunk))
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _needs_hash(self, path: str, stat: os.stat_result, now: float) -> bool:
+        entry = self.cache.get(path)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            return True
+        return now - entry.get('verified_at', 0) > self.reverify_seconds
+
+    def check(self, targets: Optional[Dict[str, str]] = None) -> Dict:
+        """Verifica os executáveis; retorna estatísticas e binários alterados"""
+        started = time.perf_counter()
+        now = time.time()
+        targets = self.collect_targets() if targets is None else targets
+
+        to_hash: List[Tuple[str, os.stat_result]] = []
+        errors = 0
+        for path in targets:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                errors += 1
+                continue
+            if self._needs_hash(path, stat, now):
+                to_hash.append((path, stat))
+        cache_hits = len(targets) - len(to_hash) - errors
+
+        def hash_one(item):
+            path, stat = item
+            try:
+                return path, stat, self.hash_file(path)
+            except OSError:
+                return path, stat, None
+
+        changes, new_files = [], 0
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(hash_one, to_hash))
+            with self._lock:
+                for path, stat, digest in results:
+                    if digest is None:
+                        errors += 1
+                        continue
+                    previous = self.cache.get(path)
+                    if previous is None:
+                        new_files += 1
+                    elif previous['digest'] != digest:
+                        changes.append({
+                            'path': path,
+                            'source': targets[path],
+                            'previous_digest': previous['digest'],
+                            'digest': digest,
+                            'previous_size': previous['size'],
+                            'size': stat.st_size,
+                            'metadata_changed': previous['mtime'] != stat.st_mtime_ns,
+                            'detected_at': datetime.now().isoformat()
+                        })
+                    self.cache[path] = {
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime_ns,
+                        'digest': digest,
+                        'source': targets[path],
+                        'first_seen': previous.get('first_seen', now) if previous else now,
+                        'verified_at': now
+                    }
+                self.pending_changes.extend(changes)
+            self.save_cache()
+
+        result = {
+            'checked': len(targets),
+            'cache_hits': cache_hits,
+            'hashed': len(to_hash),
+            'new_files': new_files,
+            'changed': changes,
+            'errors': errors,
+            'elapsed_seconds': time.perf_counter() - started
+        }
+        self.last_result = result
+        if changes:
+            logger.warning(f"{len(changes)} executáveis com conteúdo alterado")
+        return result
+
+    def check_async(self) -> bool:
+        """Verificação em background (no máximo uma por vez)"""
+        with self._lock:
+            if self._check_thread is not None and self._check_thread.is_alive():
+                return False
+            self._check_thread = threading.Thread(target=self.check, daemon=True)
+            self._check_thread.start()
+        return True
+
+    def pop_changes(self) -> List[Dict]:
+        """Mudanças detectadas desde a última chamada (para gerar alertas)"""
+        with self._lock:
+            changes, self.pending_changes = self.pending_changes, []
+        return changes
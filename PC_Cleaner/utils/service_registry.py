@@ -0,0 +1,179 @@
+# utils/service_registry.py - Instâncias compartilhadas de serviços com monitoramento em background
+import os
+import sys
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger('service_registry')
+
+
+def _create_anomaly_detector(data_dir: str):
+    from ai_modules.anomaly_detector import AnomalyDetector
+    return AnomalyDetector(data_dir=data_dir, auto_start=False)
+
+
+def _create_ml_predictor(data_dir: str):
+    from ai_modules.ml_predictor import MLPredictor
+    return MLPredictor(data_dir=data_dir, auto_start=False)
+
+
+def _create_date_tracker(data_dir: str):
+    from utils.date_tracker import DateTracker
+    return DateTracker(data_dir=data_dir, auto_start=False)
+
+
+# nome -> (fábrica, método que inicia o background, método que o para)
+SERVICES = {
+    'anomaly_detector': (_create_anomaly_detector, 'start_monitoring', 'stop_monitoring'),
+    'ml_predictor': (_create_ml_predictor, 'start_data_collection', 'stop_data_collection'),
+    'date_tracker': (_create_date_tracker, 'start_monitoring', 'stop_monitoring')
+}
+
+
+class _ServiceEntry:
+    def __init__(self, instance):
+        self.instance = instance
+        self.refs = 0
+        self.started_refs = 0
+
+
+class ServiceRegistry:
+    """Uma instância por (serviço, diretório de dados) para todo o processo.
+
+    Construir AnomalyDetector/MLPredictor/DateTracker recarrega JSON e pickles
+    do disco e inicia threads de monitoramento; aqui a instância é criada sob
+    demanda uma única vez. O background só roda enquanto houver quem o pediu
+    (start=True) e para quando o último desses usuários libera o serviço. A
+    instância continua em cache para as chamadas "rápidas" seguintes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], _ServiceEntry] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(name: str, data_dir: str) -> Tuple[str, str]:
+        if name not in SERVICES:
+            raise ValueError(f"Serviço desconhecido: {name}")
+        return name, os.path.abspath(data_dir)
+
+    def acquire(self, name: str, data_dir: str = "data", start: bool = False) -> Any:
+        """Obtém a instância compartilhada (criando-a se necessário)"""
+        key = self._key(name, data_dir)
+        factory, start_method, _ = SERVICES[name]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _ServiceEntry(factory(data_dir))
+                self._entries[key] = entry
+                logger.info(f"Serviço '{name}' criado para {key[1]}")
+            entry.refs += 1
+            if start:
+                entry.started_refs += 1
+                if entry.started_refs == 1:
+                    getattr(entry.instance, start_method)()
+                    logger.info(f"Serviço '{name}' iniciado")
+            return entry.instance
+
+    def release(self, name: str, data_dir: str = "data", started: bool = False):
+        """Libera uma referência; para o background quando ninguém mais o usa"""
+        key = self._key(name, data_dir)
+        _, _, stop_method = SERVICES[name]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            if started and entry.started_refs > 0:
+                entry.started_refs -= 1
+                if entry.started_refs == 0:
+                    getattr(entry.instance, stop_method)()
+                    logger.info(f"Serviço '{name}' parado")
+
+    @contextmanager
+    def borrow(self, name: str, data_dir: str = "data"):
+        """Uso pontual da instância compartilhada (sem iniciar background)"""
+        instance = self.acquire(name, data_dir)
+        try:
+            yield instance
+        finally:
+            self.release(name, data_dir)
+
+    def status(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                f"{name}@{data_dir}": {'refs': entry.refs, 'started_refs': entry.started_refs}
+                for (name, data_dir), entry in self._entries.items()
+            }
+
+    def shutdown(self):
+        """Para todos os serviços (fechamento da aplicação)"""
+        with self._lock:
+            for (name, _), entry in self._entries.items():
+                if entry.started_refs > 0:
+                    try:
+                        getattr(entry.instance, SERVICES[name][2])()
+                    except Exception as e:
+                        logger.error(f"Erro ao parar serviço '{name}': {e}")
+                entry.started_refs = 0
+            self._entries.clear()
+
+
+# Registro global do processo
+service_registry = ServiceRegistry()
+
+
+def acquire_service(name: str, data_dir: str = "data", start: bool = False) -> Any:
+    return service_registry.acquire(name, data_dir, start)
+
+
+def release_service(name: str, data_dir: str = "data", started: bool = False):
+    service_registry.release(name, data_dir, started)
+
+
+def borrow_service(name: str, data_dir: str = "data"):
+    return service_registry.borrow(name, data_dir)
+
+
+def shutdown_services():
+    service_registry.shutdown()
+
+
+class ServiceLease:
+    """Serviços usados por um dono (uma janela, um módulo), liberados juntos.
+
+    Cada dono segura no máximo uma referência por serviço: adquirir de novo
+    devolve a mesma instância sem contar outra referência. `release_all` é
+    idempotente e deve ser chamado quando o dono fecha; `shutdown_services`
+    continua como garantia na saída do processo.
+    """
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self._held: Dict[str, Tuple[Any, bool]] = {}  # nome -> (instância, iniciou o background)
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, start: bool = False) -> Any:
+        with self._lock:
+            held = self._held.get(name)
+            if held is not None and (held[1] or not start):
+                return held[0]
+            instance = acquire_service(name, self.data_dir, start)
+            if held is not None:
+                release_service(name, self.data_dir, held[1])  # referência anterior, sem background
+            self._held[name] = (instance, start)
+            return instance
+
+    def release_all(self):
+        with self._lock:
+            held: List[Tuple[str, bool]] = [(name, started) for name, (_, started) in self._held.items()]
+            self._held.clear()
+        for name, started in reversed(held):
+            try:
+                release_service(name, self.data_dir, started)
+            except Exception as e:
+                logger.error(f"Erro ao liberar serviço '{name}': {e}")